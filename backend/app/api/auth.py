@@ -1,5 +1,6 @@
 """Authentication API endpoints."""
 
+import contextlib
 from datetime import timedelta
 
 from fastapi import APIRouter, HTTPException, status
@@ -8,7 +9,12 @@ from sqlmodel import select
 
 from app.api.deps import DbSession
 from app.core.config import get_settings
-from app.core.security import create_access_token, hash_password, verify_password
+from app.core.security import (
+    create_access_token,
+    hash_password_async,
+    needs_rehash,
+    verify_password_async,
+)
 from app.models import Settings
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -56,7 +62,7 @@ async def login(request: LoginRequest, db: DbSession) -> TokenResponse:
             detail="No user configured. Please run setup first.",
         )
 
-    if not verify_password(request.password, user_settings.password_hash):
+    if not await verify_password_async(request.password, user_settings.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -68,6 +74,14 @@ async def login(request: LoginRequest, db: DbSession) -> TokenResponse:
             detail="Incorrect username or password",
         )
 
+    if needs_rehash(user_settings.password_hash):
+        # The work factor changed: upgrade the hash while we have the password.
+        # If the pool is saturated, it is done on a later login instead.
+        with contextlib.suppress(HTTPException):
+            user_settings.password_hash = await hash_password_async(request.password)
+            db.add(user_settings)
+            await db.commit()
+
     access_token = create_access_token(
         data={"sub": user_settings.username},
         expires_delta=timedelta(minutes=settings.access_token_expire_minutes),
@@ -94,7 +108,7 @@ async def setup(request: SetupRequest, db: DbSession) -> SetupResponse:
     user_settings = Settings(
         id=1,
         username=request.username,
-        password_hash=hash_password(request.password),
+        password_hash=await hash_password_async(request.password),
     )
     db.add(user_settings)
     await db.commit()
@@ -2,15 +2,17 @@
 
 from collections.abc import AsyncGenerator
 from typing import Annotated
+from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.database import get_session
-from app.core.security import decode_token
+from app.core.security import decode_token, job_events_scope
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -19,13 +21,20 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
-async def get_current_user(
-    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
-) -> str:
-    """Validate JWT token and return username."""
-    token = credentials.credentials
+def authenticate_token(token: str, scope: str | None = None) -> str:
+    """
+    Validate a JWT token and return its username.
+
+    Args:
+        token: Encoded token
+        scope: Required ``scope`` claim; ``None`` accepts only full access
+            tokens, which carry no scope
+
+    Returns:
+        The username in the token's ``sub`` claim
+    """
     payload = decode_token(token)
-    if payload is None:
+    if payload is None or payload.get("scope") != scope:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
@@ -41,6 +50,37 @@ async def get_current_user(
     return username
 
 
+async def get_current_user(
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
+) -> str:
+    """Validate JWT token and return username."""
+    return authenticate_token(credentials.credentials)
+
+
+async def get_job_events_user(
+    job_id: UUID,
+    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(optional_security)],
+    token: str | None = None,
+) -> str:
+    """
+    Authenticate a job's event stream.
+
+    Accepts a regular Bearer token, or, for clients such as ``EventSource``
+    that cannot send headers, the job's events token as the ``token`` query
+    parameter.
+    """
+    if credentials is not None:
+        return authenticate_token(credentials.credentials)
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return authenticate_token(token, job_events_scope(job_id))
+
+
 # Type aliases for cleaner route signatures
 DbSession = Annotated[AsyncSession, Depends(get_db)]
 CurrentUser = Annotated[str, Depends(get_current_user)]
+JobEventsUser = Annotated[str, Depends(get_job_events_user)]
@@ -1,14 +1,22 @@
 """Plant identification API endpoints."""
 
+from collections.abc import AsyncIterator
+from datetime import datetime
 from typing import Annotated
+from uuid import UUID
 
-from fastapi import APIRouter, File, Form, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlmodel import select
 
-from app.api.deps import CurrentUser, DbSession
-from app.models import Settings
-from app.services.plantnet import identify_plant
+from app.api.deps import CurrentUser, DbSession, JobEventsUser
+from app.core.security import create_job_events_token
+from app.models import IdentificationStatus, PlantIdentification, Settings
+from app.services.files import CHUNK_SIZE, MAX_FILE_SIZE
+from app.services.identification import get_stats, identify_cached
+from app.services.identification_jobs import FINISHED_STATUSES, create_job, watch_job
+from app.services.plantnet import MAX_IMAGES, PlantImage
 
 router = APIRouter(prefix="/identify", tags=["identify"])
 
@@ -32,43 +40,233 @@ class IdentifyResponse(BaseModel):
     error: str | None = None
     error_code: str | None = None
     remaining_identifications: int | None = None
+    retry_after: int | None = None
 
 
-@router.post("", response_model=IdentifyResponse)
-async def identify(
-    _user: CurrentUser,
-    db: DbSession,
-    image: Annotated[UploadFile, File(...)],
-    organ: Annotated[str, Form()] = "leaf",
-) -> IdentifyResponse:
-    """Identify plant species from an uploaded image using PlantNet."""
-    normalized_organ = organ.strip().lower()
-    if normalized_organ not in ALLOWED_ORGANS:
+class IdentifyJobResponse(BaseModel):
+    """
+    Asynchronous identification job; ``result`` is set once it finished.
+
+    ``events_token`` authorizes ``GET /identify/jobs/{id}/events?token=...``
+    for clients that cannot send an Authorization header (``EventSource``).
+    """
+
+    id: UUID
+    status: IdentificationStatus
+    requested_at: datetime
+    completed_at: datetime | None = None
+    result: IdentifyResponse | None = None
+    events_token: str | None = None
+
+
+class IdentifyStatsResponse(BaseModel):
+    """Identification cache and coalescing counters for this process."""
+
+    requests: int
+    memory_hits: int
+    database_hits: int
+    upstream_calls: int
+    rejected_locally: int
+    coalesced: int
+    errors: int
+    bytes_received: int
+    bytes_uploaded: int
+    memory_entries: int
+    inflight: int
+
+
+def _normalize_organ(organ: str) -> str:
+    normalized = organ.strip().lower()
+    if normalized not in ALLOWED_ORGANS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid organ. Use one of: leaf, flower, fruit, bark",
         )
+    return normalized
+
+
+async def _read_upload(upload: UploadFile) -> bytes:
+    """Read an upload chunk by chunk, enforcing ``MAX_FILE_SIZE``."""
+    data = bytearray()
+    while chunk := await upload.read(CHUNK_SIZE):
+        data += chunk
+        if len(data) > MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File too large. Maximum size: {MAX_FILE_SIZE // 1024 // 1024}MB",
+            )
+    return bytes(data)
 
-    if not image.content_type or not image.content_type.startswith("image/"):
+
+async def _read_images(uploads: list[UploadFile], organs: list[str]) -> list[PlantImage]:
+    """Validate uploads and pair them with their organs."""
+    images = []
+    for upload, organ in zip(uploads, organs, strict=True):
+        if not upload.content_type or not upload.content_type.startswith("image/"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid file type. Please upload an image.",
+            )
+
+        data = await _read_upload(upload)
+        if not data:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Uploaded file is empty",
+            )
+        images.append(PlantImage(data, organ, upload.content_type))
+    return images
+
+
+async def get_identify_images(
+    image: Annotated[UploadFile | None, File()] = None,
+    organ: Annotated[str, Form()] = "leaf",
+    images: Annotated[list[UploadFile] | None, File()] = None,
+    organs: Annotated[list[str] | None, Form()] = None,
+) -> list[PlantImage]:
+    """
+    Collect the uploaded images and their organs from the form.
+
+    Accepts a single ``image`` (with ``organ``), or up to five ``images``
+    with one ``organs`` value per image.
+    """
+    uploads = ([image] if image else []) + (images or [])
+    if not uploads:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid file type. Please upload an image.",
+            detail="Please upload an image.",
+        )
+    if len(uploads) > MAX_IMAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_IMAGES} images can be identified at once",
         )
 
-    image_data = await image.read()
-    if not image_data:
+    if organs is None:
+        organs = [organ] * len(uploads)
+    elif len(organs) != len(uploads):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Uploaded file is empty",
+            detail="Provide one organ per image",
         )
 
+    return await _read_images(uploads, [_normalize_organ(o) for o in organs])
+
+
+IdentifyImages = Annotated[list[PlantImage], Depends(get_identify_images)]
+
+
+@router.post("", response_model=IdentifyResponse)
+async def identify(
+    _user: CurrentUser,
+    db: DbSession,
+    images: IdentifyImages,
+) -> IdentifyResponse:
+    """
+    Identify plant species from uploaded images using PlantNet.
+
+    Multiple images of the same plant are identified together in one
+    PlantNet request.
+
+    Results are cached by image content and organ, so repeated
+    identifications of the same photos don't use PlantNet quota.
+    """
     settings_result = await db.exec(select(Settings).where(Settings.id == 1))
     settings = settings_result.first()
     api_key = settings.plantnet_api_key if settings else None
 
-    result = await identify_plant(
-        image_data=image_data,
-        organ=normalized_organ,
-        api_key=api_key,
-    )
+    result = await identify_cached(db, images, api_key=api_key)
     return IdentifyResponse.model_validate(result)
+
+
+@router.get("/stats", response_model=IdentifyStatsResponse)
+async def identify_stats(_user: CurrentUser) -> IdentifyStatsResponse:
+    """Get identification cache hit and request coalescing counters."""
+    return IdentifyStatsResponse.model_validate(get_stats())
+
+
+def _job_response(job: PlantIdentification, user: str | None = None) -> IdentifyJobResponse:
+    """Job response; with ``user``, unfinished jobs get an events token."""
+    finished = job.status in FINISHED_STATUSES
+    return IdentifyJobResponse(
+        id=job.id,
+        status=job.status,
+        requested_at=job.requested_at,
+        completed_at=job.completed_at,
+        result=IdentifyResponse.model_validate(job.results) if finished else None,
+        events_token=create_job_events_token(user, job.id) if user and not finished else None,
+    )
+
+
+async def _get_job(db: DbSession, job_id: UUID) -> PlantIdentification:
+    job = await db.get(PlantIdentification, job_id)
+    if job is None or job.images is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Identification job not found",
+        )
+    return job
+
+
+@router.post(
+    "/jobs",
+    response_model=IdentifyJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def create_identify_job(
+    user: CurrentUser,
+    db: DbSession,
+    images: IdentifyImages,
+) -> IdentifyJobResponse:
+    """
+    Queue an identification and return its job immediately.
+
+    Accepts the same form fields as ``POST /identify``. Poll
+    ``GET /identify/jobs/{id}`` or subscribe to its ``/events`` stream for
+    the result.
+    """
+    job = await create_job(db, images)
+    return _job_response(job, user)
+
+
+@router.get("/jobs/{job_id}", response_model=IdentifyJobResponse)
+async def get_identify_job(
+    user: CurrentUser,
+    db: DbSession,
+    job_id: UUID,
+) -> IdentifyJobResponse:
+    """Get the status and, once finished, the result of a job."""
+    return _job_response(await _get_job(db, job_id), user)
+
+
+@router.get("/jobs/{job_id}/events")
+async def identify_job_events(
+    _user: JobEventsUser,
+    db: DbSession,
+    job_id: UUID,
+) -> StreamingResponse:
+    """
+    Stream job updates as server-sent events.
+
+    Sends a ``status`` event on every status change and a final ``result``
+    event when the job has finished, then closes the stream. Authenticates
+    with a Bearer token or the job's ``events_token`` as ``?token=``.
+    """
+    job = await _get_job(db, job_id)
+    # The stream may stay open for minutes; don't hold the request's
+    # connection meanwhile (the watcher reads in short-lived sessions)
+    await db.close()
+
+    async def events() -> AsyncIterator[str]:
+        async for update in watch_job(job.id):
+            if update is None:
+                yield ": keep-alive\n\n"
+                continue
+            event = "result" if update.status in FINISHED_STATUSES else "status"
+            yield f"event: {event}\ndata: {_job_response(update).model_dump_json()}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
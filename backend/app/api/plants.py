@@ -1,16 +1,54 @@
 """Plant API endpoints."""
 
 from datetime import UTC, datetime
+from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, Query, UploadFile, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
 from pydantic import BaseModel
+from sqlalchemy import func
 from sqlmodel import col, select
 
 from app.api.deps import CurrentUser, DbSession
+from app.api.uploads import (
+    DirectUploadComplete,
+    DirectUploadRequest,
+    DirectUploadResponse,
+    ResumableUploadCreate,
+    ResumableUploadResponse,
+    direct_upload_response,
+    resumable_upload_headers,
+    resumable_upload_response,
+    validate_photo_batch,
+)
 from app.models import CareEvent, CareEventType, Plant, PlantPhoto, Pot
-from app.services.files import save_upload_file
+from app.services.files import (
+    delete_photo_files,
+    register_direct_upload,
+    release_photo_files,
+    save_upload_file,
+    save_upload_files,
+)
+from app.services.photo_variants import create_batch_variants, photo_urls
 from app.services.reminders import update_plant_reminders
+from app.services.resumable_uploads import (
+    append_to_resumable_upload,
+    cancel_resumable_upload,
+    complete_resumable_upload,
+    create_resumable_upload,
+    get_resumable_upload,
+    remove_staging_file,
+)
 
 router = APIRouter(prefix="/plants", tags=["plants"])
 
@@ -41,6 +79,15 @@ class PlantPhotoResponse(BaseModel):
 
     id: UUID
     url: str
+    thumbnail_url: str | None = None
+    srcset: str | None = None
+    avif_srcset: str | None = None
+    # Displayed size, capture time and inline placeholder; None until read
+    width: int | None = None
+    height: int | None = None
+    orientation: int | None = None
+    taken_at: datetime | None = None
+    placeholder: str | None = None
     is_primary: bool
     uploaded_at: datetime
 
@@ -55,6 +102,12 @@ class PlantResponse(BaseModel):
     watering_interval: int | None
     fertilizing_interval: int | None
     primary_photo_url: str | None
+    thumbnail_url: str | None = None
+    srcset: str | None = None
+    avif_srcset: str | None = None
+    placeholder: str | None = None
+    photo_width: int | None = None
+    photo_height: int | None = None
     created_at: datetime
     updated_at: datetime
 
@@ -86,6 +139,31 @@ class CareEventResponse(BaseModel):
     created_at: datetime
 
 
+def _photo_response(photo: PlantPhoto) -> PlantPhotoResponse:
+    return PlantPhotoResponse(
+        id=photo.id,
+        **photo_urls("plants", photo),
+        width=photo.width,
+        height=photo.height,
+        orientation=photo.orientation,
+        taken_at=photo.taken_at,
+        placeholder=photo.placeholder,
+        is_primary=photo.is_primary,
+        uploaded_at=photo.uploaded_at,
+    )
+
+
+def _primary_photo_fields(photo: PlantPhoto | None) -> dict[str, str | int | None]:
+    urls = photo_urls("plants", photo)
+    return {
+        "primary_photo_url": urls.pop("url"),
+        **urls,
+        "placeholder": photo.placeholder if photo else None,
+        "photo_width": photo.width if photo else None,
+        "photo_height": photo.height if photo else None,
+    }
+
+
 async def validate_pot_assignment(
     db: DbSession,
     pot_id: UUID,
@@ -158,9 +236,7 @@ async def list_plants(
                 pot_id=plant.pot_id,
                 watering_interval=plant.watering_interval,
                 fertilizing_interval=plant.fertilizing_interval,
-                primary_photo_url=f"/uploads/plants/{primary_photo.file_path}"
-                if primary_photo
-                else None,
+                **_primary_photo_fields(primary_photo),
                 created_at=plant.created_at,
                 updated_at=plant.updated_at,
             )
@@ -223,9 +299,11 @@ async def get_plant(
             detail="Plant not found",
         )
 
-    # Get photos
+    # Get photos, oldest first by when they were taken
     photos_result = await db.exec(
-        select(PlantPhoto).where(PlantPhoto.plant_id == plant_id)
+        select(PlantPhoto)
+        .where(PlantPhoto.plant_id == plant_id)
+        .order_by(func.coalesce(col(PlantPhoto.taken_at), col(PlantPhoto.uploaded_at)))
     )
     photos = photos_result.all()
 
@@ -249,20 +327,10 @@ async def get_plant(
         pot_id=plant.pot_id,
         watering_interval=plant.watering_interval,
         fertilizing_interval=plant.fertilizing_interval,
-        primary_photo_url=f"/uploads/plants/{primary_photo.file_path}"
-        if primary_photo
-        else None,
+        **_primary_photo_fields(primary_photo),
         created_at=plant.created_at,
         updated_at=plant.updated_at,
-        photos=[
-            PlantPhotoResponse(
-                id=p.id,
-                url=f"/uploads/plants/{p.file_path}",
-                is_primary=p.is_primary,
-                uploaded_at=p.uploaded_at,
-            )
-            for p in photos
-        ],
+        photos=[_photo_response(p) for p in photos],
         last_watered=await get_last_event(CareEventType.WATERED),
         last_fertilized=await get_last_event(CareEventType.FERTILIZED),
         last_repotted=await get_last_event(CareEventType.REPOTTED),
@@ -319,9 +387,7 @@ async def update_plant(
         pot_id=plant.pot_id,
         watering_interval=plant.watering_interval,
         fertilizing_interval=plant.fertilizing_interval,
-        primary_photo_url=f"/uploads/plants/{primary_photo.file_path}"
-        if primary_photo
-        else None,
+        **_primary_photo_fields(primary_photo),
         created_at=plant.created_at,
         updated_at=plant.updated_at,
     )
@@ -343,8 +409,12 @@ async def delete_plant(
             detail="Plant not found",
         )
 
+    photos_result = await db.exec(select(PlantPhoto).where(PlantPhoto.plant_id == plant.id))
+    unused = await release_photo_files(db, photos_result.all(), "plants")
+
     await db.delete(plant)
     await db.commit()
+    await delete_photo_files(unused, "plants")
 
 
 @router.post("/{plant_id}/photos", response_model=PlantPhotoResponse)
@@ -353,48 +423,243 @@ async def upload_photo(
     file: UploadFile,
     db: DbSession,
     _user: CurrentUser,
+    background_tasks: BackgroundTasks,
     is_primary: bool = False,
 ) -> PlantPhotoResponse:
     """Upload a photo for a plant."""
+    await _get_plant_or_404(db, plant_id)
+    saved = await save_upload_file(file, "plants", db)
+    return await _add_photo(
+        db, background_tasks, plant_id, saved.file_path, is_primary, saved.metadata
+    )
+
+
+@router.post("/{plant_id}/photos/batch", response_model=list[PlantPhotoResponse])
+async def upload_photos(
+    plant_id: UUID,
+    files: list[UploadFile],
+    db: DbSession,
+    _user: CurrentUser,
+    background_tasks: BackgroundTasks,
+    primary_index: Annotated[int | None, Query(ge=0)] = None,
+) -> list[PlantPhotoResponse]:
+    """
+    Upload several photos for a plant at once.
+
+    The files are stored concurrently and the photos added in one
+    transaction. ``primary_index`` is the position of the file to make the
+    primary photo.
+    """
+    await _get_plant_or_404(db, plant_id)
+    validate_photo_batch(files, primary_index)
+    saved = await save_upload_files(files, "plants", db)
+    return await _add_photos(
+        db,
+        background_tasks,
+        plant_id,
+        [(upload.file_path, upload.metadata) for upload in saved],
+        primary_index,
+    )
+
+
+@router.post("/{plant_id}/photos/direct", response_model=DirectUploadResponse)
+async def create_direct_photo_upload(
+    plant_id: UUID,
+    request: DirectUploadRequest,
+    db: DbSession,
+    _user: CurrentUser,
+) -> DirectUploadResponse:
+    """
+    Presign an upload of a photo straight to storage (S3 storage only).
+
+    The client PUTs the file to ``upload_url`` with ``headers`` (unless the
+    content is already stored), then registers it with ``/photos/direct/complete``.
+    """
+    await _get_plant_or_404(db, plant_id)
+    return await direct_upload_response("plants", request)
+
+
+@router.post("/{plant_id}/photos/direct/complete", response_model=PlantPhotoResponse)
+async def complete_direct_photo_upload(
+    plant_id: UUID,
+    request: DirectUploadComplete,
+    db: DbSession,
+    _user: CurrentUser,
+    background_tasks: BackgroundTasks,
+    is_primary: bool = False,
+) -> PlantPhotoResponse:
+    """Add a photo uploaded straight to storage."""
+    await _get_plant_or_404(db, plant_id)
+    await register_direct_upload(db, "plants", request.file_path)
+    return await _add_photo(db, background_tasks, plant_id, request.file_path, is_primary)
+
+
+@router.post(
+    "/{plant_id}/photos/resumable",
+    response_model=ResumableUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_resumable_photo_upload(
+    plant_id: UUID,
+    request: ResumableUploadCreate,
+    response: Response,
+    db: DbSession,
+    _user: CurrentUser,
+) -> ResumableUploadResponse:
+    """
+    Start a photo upload that can be resumed after a connection failure.
+
+    The client PATCHes the content to the ``Location`` (in one or more
+    parts, each with an ``Upload-Offset`` header), asks for the offset with
+    HEAD after a failure, and registers the photo with ``/complete``.
+    """
+    await _get_plant_or_404(db, plant_id)
+    upload = await create_resumable_upload(db, "plants", plant_id, request.filename, request.size)
+    response.headers["Location"] = f"/api/plants/{plant_id}/photos/resumable/{upload.id}"
+    return resumable_upload_response(upload, response)
+
+
+@router.api_route(
+    "/{plant_id}/photos/resumable/{upload_id}",
+    methods=["GET", "HEAD"],
+    response_model=ResumableUploadResponse,
+)
+async def get_resumable_photo_upload(
+    plant_id: UUID,
+    upload_id: UUID,
+    response: Response,
+    db: DbSession,
+    _user: CurrentUser,
+) -> ResumableUploadResponse:
+    """Get the offset to resume an upload from."""
+    upload = await get_resumable_upload(db, "plants", plant_id, upload_id)
+    return resumable_upload_response(upload, response)
+
+
+@router.patch("/{plant_id}/photos/resumable/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def append_resumable_photo_upload(
+    plant_id: UUID,
+    upload_id: UUID,
+    upload_offset: Annotated[int, Header(ge=0)],
+    request: Request,
+    db: DbSession,
+    _user: CurrentUser,
+) -> Response:
+    """Send the next part of an upload, starting at ``Upload-Offset``."""
+    upload = await get_resumable_upload(db, "plants", plant_id, upload_id)
+    await append_to_resumable_upload(db, upload, upload_offset, request.stream())
+    return Response(
+        status_code=status.HTTP_204_NO_CONTENT, headers=resumable_upload_headers(upload)
+    )
+
+
+@router.delete("/{plant_id}/photos/resumable/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_resumable_photo_upload(
+    plant_id: UUID,
+    upload_id: UUID,
+    db: DbSession,
+    _user: CurrentUser,
+) -> None:
+    """Cancel an upload."""
+    upload = await get_resumable_upload(db, "plants", plant_id, upload_id)
+    await cancel_resumable_upload(db, upload)
+
+
+@router.post("/{plant_id}/photos/resumable/{upload_id}/complete", response_model=PlantPhotoResponse)
+async def complete_resumable_photo_upload(
+    plant_id: UUID,
+    upload_id: UUID,
+    db: DbSession,
+    _user: CurrentUser,
+    background_tasks: BackgroundTasks,
+    is_primary: bool = False,
+) -> PlantPhotoResponse:
+    """Add a photo from a fully sent resumable upload."""
+    await _get_plant_or_404(db, plant_id)
+    upload = await get_resumable_upload(db, "plants", plant_id, upload_id)
+    saved = await complete_resumable_upload(db, upload)
+    photo = await _add_photo(
+        db, background_tasks, plant_id, saved.file_path, is_primary, saved.metadata
+    )
+    await remove_staging_file(upload.id)
+    return photo
+
+
+async def _get_plant_or_404(db: DbSession, plant_id: UUID) -> Plant:
     result = await db.exec(select(Plant).where(Plant.id == plant_id))
     plant = result.first()
-
     if not plant:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Plant not found",
         )
+    return plant
 
-    # Save file
-    file_path = await save_upload_file(file, "plants")
 
-    # If this is primary, unset other primary photos
-    if is_primary:
+async def _add_photo(
+    db: DbSession,
+    background_tasks: BackgroundTasks,
+    plant_id: UUID,
+    file_path: str,
+    is_primary: bool,
+    metadata: dict | None = None,
+) -> PlantPhotoResponse:
+    """
+    Create the photo row for a stored file (its reference is already in ``db``).
+
+    Without ``metadata`` (direct uploads), it is read with the variants.
+    """
+    photos = await _add_photos(
+        db, background_tasks, plant_id, [(file_path, metadata)], 0 if is_primary else None
+    )
+    return photos[0]
+
+
+async def _add_photos(
+    db: DbSession,
+    background_tasks: BackgroundTasks,
+    plant_id: UUID,
+    files: list[tuple[str, dict | None]],
+    primary_index: int | None,
+) -> list[PlantPhotoResponse]:
+    """
+    Create the photo rows for stored files in one transaction.
+
+    Args:
+        db: Database session, holding the file references
+        background_tasks: Tasks run after the response
+        plant_id: The plant
+        files: File paths and metadata (None to read it with the variants)
+        primary_index: Position of the file to make the primary photo
+    """
+    # If one is primary, unset other primary photos
+    if primary_index is not None:
         photos_result = await db.exec(
-            select(PlantPhoto).where(
-                PlantPhoto.plant_id == plant_id, PlantPhoto.is_primary
-            )
+            select(PlantPhoto).where(PlantPhoto.plant_id == plant_id, PlantPhoto.is_primary)
         )
         for photo in photos_result.all():
             photo.is_primary = False
             db.add(photo)
 
-    photo = PlantPhoto(
-        plant_id=plant_id,
-        file_path=file_path,
-        is_primary=is_primary,
-    )
-    db.add(photo)
+    photos = [
+        PlantPhoto(
+            plant_id=plant_id,
+            file_path=file_path,
+            is_primary=index == primary_index,
+            **(metadata or {}),
+        )
+        for index, (file_path, metadata) in enumerate(files)
+    ]
+    db.add_all(photos)
     await db.commit()
-    await db.refresh(photo)
 
-    return PlantPhotoResponse(
-        id=photo.id,
-        url=f"/uploads/plants/{photo.file_path}",
-        is_primary=photo.is_primary,
-        uploaded_at=photo.uploaded_at,
+    # Thumbnails and responsive variants are rendered after the response
+    background_tasks.add_task(
+        create_batch_variants, "plants", [(photo.id, photo.file_path) for photo in photos]
     )
 
+    return [_photo_response(photo) for photo in photos]
+
 
 @router.delete("/{plant_id}/photos/{photo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_photo(
@@ -417,8 +682,10 @@ async def delete_photo(
             detail="Photo not found",
         )
 
+    unused = await release_photo_files(db, [photo], "plants")
     await db.delete(photo)
     await db.commit()
+    await delete_photo_files(unused, "plants")
 
 
 @router.post("/{plant_id}/photos/{photo_id}/primary", response_model=PlantPhotoResponse)
@@ -459,12 +726,7 @@ async def set_primary_photo(
     await db.commit()
     await db.refresh(target_photo)
 
-    return PlantPhotoResponse(
-        id=target_photo.id,
-        url=f"/uploads/plants/{target_photo.file_path}",
-        is_primary=target_photo.is_primary,
-        uploaded_at=target_photo.uploaded_at,
-    )
+    return _photo_response(target_photo)
 
 
 @router.post("/{plant_id}/care-events", response_model=CareEventResponse)
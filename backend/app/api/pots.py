@@ -1,15 +1,53 @@
 """Pot API endpoints."""
 
 from datetime import UTC, datetime
+from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, UploadFile, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
 from pydantic import BaseModel
-from sqlmodel import select
+from sqlalchemy import func
+from sqlmodel import col, select
 
 from app.api.deps import CurrentUser, DbSession
+from app.api.uploads import (
+    DirectUploadComplete,
+    DirectUploadRequest,
+    DirectUploadResponse,
+    ResumableUploadCreate,
+    ResumableUploadResponse,
+    direct_upload_response,
+    resumable_upload_headers,
+    resumable_upload_response,
+    validate_photo_batch,
+)
 from app.models import Plant, Pot, PotPhoto
-from app.services.files import save_upload_file
+from app.services.files import (
+    delete_photo_files,
+    register_direct_upload,
+    release_photo_files,
+    save_upload_file,
+    save_upload_files,
+)
+from app.services.photo_variants import create_batch_variants, photo_urls
+from app.services.resumable_uploads import (
+    append_to_resumable_upload,
+    cancel_resumable_upload,
+    complete_resumable_upload,
+    create_resumable_upload,
+    get_resumable_upload,
+    remove_staging_file,
+)
 
 router = APIRouter(prefix="/pots", tags=["pots"])
 
@@ -35,6 +73,15 @@ class PotPhotoResponse(BaseModel):
 
     id: UUID
     url: str
+    thumbnail_url: str | None = None
+    srcset: str | None = None
+    avif_srcset: str | None = None
+    # Displayed size, capture time and inline placeholder; None until read
+    width: int | None = None
+    height: int | None = None
+    orientation: int | None = None
+    taken_at: datetime | None = None
+    placeholder: str | None = None
     is_primary: bool
     uploaded_at: datetime
 
@@ -47,6 +94,12 @@ class PotResponse(BaseModel):
     diameter_cm: float
     height_cm: float
     primary_photo_url: str | None
+    thumbnail_url: str | None = None
+    srcset: str | None = None
+    avif_srcset: str | None = None
+    placeholder: str | None = None
+    photo_width: int | None = None
+    photo_height: int | None = None
     plant_id: UUID | None
     plant_name: str | None
     created_at: datetime
@@ -58,6 +111,31 @@ class PotDetailResponse(PotResponse):
     photos: list[PotPhotoResponse]
 
 
+def _photo_response(photo: PotPhoto) -> PotPhotoResponse:
+    return PotPhotoResponse(
+        id=photo.id,
+        **photo_urls("pots", photo),
+        width=photo.width,
+        height=photo.height,
+        orientation=photo.orientation,
+        taken_at=photo.taken_at,
+        placeholder=photo.placeholder,
+        is_primary=photo.is_primary,
+        uploaded_at=photo.uploaded_at,
+    )
+
+
+def _primary_photo_fields(photo: PotPhoto | None) -> dict[str, str | int | None]:
+    urls = photo_urls("pots", photo)
+    return {
+        "primary_photo_url": urls.pop("url"),
+        **urls,
+        "placeholder": photo.placeholder if photo else None,
+        "photo_width": photo.width if photo else None,
+        "photo_height": photo.height if photo else None,
+    }
+
+
 @router.get("", response_model=list[PotResponse])
 async def list_pots(
     db: DbSession,
@@ -85,9 +163,7 @@ async def list_pots(
                 name=pot.name,
                 diameter_cm=pot.diameter_cm,
                 height_cm=pot.height_cm,
-                primary_photo_url=f"/uploads/pots/{primary_photo.file_path}"
-                if primary_photo
-                else None,
+                **_primary_photo_fields(primary_photo),
                 plant_id=plant.id if plant else None,
                 plant_name=plant.name if plant else None,
                 created_at=pot.created_at,
@@ -129,9 +205,7 @@ async def list_available_pots(
                 name=pot.name,
                 diameter_cm=pot.diameter_cm,
                 height_cm=pot.height_cm,
-                primary_photo_url=f"/uploads/pots/{primary_photo.file_path}"
-                if primary_photo
-                else None,
+                **_primary_photo_fields(primary_photo),
                 plant_id=None,
                 plant_name=None,
                 created_at=pot.created_at,
@@ -185,8 +259,12 @@ async def get_pot(
             detail="Pot not found",
         )
 
-    # Get photos
-    photos_result = await db.exec(select(PotPhoto).where(PotPhoto.pot_id == pot_id))
+    # Get photos, oldest first by when they were taken
+    photos_result = await db.exec(
+        select(PotPhoto)
+        .where(PotPhoto.pot_id == pot_id)
+        .order_by(func.coalesce(col(PotPhoto.taken_at), col(PotPhoto.uploaded_at)))
+    )
     photos = photos_result.all()
 
     # Check if assigned to a plant
@@ -200,21 +278,11 @@ async def get_pot(
         name=pot.name,
         diameter_cm=pot.diameter_cm,
         height_cm=pot.height_cm,
-        primary_photo_url=f"/uploads/pots/{primary_photo.file_path}"
-        if primary_photo
-        else None,
+        **_primary_photo_fields(primary_photo),
         plant_id=plant.id if plant else None,
         plant_name=plant.name if plant else None,
         created_at=pot.created_at,
-        photos=[
-            PotPhotoResponse(
-                id=p.id,
-                url=f"/uploads/pots/{p.file_path}",
-                is_primary=p.is_primary,
-                uploaded_at=p.uploaded_at,
-            )
-            for p in photos
-        ],
+        photos=[_photo_response(p) for p in photos],
     )
 
 
@@ -262,9 +330,7 @@ async def update_pot(
         name=pot.name,
         diameter_cm=pot.diameter_cm,
         height_cm=pot.height_cm,
-        primary_photo_url=f"/uploads/pots/{primary_photo.file_path}"
-        if primary_photo
-        else None,
+        **_primary_photo_fields(primary_photo),
         plant_id=plant.id if plant else None,
         plant_name=plant.name if plant else None,
         created_at=pot.created_at,
@@ -297,8 +363,12 @@ async def delete_pot(
             detail=f"Pot is assigned to plant '{plant.name}'. Unassign it first.",
         )
 
+    photos_result = await db.exec(select(PotPhoto).where(PotPhoto.pot_id == pot.id))
+    unused = await release_photo_files(db, photos_result.all(), "pots")
+
     await db.delete(pot)
     await db.commit()
+    await delete_photo_files(unused, "pots")
 
 
 @router.post("/{pot_id}/photos", response_model=PotPhotoResponse)
@@ -307,21 +377,217 @@ async def upload_photo(
     file: UploadFile,
     db: DbSession,
     _user: CurrentUser,
+    background_tasks: BackgroundTasks,
     is_primary: bool = False,
 ) -> PotPhotoResponse:
     """Upload a photo for a pot."""
+    await _get_pot_or_404(db, pot_id)
+    saved = await save_upload_file(file, "pots", db)
+    return await _add_photo(
+        db, background_tasks, pot_id, saved.file_path, is_primary, saved.metadata
+    )
+
+
+@router.post("/{pot_id}/photos/batch", response_model=list[PotPhotoResponse])
+async def upload_photos(
+    pot_id: UUID,
+    files: list[UploadFile],
+    db: DbSession,
+    _user: CurrentUser,
+    background_tasks: BackgroundTasks,
+    primary_index: Annotated[int | None, Query(ge=0)] = None,
+) -> list[PotPhotoResponse]:
+    """
+    Upload several photos for a pot at once.
+
+    The files are stored concurrently and the photos added in one
+    transaction. ``primary_index`` is the position of the file to make the
+    primary photo.
+    """
+    await _get_pot_or_404(db, pot_id)
+    validate_photo_batch(files, primary_index)
+    saved = await save_upload_files(files, "pots", db)
+    return await _add_photos(
+        db,
+        background_tasks,
+        pot_id,
+        [(upload.file_path, upload.metadata) for upload in saved],
+        primary_index,
+    )
+
+
+@router.post("/{pot_id}/photos/direct", response_model=DirectUploadResponse)
+async def create_direct_photo_upload(
+    pot_id: UUID,
+    request: DirectUploadRequest,
+    db: DbSession,
+    _user: CurrentUser,
+) -> DirectUploadResponse:
+    """
+    Presign an upload of a photo straight to storage (S3 storage only).
+
+    The client PUTs the file to ``upload_url`` with ``headers`` (unless the
+    content is already stored), then registers it with ``/photos/direct/complete``.
+    """
+    await _get_pot_or_404(db, pot_id)
+    return await direct_upload_response("pots", request)
+
+
+@router.post("/{pot_id}/photos/direct/complete", response_model=PotPhotoResponse)
+async def complete_direct_photo_upload(
+    pot_id: UUID,
+    request: DirectUploadComplete,
+    db: DbSession,
+    _user: CurrentUser,
+    background_tasks: BackgroundTasks,
+    is_primary: bool = False,
+) -> PotPhotoResponse:
+    """Add a photo uploaded straight to storage."""
+    await _get_pot_or_404(db, pot_id)
+    await register_direct_upload(db, "pots", request.file_path)
+    return await _add_photo(db, background_tasks, pot_id, request.file_path, is_primary)
+
+
+@router.post(
+    "/{pot_id}/photos/resumable",
+    response_model=ResumableUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_resumable_photo_upload(
+    pot_id: UUID,
+    request: ResumableUploadCreate,
+    response: Response,
+    db: DbSession,
+    _user: CurrentUser,
+) -> ResumableUploadResponse:
+    """
+    Start a photo upload that can be resumed after a connection failure.
+
+    The client PATCHes the content to the ``Location`` (in one or more
+    parts, each with an ``Upload-Offset`` header), asks for the offset with
+    HEAD after a failure, and registers the photo with ``/complete``.
+    """
+    await _get_pot_or_404(db, pot_id)
+    upload = await create_resumable_upload(db, "pots", pot_id, request.filename, request.size)
+    response.headers["Location"] = f"/api/pots/{pot_id}/photos/resumable/{upload.id}"
+    return resumable_upload_response(upload, response)
+
+
+@router.api_route(
+    "/{pot_id}/photos/resumable/{upload_id}",
+    methods=["GET", "HEAD"],
+    response_model=ResumableUploadResponse,
+)
+async def get_resumable_photo_upload(
+    pot_id: UUID,
+    upload_id: UUID,
+    response: Response,
+    db: DbSession,
+    _user: CurrentUser,
+) -> ResumableUploadResponse:
+    """Get the offset to resume an upload from."""
+    upload = await get_resumable_upload(db, "pots", pot_id, upload_id)
+    return resumable_upload_response(upload, response)
+
+
+@router.patch("/{pot_id}/photos/resumable/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def append_resumable_photo_upload(
+    pot_id: UUID,
+    upload_id: UUID,
+    upload_offset: Annotated[int, Header(ge=0)],
+    request: Request,
+    db: DbSession,
+    _user: CurrentUser,
+) -> Response:
+    """Send the next part of an upload, starting at ``Upload-Offset``."""
+    upload = await get_resumable_upload(db, "pots", pot_id, upload_id)
+    await append_to_resumable_upload(db, upload, upload_offset, request.stream())
+    return Response(
+        status_code=status.HTTP_204_NO_CONTENT, headers=resumable_upload_headers(upload)
+    )
+
+
+@router.delete("/{pot_id}/photos/resumable/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_resumable_photo_upload(
+    pot_id: UUID,
+    upload_id: UUID,
+    db: DbSession,
+    _user: CurrentUser,
+) -> None:
+    """Cancel an upload."""
+    upload = await get_resumable_upload(db, "pots", pot_id, upload_id)
+    await cancel_resumable_upload(db, upload)
+
+
+@router.post("/{pot_id}/photos/resumable/{upload_id}/complete", response_model=PotPhotoResponse)
+async def complete_resumable_photo_upload(
+    pot_id: UUID,
+    upload_id: UUID,
+    db: DbSession,
+    _user: CurrentUser,
+    background_tasks: BackgroundTasks,
+    is_primary: bool = False,
+) -> PotPhotoResponse:
+    """Add a photo from a fully sent resumable upload."""
+    await _get_pot_or_404(db, pot_id)
+    upload = await get_resumable_upload(db, "pots", pot_id, upload_id)
+    saved = await complete_resumable_upload(db, upload)
+    photo = await _add_photo(
+        db, background_tasks, pot_id, saved.file_path, is_primary, saved.metadata
+    )
+    await remove_staging_file(upload.id)
+    return photo
+
+
+async def _get_pot_or_404(db: DbSession, pot_id: UUID) -> Pot:
     result = await db.exec(select(Pot).where(Pot.id == pot_id))
     pot = result.first()
-
     if not pot:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pot not found",
         )
+    return pot
+
+
+async def _add_photo(
+    db: DbSession,
+    background_tasks: BackgroundTasks,
+    pot_id: UUID,
+    file_path: str,
+    is_primary: bool,
+    metadata: dict | None = None,
+) -> PotPhotoResponse:
+    """
+    Create the photo row for a stored file (its reference is already in ``db``).
+
+    Without ``metadata`` (direct uploads), it is read with the variants.
+    """
+    photos = await _add_photos(
+        db, background_tasks, pot_id, [(file_path, metadata)], 0 if is_primary else None
+    )
+    return photos[0]
 
-    file_path = await save_upload_file(file, "pots")
 
-    if is_primary:
+async def _add_photos(
+    db: DbSession,
+    background_tasks: BackgroundTasks,
+    pot_id: UUID,
+    files: list[tuple[str, dict | None]],
+    primary_index: int | None,
+) -> list[PotPhotoResponse]:
+    """
+    Create the photo rows for stored files in one transaction.
+
+    Args:
+        db: Database session, holding the file references
+        background_tasks: Tasks run after the response
+        pot_id: The pot
+        files: File paths and metadata (None to read it with the variants)
+        primary_index: Position of the file to make the primary photo
+    """
+    # If one is primary, unset other primary photos
+    if primary_index is not None:
         photos_result = await db.exec(
             select(PotPhoto).where(PotPhoto.pot_id == pot_id, PotPhoto.is_primary)
         )
@@ -329,18 +595,21 @@ async def upload_photo(
             photo.is_primary = False
             db.add(photo)
 
-    photo = PotPhoto(
-        pot_id=pot_id,
-        file_path=file_path,
-        is_primary=is_primary,
-    )
-    db.add(photo)
+    photos = [
+        PotPhoto(
+            pot_id=pot_id,
+            file_path=file_path,
+            is_primary=index == primary_index,
+            **(metadata or {}),
+        )
+        for index, (file_path, metadata) in enumerate(files)
+    ]
+    db.add_all(photos)
     await db.commit()
-    await db.refresh(photo)
 
-    return PotPhotoResponse(
-        id=photo.id,
-        url=f"/uploads/pots/{photo.file_path}",
-        is_primary=photo.is_primary,
-        uploaded_at=photo.uploaded_at,
+    # Thumbnails and responsive variants are rendered after the response
+    background_tasks.add_task(
+        create_batch_variants, "pots", [(photo.id, photo.file_path) for photo in photos]
     )
+
+    return [_photo_response(photo) for photo in photos]
@@ -0,0 +1,201 @@
+"""Push subscription API endpoints."""
+
+from datetime import UTC, datetime
+from uuid import UUID, uuid4
+
+from fastapi import APIRouter, status
+from pydantic import BaseModel, Field
+from sqlmodel import col, or_, select
+
+from app.api.deps import CurrentUser, DbSession
+from app.core.config import get_settings
+from app.core.database import dialect_insert
+from app.models import PushSubscription
+from app.services.outbox import prune_subscriptions
+from app.services.push import probe_subscriptions
+
+router = APIRouter(prefix="/push", tags=["push"])
+settings = get_settings()
+
+
+class PushKeys(BaseModel):
+    """Client keys of a browser push subscription."""
+
+    p256dh: str = Field(min_length=1, max_length=255)
+    auth: str = Field(min_length=1, max_length=255)
+
+
+class SubscribeRequest(BaseModel):
+    """Browser PushSubscription as returned by ``subscription.toJSON()``."""
+
+    endpoint: str = Field(min_length=1, max_length=500)
+    keys: PushKeys
+
+
+class UnsubscribeRequest(BaseModel):
+    """Unsubscribe request."""
+
+    endpoint: str
+
+
+class VapidKeyResponse(BaseModel):
+    """Public VAPID key for ``pushManager.subscribe``."""
+
+    public_key: str | None
+
+
+class SubscriptionResponse(BaseModel):
+    """Push subscription with delivery statistics."""
+
+    id: UUID
+    endpoint: str
+    created_at: datetime
+    success_count: int
+    failure_count: int
+    last_success_at: datetime | None
+    last_failure_at: datetime | None
+    last_error: str | None
+
+
+class ValidateRequest(BaseModel):
+    """Subscriptions to probe; by default those whose last delivery failed."""
+
+    subscription_ids: list[UUID] | None = Field(default=None, min_length=1)
+
+
+class ValidateResponse(BaseModel):
+    """Result of validating subscriptions."""
+
+    checked: int
+    removed: int
+    errors: int
+
+
+@router.get("/vapid-public-key", response_model=VapidKeyResponse)
+async def get_vapid_public_key(_user: CurrentUser) -> VapidKeyResponse:
+    """Get the VAPID public key the client subscribes with."""
+    return VapidKeyResponse(public_key=settings.vapid_public_key or None)
+
+
+@router.post(
+    "/subscribe",
+    response_model=SubscriptionResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def subscribe(
+    request: SubscribeRequest,
+    db: DbSession,
+    _user: CurrentUser,
+) -> SubscriptionResponse:
+    """
+    Register a push subscription.
+
+    Re-subscribing an existing endpoint updates its keys in place: a single
+    ``INSERT ... ON CONFLICT (endpoint) DO UPDATE`` on the unique index.
+    """
+    statement = dialect_insert(db, PushSubscription).values(
+        id=uuid4(),
+        endpoint=request.endpoint,
+        p256dh_key=request.keys.p256dh,
+        auth_key=request.keys.auth,
+        created_at=datetime.now(UTC),
+        success_count=0,
+        failure_count=0,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[PushSubscription.endpoint],
+        set_={
+            "p256dh_key": statement.excluded.p256dh_key,
+            "auth_key": statement.excluded.auth_key,
+        },
+    )
+    result = await db.exec(
+        statement.returning(PushSubscription),
+        execution_options={"populate_existing": True},
+    )
+    subscription = result.scalar_one()
+    await db.commit()
+
+    return _to_response(subscription)
+
+
+@router.delete("/subscribe", status_code=status.HTTP_204_NO_CONTENT)
+async def unsubscribe(
+    request: UnsubscribeRequest,
+    db: DbSession,
+    _user: CurrentUser,
+) -> None:
+    """Remove a push subscription. Unknown endpoints are ignored."""
+    subscription_result = await db.exec(
+        select(PushSubscription.id).where(PushSubscription.endpoint == request.endpoint)
+    )
+    await prune_subscriptions(db, set(subscription_result.all()))
+    await db.commit()
+
+
+@router.get("/subscriptions", response_model=list[SubscriptionResponse])
+async def list_subscriptions(
+    db: DbSession,
+    _user: CurrentUser,
+) -> list[SubscriptionResponse]:
+    """List push subscriptions with their delivery statistics."""
+    result = await db.exec(select(PushSubscription).order_by(col(PushSubscription.created_at)))
+    return [_to_response(s) for s in result.all()]
+
+
+@router.post("/subscriptions/validate", response_model=ValidateResponse)
+async def validate_subscriptions(
+    db: DbSession,
+    _user: CurrentUser,
+    request: ValidateRequest | None = None,
+) -> ValidateResponse:
+    """
+    Probe subscriptions concurrently and prune the dead ones.
+
+    A probe is a real push message that may show up on the device, so only
+    the given subscriptions are probed, or by default the failing ones
+    (last delivery failed); healthy devices are left alone.
+
+    Endpoints the push service reports as gone (404/410) are deleted in a
+    single statement. Other failures are counted but kept, since they may be
+    transient.
+    """
+    query = select(PushSubscription)
+    if request is not None and request.subscription_ids is not None:
+        query = query.where(col(PushSubscription.id).in_(request.subscription_ids))
+    else:
+        last_failure_at = col(PushSubscription.last_failure_at)
+        last_success_at = col(PushSubscription.last_success_at)
+        query = query.where(
+            last_failure_at.is_not(None),
+            or_(last_success_at.is_(None), last_failure_at > last_success_at),
+        )
+    result = await db.exec(query)
+    subscriptions = result.all()
+
+    probes = await probe_subscriptions(list(subscriptions))
+
+    gone_ids = {
+        subscription.id
+        for subscription, probe_result in zip(subscriptions, probes, strict=True)
+        if probe_result.is_gone
+    }
+    errors = sum(1 for p in probes if not p.success and not p.is_gone)
+
+    removed = await prune_subscriptions(db, gone_ids)
+    await db.commit()
+
+    return ValidateResponse(checked=len(subscriptions), removed=removed, errors=errors)
+
+
+def _to_response(subscription: PushSubscription) -> SubscriptionResponse:
+    return SubscriptionResponse(
+        id=subscription.id,
+        endpoint=subscription.endpoint,
+        created_at=subscription.created_at,
+        success_count=subscription.success_count,
+        failure_count=subscription.failure_count,
+        last_success_at=subscription.last_success_at,
+        last_failure_at=subscription.last_failure_at,
+        last_error=subscription.last_error,
+    )
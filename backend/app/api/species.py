@@ -0,0 +1,45 @@
+"""Species catalogue API endpoints."""
+
+from typing import Annotated
+
+from fastapi import APIRouter, Query
+from pydantic import BaseModel
+
+from app.api.deps import CurrentUser, DbSession
+from app.services.species import search_species
+
+router = APIRouter(prefix="/species", tags=["species"])
+
+
+class SpeciesResponse(BaseModel):
+    """Species catalogue entry."""
+
+    scientific_name: str
+    common_names: list[str]
+    genus: str
+    family: str
+
+
+@router.get("", response_model=list[SpeciesResponse])
+async def list_species(
+    _user: CurrentUser,
+    db: DbSession,
+    q: Annotated[str, Query(min_length=1, max_length=100)],
+    limit: Annotated[int, Query(ge=1, le=50)] = 10,
+) -> list[SpeciesResponse]:
+    """
+    Autocomplete species by scientific or common name prefix.
+
+    The catalogue is filled from identification results and the bundled
+    seed list, so lookups never use PlantNet quota.
+    """
+    species = await search_species(db, q, limit)
+    return [
+        SpeciesResponse(
+            scientific_name=s.scientific_name,
+            common_names=s.common_names,
+            genus=s.genus,
+            family=s.family,
+        )
+        for s in species
+    ]
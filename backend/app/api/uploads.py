@@ -0,0 +1,120 @@
+"""Uploaded photo serving and direct uploads."""
+
+from datetime import UTC, datetime
+from email.utils import format_datetime
+from uuid import UUID
+
+from fastapi import APIRouter, HTTPException, Request, Response, UploadFile, status
+from pydantic import BaseModel, Field
+
+from app.core.config import get_settings
+from app.models import ResumableUpload
+from app.services.files import SUBFOLDERS, create_direct_upload
+from app.services.storage import get_storage
+
+settings = get_settings()
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+
+class DirectUploadRequest(BaseModel):
+    """Request to upload a photo straight to storage."""
+
+    filename: str
+    size: int = Field(gt=0)
+    sha256: str = Field(min_length=64, max_length=64)
+
+
+class DirectUploadResponse(BaseModel):
+    """Where to upload a photo; register it afterwards with ``file_path``."""
+
+    file_path: str
+    # None if the content is already stored: skip the PUT
+    upload_url: str | None = None
+    headers: dict[str, str] = {}
+    expires_at: datetime | None = None
+
+
+class DirectUploadComplete(BaseModel):
+    """Register a photo uploaded straight to storage."""
+
+    file_path: str
+
+
+async def direct_upload_response(
+    subfolder: str, request: DirectUploadRequest
+) -> DirectUploadResponse:
+    """Presign a direct upload of a plant or pot photo."""
+    file_path, upload = await create_direct_upload(
+        subfolder, request.filename, request.size, request.sha256
+    )
+    if upload is None:
+        return DirectUploadResponse(file_path=file_path)
+    return DirectUploadResponse(
+        file_path=file_path,
+        upload_url=upload.url,
+        headers=upload.headers,
+        expires_at=upload.expires_at,
+    )
+
+
+class ResumableUploadCreate(BaseModel):
+    """Request to start a resumable photo upload."""
+
+    filename: str
+    size: int = Field(gt=0)
+
+
+class ResumableUploadResponse(BaseModel):
+    """State of a resumable upload; send the rest starting at ``offset``."""
+
+    id: UUID
+    offset: int
+    size: int
+    expires_at: datetime
+
+
+def resumable_upload_headers(upload: ResumableUpload) -> dict[str, str]:
+    """tus-style headers describing a resumable upload."""
+    return {
+        "Upload-Offset": str(upload.received),
+        "Upload-Length": str(upload.size),
+        "Upload-Expires": format_datetime(upload.expires_at.astimezone(UTC), usegmt=True),
+        "Cache-Control": "no-store",
+    }
+
+
+def resumable_upload_response(
+    upload: ResumableUpload, response: Response
+) -> ResumableUploadResponse:
+    """Describe a resumable upload in the body and the headers of ``response``."""
+    response.headers.update(resumable_upload_headers(upload))
+    return ResumableUploadResponse(
+        id=upload.id,
+        offset=upload.received,
+        size=upload.size,
+        expires_at=upload.expires_at,
+    )
+
+
+def validate_photo_batch(files: list[UploadFile], primary_index: int | None) -> None:
+    """Check the size of a multi-file upload and its primary photo index."""
+    if len(files) > settings.upload_batch_max_files:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many files. Maximum: {settings.upload_batch_max_files}",
+        )
+    if primary_index is not None and primary_index >= len(files):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="primary_index is out of range",
+        )
+
+
+@router.api_route("/{key:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def get_upload(key: str, request: Request) -> Response:
+    """Serve a photo or variant (public, like the photo URLs themselves)."""
+    parts = key.split("/")
+    if parts[0] not in SUBFOLDERS or any(not p or p.startswith(".") for p in parts):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return await get_storage().serve(key, request)
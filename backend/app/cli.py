@@ -0,0 +1,106 @@
+"""Maintenance commands.
+
+Run against the configured database and upload directory::
+
+    python -m app.cli backfill-variants [--batch-size 20] [--force]
+    python -m app.cli gc-uploads [--dry-run] [--grace-hours 24] [--trash]
+    python -m app.cli shard-uploads [--batch-size 500]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.core.database import async_session_factory, engine, init_db
+from app.services import photo_variants, storage
+from app.services.files import shard_existing_uploads
+from app.services.upload_gc import collect_orphaned_uploads
+
+
+async def backfill_variants(batch_size: int, force: bool) -> None:
+    """Render variants and read metadata for existing photos."""
+    await init_db()
+    try:
+        processed = await photo_variants.backfill_variants(batch_size, force=force)
+        print(f"Processed {processed} photos")
+    finally:
+        photo_variants.shutdown_executor()
+        await storage.close_storage()
+        await engine.dispose()
+
+
+async def gc_uploads(dry_run: bool, grace_hours: float | None, trash: bool | None) -> None:
+    """Remove uploaded files that no photo references."""
+    await init_db()
+    try:
+        async with async_session_factory() as session:
+            report = await collect_orphaned_uploads(
+                session, dry_run=dry_run, grace_hours=grace_hours, trash=trash
+            )
+    finally:
+        await storage.close_storage()
+        await engine.dispose()
+    action = "Would remove" if dry_run else "Removed"
+    print(
+        f"Scanned {report.scanned} files. {action} {report.orphans} orphans "
+        f"({report.reclaimed_bytes / 1024 / 1024:.1f} MB)"
+    )
+    if report.trash_purged:
+        print(
+            f"Purged {report.trash_purged} trashed files "
+            f"({report.trash_purged_bytes / 1024 / 1024:.1f} MB)"
+        )
+
+
+async def shard_uploads(batch_size: int) -> None:
+    """Move flat uploads into the sharded directory layout."""
+    await init_db()
+    try:
+        moved = await shard_existing_uploads(batch_size)
+        print(f"Moved {moved} photos to the sharded layout")
+    finally:
+        await storage.close_storage()
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Console entry point."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser(
+        "backfill-variants",
+        help="render variants and read metadata of photos uploaded before they existed",
+    )
+    backfill.add_argument("--batch-size", type=int, default=20)
+    backfill.add_argument("--force", action="store_true", help="re-process all photos")
+
+    gc = commands.add_parser("gc-uploads", help="remove uploaded files no photo references")
+    gc.add_argument("--dry-run", action="store_true", help="only report the orphans")
+    gc.add_argument("--grace-hours", type=float, help="minimum age of removed files")
+    gc.add_argument(
+        "--trash",
+        action=argparse.BooleanOptionalAction,
+        help="move orphans to the trash instead of deleting them",
+    )
+
+    shard = commands.add_parser(
+        "shard-uploads", help="move uploads stored flat into the sharded layout"
+    )
+    shard.add_argument("--batch-size", type=int, default=500)
+
+    args = parser.parse_args(argv)
+    if args.command == "backfill-variants":
+        asyncio.run(backfill_variants(args.batch_size, args.force))
+    elif args.command == "gc-uploads":
+        asyncio.run(gc_uploads(args.dry_run, args.grace_hours, args.trash))
+    elif args.command == "shard-uploads":
+        asyncio.run(shard_uploads(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,9 @@
 
 from collections.abc import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
@@ -11,11 +13,29 @@ from app.core.config import get_settings
 
 settings = get_settings()
 
-engine = create_async_engine(
-    settings.database_url,
-    echo=False,
-    future=True,
-)
+
+def create_engine(url: str) -> AsyncEngine:
+    """
+    Create the async engine for ``url``.
+
+    Pool sizing applies to the queue pool of Postgres and file SQLite; an
+    in-memory SQLite database uses a single static connection instead,
+    which rejects those options.
+    """
+    options = {}
+    parsed = make_url(url)
+    in_memory = parsed.get_backend_name() == "sqlite" and (
+        parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory"
+    )
+    if not in_memory:
+        options = {
+            "pool_size": settings.database_pool_size,
+            "max_overflow": settings.database_max_overflow,
+        }
+    return create_async_engine(url, echo=False, future=True, pool_pre_ping=True, **options)
+
+
+engine = create_engine(settings.database_url)
 
 async_session_factory = sessionmaker(  # type: ignore
     engine,
@@ -24,24 +44,76 @@ async_session_factory = sessionmaker(  # type: ignore
 )
 
 
+# Columns added after the initial release. Existing deployments without
+# migrations get them via ALTER TABLE; new installs get them from metadata.
+ADDED_COLUMNS: list[tuple[str, str, str]] = [
+    ("settings", "plantnet_api_key", "VARCHAR(255)"),
+    ("push_subscriptions", "success_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("push_subscriptions", "failure_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("push_subscriptions", "last_success_at", "TIMESTAMP WITH TIME ZONE"),
+    ("push_subscriptions", "last_failure_at", "TIMESTAMP WITH TIME ZONE"),
+    ("push_subscriptions", "last_error", "VARCHAR(500)"),
+    ("plant_identifications", "image_hash", "VARCHAR(64)"),
+    ("plant_identifications", "expires_at", "TIMESTAMP WITH TIME ZONE"),
+    ("plant_identifications", "status", "VARCHAR(20) NOT NULL DEFAULT 'DONE'"),
+    ("plant_identifications", "images", "JSON"),
+    ("plant_identifications", "started_at", "TIMESTAMP WITH TIME ZONE"),
+    ("plant_identifications", "completed_at", "TIMESTAMP WITH TIME ZONE"),
+    ("plant_photos", "variants", "JSON"),
+    ("pot_photos", "variants", "JSON"),
+    ("plant_photos", "width", "INTEGER"),
+    ("plant_photos", "height", "INTEGER"),
+    ("plant_photos", "orientation", "INTEGER"),
+    ("plant_photos", "taken_at", "TIMESTAMP WITH TIME ZONE"),
+    ("plant_photos", "placeholder", "VARCHAR(1000)"),
+    ("pot_photos", "width", "INTEGER"),
+    ("pot_photos", "height", "INTEGER"),
+    ("pot_photos", "orientation", "INTEGER"),
+    ("pot_photos", "taken_at", "TIMESTAMP WITH TIME ZONE"),
+    ("pot_photos", "placeholder", "VARCHAR(1000)"),
+]
+
+# Indexes on added columns; `create_all` only creates them for new tables.
+ADDED_INDEXES: list[tuple[str, str, str]] = [
+    ("ix_plant_identifications_image_hash", "plant_identifications", "image_hash"),
+    ("ix_plant_identifications_status", "plant_identifications", "status"),
+]
+
+
 async def init_db() -> None:
     """Create all database tables."""
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
 
         # Lightweight schema drift fix for existing deployments without migrations.
-        # New installs already get this column from SQLModel metadata.
         if conn.dialect.name == "sqlite":
-            result = await conn.exec_driver_sql("PRAGMA table_info(settings)")
-            column_names = {row[1] for row in result.fetchall()}
-            if "plantnet_api_key" not in column_names:
+            existing: dict[str, set[str]] = {}
+            for table, column, ddl in ADDED_COLUMNS:
+                if table not in existing:
+                    result = await conn.exec_driver_sql(f"PRAGMA table_info({table})")
+                    existing[table] = {row[1] for row in result.fetchall()}
+                if column not in existing[table]:
+                    await conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+        else:
+            for table, column, ddl in ADDED_COLUMNS:
                 await conn.exec_driver_sql(
-                    "ALTER TABLE settings ADD COLUMN plantnet_api_key VARCHAR(255)"
+                    f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {ddl}"
                 )
-        else:
-            await conn.exec_driver_sql(
-                "ALTER TABLE settings ADD COLUMN IF NOT EXISTS plantnet_api_key VARCHAR(255)"
-            )
+
+        for name, table, column in ADDED_INDEXES:
+            await conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})")
+
+
+def dialect_insert(session: AsyncSession, model: type[SQLModel]):
+    """
+    Dialect-specific INSERT supporting ``on_conflict_do_update`` (upserts).
+
+    PostgreSQL and SQLite share the ``ON CONFLICT`` syntax, but SQLAlchemy
+    exposes it through their dialect-specific ``insert`` constructs.
+    """
+    if session.bind.dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
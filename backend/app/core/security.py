@@ -1,8 +1,22 @@
-"""Security utilities for authentication."""
+"""Security utilities for authentication.
 
+bcrypt is deliberately slow (~250 ms at the default cost), so the async
+handlers hash and verify passwords on a small dedicated thread pool instead
+of blocking the event loop. bcrypt releases the GIL, so the pool bounds the
+CPU spent on it; hashes beyond ``password_hash_max_pending`` are refused
+with a 503 rather than queued, so a login flood can't pile up work.
+"""
+
+import asyncio
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
+from typing import Any
+from uuid import UUID
 
 import bcrypt
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 
 from app.core.config import get_settings
@@ -11,6 +25,13 @@ settings = get_settings()
 
 ALGORITHM = "HS256"
 
+_executor: ThreadPoolExecutor | None = None
+# Hashes queued or running on the pool. Released when the hash finishes on
+# its thread, not when the awaiting request goes away (a cancelled request
+# doesn't stop a running hash).
+_pending = 0
+_pending_lock = threading.Lock()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
@@ -20,13 +41,74 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     )
 
 
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
-    salt = bcrypt.gensalt()
+def hash_password(password: str, rounds: int | None = None) -> str:
+    """Hash a password using bcrypt (with ``bcrypt_rounds`` by default)."""
+    salt = bcrypt.gensalt(rounds=rounds or settings.bcrypt_rounds)
     hashed = bcrypt.hashpw(password.encode("utf-8"), salt)
     return hashed.decode("utf-8")
 
 
+def needs_rehash(hashed_password: str) -> bool:
+    """Whether a hash was made with another work factor than ``bcrypt_rounds``."""
+    # $2b$12$<salt and hash>
+    parts = hashed_password.split("$")
+    return len(parts) < 4 or not parts[2].isdigit() or int(parts[2]) != settings.bcrypt_rounds
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Thread pool for password hashing."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(settings.password_hash_workers, 1),
+            thread_name_prefix="bcrypt",
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Stop the password hashing threads."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def _release(_future: Future | None = None) -> None:
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+async def _offload(func: Callable[..., Any], *args: Any) -> Any:
+    global _pending
+    with _pending_lock:
+        if _pending >= settings.password_hash_max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many login attempts in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+    try:
+        future = get_executor().submit(func, *args)
+    except BaseException:
+        _release()
+        raise
+    future.add_done_callback(_release)
+    return await asyncio.wrap_future(future)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing pool; 503 when it is saturated."""
+    return await _offload(verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the hashing pool; 503 when it is saturated."""
+    return await _offload(hash_password, password)
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -40,6 +122,25 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     return jwt.encode(to_encode, settings.secret_key, algorithm=ALGORITHM)
 
 
+def job_events_scope(job_id: UUID) -> str:
+    """``scope`` claim of tokens for one job's event stream."""
+    return f"identify_job_events:{job_id}"
+
+
+def create_job_events_token(username: str, job_id: UUID) -> str:
+    """
+    Create a short-lived token for one identification job's event stream.
+
+    Browsers' ``EventSource`` cannot send an Authorization header, so the
+    stream also accepts this token as a query parameter. It is scoped to the
+    job and refused everywhere else, so a leaked URL exposes only that job.
+    """
+    return create_access_token(
+        {"sub": username, "scope": job_events_scope(job_id)},
+        timedelta(seconds=settings.identify_job_events_token_seconds),
+    )
+
+
 def decode_token(token: str) -> dict | None:
     """Decode and validate a JWT token."""
     try:
@@ -2,22 +2,25 @@
 
 from contextlib import asynccontextmanager
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
-from app.api import auth, identify, plants, pots, reminders
+from app.api import auth, identify, plants, pots, push, reminders, species, uploads
 from app.api import settings as settings_api
+from app.core import security
 from app.core.config import get_settings
-from app.core.database import init_db
-from app.scheduler.jobs import check_due_reminders
+from app.core.database import async_session_factory, init_db
+from app.scheduler.runner import create_scheduler
+from app.services import photo_variants, plantnet, storage
+from app.services.identification_jobs import job_workers
+from app.services.push import close_http_client
+from app.services.push_crypto import shutdown_executor
+from app.services.species import seed_species
 
 settings = get_settings()
 
-# APScheduler instance
-scheduler = AsyncIOScheduler()
+# APScheduler instance; periodic jobs only run in the elected leader process
+scheduler = create_scheduler()
 
 
 @asynccontextmanager
@@ -25,24 +28,35 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     # Startup
     await init_db()
+    async with async_session_factory() as session:
+        await seed_species(session, settings.species_seed_file)
 
     # Ensure upload directories exist
     settings.upload_plants_dir.mkdir(parents=True, exist_ok=True)
     settings.upload_pots_dir.mkdir(parents=True, exist_ok=True)
+    settings.upload_identifications_dir.mkdir(parents=True, exist_ok=True)
 
-    # Start scheduler
-    scheduler.add_job(
-        check_due_reminders,
-        CronTrigger(minute="*"),  # Run every minute
-        id="reminder_checker",
-        replace_existing=True,
-    )
-    scheduler.start()
+    # Shared HTTP client for PlantNet
+    await plantnet.start_client()
+
+    # Workers for asynchronous identification jobs
+    job_workers.start(settings.identify_job_workers)
+
+    # Start scheduler (unless a standalone worker runs the background jobs)
+    if settings.scheduler_enabled:
+        scheduler.start()
 
     yield
 
     # Shutdown
-    scheduler.shutdown()
+    await job_workers.stop()
+    await scheduler.shutdown()
+    await close_http_client()
+    shutdown_executor()
+    photo_variants.shutdown_executor()
+    security.shutdown_executor()
+    await plantnet.close_client()
+    await storage.close_storage()
 
 
 app = FastAPI(
@@ -61,16 +75,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory=settings.upload_dir), name="uploads")
+# Uploaded photos (from local storage, or redirects to S3)
+app.include_router(uploads.router)
 
 # Include routers
 app.include_router(auth.router, prefix="/api")
 app.include_router(identify.router, prefix="/api")
 app.include_router(plants.router, prefix="/api")
 app.include_router(pots.router, prefix="/api")
+app.include_router(push.router, prefix="/api")
 app.include_router(reminders.router, prefix="/api")
 app.include_router(settings_api.router, prefix="/api")
+app.include_router(species.router, prefix="/api")
 
 
 @app.get("/api/health")
@@ -1,11 +1,14 @@
 """Database models."""
 
-from app.models.identification import OrganType, PlantIdentification
+from app.models.identification import IdentificationStatus, OrganType, PlantIdentification
 from app.models.plant import CareEvent, CareEventType, Plant, PlantPhoto
 from app.models.pot import Pot, PotPhoto
-from app.models.push import PushSubscription
+from app.models.push import PushOutbox, PushOutboxStatus, PushSubscription
 from app.models.reminder import Reminder, ReminderType
+from app.models.resumable_upload import ResumableUpload
 from app.models.settings import Settings
+from app.models.species import Species, SpeciesName
+from app.models.stored_file import StoredFile
 
 __all__ = [
     "Settings",
@@ -18,6 +21,13 @@ __all__ = [
     "Reminder",
     "ReminderType",
     "PlantIdentification",
+    "IdentificationStatus",
     "OrganType",
     "PushSubscription",
+    "PushOutbox",
+    "PushOutboxStatus",
+    "Species",
+    "SpeciesName",
+    "StoredFile",
+    "ResumableUpload",
 ]
@@ -4,7 +4,7 @@ from datetime import UTC, datetime
 from enum import Enum
 from uuid import UUID, uuid4
 
-from sqlalchemy import JSON, Column, DateTime
+from sqlalchemy import JSON, Column, DateTime, String
 from sqlmodel import Field, SQLModel
 
 
@@ -17,18 +17,54 @@ class OrganType(str, Enum):
     BARK = "BARK"
 
 
+class IdentificationStatus(str, Enum):
+    """Processing states of an identification job."""
+
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+
 class PlantIdentification(SQLModel, table=True):
-    """A plant identification request and result."""
+    """
+    A plant identification request and result.
+
+    Rows with an ``image_hash`` double as the identification cache: results
+    for the same image and organ are reused until ``expires_at``. Rows with
+    ``images`` are asynchronous identification jobs; the uploaded files are
+    kept until the job has finished.
+    """
 
     __tablename__ = "plant_identifications"
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     plant_id: UUID | None = Field(default=None, foreign_key="plants.id", index=True)
-    photo_path: str = Field(max_length=500)
+    photo_path: str = Field(default="", max_length=500)
     organ: OrganType
+    image_hash: str | None = Field(default=None, max_length=64, index=True)
     results: dict = Field(default_factory=dict, sa_column=Column(JSON))
+    status: IdentificationStatus = Field(
+        default=IdentificationStatus.DONE,
+        sa_column=Column(String(20), nullable=False, index=True, server_default="DONE"),
+    )
+    images: list[dict] | None = Field(
+        default=None, sa_column=Column(JSON(none_as_null=True), nullable=True)
+    )
     selected_species: str | None = Field(default=None, max_length=200)
     requested_at: datetime = Field(
         default_factory=lambda: datetime.now(UTC),
         sa_column=Column(DateTime(timezone=True), nullable=False),
     )
+    expires_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+    )
+    started_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+    )
+    completed_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+    )
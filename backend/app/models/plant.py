@@ -5,7 +5,7 @@ from enum import Enum
 from typing import Optional
 from uuid import UUID, uuid4
 
-from sqlalchemy import Column, DateTime
+from sqlalchemy import JSON, Column, DateTime
 from sqlalchemy.orm import relationship as sa_relationship
 from sqlmodel import Field, Relationship, SQLModel
 
@@ -68,6 +68,18 @@ class PlantPhoto(SQLModel, table=True):
     plant_id: UUID = Field(foreign_key="plants.id", index=True)
     file_path: str = Field(max_length=500)
     is_primary: bool = Field(default=False)
+    # Resized WebP/AVIF copies; NULL until generated, empty if not decodable
+    variants: list[dict] | None = Field(
+        default=None, sa_column=Column(JSON(none_as_null=True), nullable=True)
+    )
+    # Read from the file on upload; NULL until read, or if not decodable
+    width: int | None = Field(default=None)  # As displayed (EXIF orientation applied)
+    height: int | None = Field(default=None)
+    orientation: int | None = Field(default=None)  # EXIF orientation (1-8)
+    taken_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True), nullable=True)
+    )
+    placeholder: str | None = Field(default=None, max_length=1000)  # Tiny WebP data URI
     uploaded_at: datetime = Field(
         default_factory=lambda: datetime.now(UTC),
         sa_column=Column(DateTime(timezone=True), nullable=False),
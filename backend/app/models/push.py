@@ -1,9 +1,10 @@
-"""PushSubscription model."""
+"""PushSubscription and PushOutbox models."""
 
 from datetime import UTC, datetime
+from enum import Enum
 from uuid import UUID, uuid4
 
-from sqlalchemy import Column, DateTime
+from sqlalchemy import JSON, Column, DateTime, Index
 from sqlmodel import Field, SQLModel
 
 
@@ -20,3 +21,55 @@ class PushSubscription(SQLModel, table=True):
         default_factory=lambda: datetime.now(UTC),
         sa_column=Column(DateTime(timezone=True), nullable=False),
     )
+
+    # Delivery statistics (maintained by the outbox worker)
+    success_count: int = Field(default=0)
+    failure_count: int = Field(default=0)
+    last_success_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+    )
+    last_failure_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+    )
+    last_error: str | None = Field(default=None, max_length=500)
+
+
+class PushOutboxStatus(str, Enum):
+    """Delivery states of an outbox entry."""
+
+    PENDING = "PENDING"
+    SENT = "SENT"
+    FAILED = "FAILED"
+
+
+class PushOutbox(SQLModel, table=True):
+    """A queued push notification for a single subscription."""
+
+    __tablename__ = "push_outbox"
+    __table_args__ = (Index("ix_push_outbox_due", "status", "next_attempt_at"),)
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    subscription_id: UUID = Field(
+        foreign_key="push_subscriptions.id", index=True, ondelete="CASCADE"
+    )
+    reminder_id: UUID | None = Field(
+        default=None, foreign_key="reminders.id", index=True, ondelete="SET NULL"
+    )
+    payload: dict = Field(default_factory=dict, sa_column=Column(JSON))
+    status: PushOutboxStatus = Field(default=PushOutboxStatus.PENDING)
+    attempts: int = Field(default=0)
+    next_attempt_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+    last_error: str | None = Field(default=None, max_length=500)
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+    sent_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+    )
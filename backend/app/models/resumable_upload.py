@@ -0,0 +1,34 @@
+"""Resumable upload model."""
+
+from datetime import UTC, datetime
+from uuid import UUID, uuid4
+
+from sqlalchemy import Column, DateTime
+from sqlmodel import Field, SQLModel
+
+
+class ResumableUpload(SQLModel, table=True):
+    """
+    A photo upload sent in chunks, which can be resumed after a failure.
+
+    The chunks are appended to a staging file; ``received`` is the offset
+    the next chunk must start at. The upload becomes a photo of the plant or
+    pot ``owner_id`` once all ``size`` bytes are received.
+    """
+
+    __tablename__ = "resumable_uploads"
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    subfolder: str = Field(max_length=20)
+    owner_id: UUID = Field(index=True)
+    filename: str = Field(max_length=255)
+    size: int
+    received: int = Field(default=0)
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+    # Pushed back by every chunk
+    expires_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False, index=True)
+    )
@@ -0,0 +1,38 @@
+"""Species catalogue models."""
+
+from datetime import UTC, datetime
+from uuid import UUID, uuid4
+
+from sqlalchemy import JSON, Column, DateTime, String, UniqueConstraint
+from sqlmodel import Field, SQLModel
+
+# Byte-wise ordering on PostgreSQL, so prefix range scans can use the index
+# regardless of the database collation. SQLite already compares bytes.
+SearchName = String(200).with_variant(String(200, collation="C"), "postgresql")
+
+
+class Species(SQLModel, table=True):
+    """A plant species known from identifications or the bundled seed list."""
+
+    __tablename__ = "species"
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    scientific_name: str = Field(max_length=200, unique=True)
+    common_names: list[str] = Field(default_factory=list, sa_column=Column(JSON))
+    genus: str = Field(default="", max_length=100)
+    family: str = Field(default="", max_length=100)
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+
+
+class SpeciesName(SQLModel, table=True):
+    """A normalized searchable name (scientific or common) of a species."""
+
+    __tablename__ = "species_names"
+    __table_args__ = (UniqueConstraint("species_id", "name"),)
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    species_id: UUID = Field(foreign_key="species.id", index=True, ondelete="CASCADE")
+    name: str = Field(sa_column=Column(SearchName, nullable=False, index=True))
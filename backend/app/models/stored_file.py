@@ -0,0 +1,32 @@
+"""Content-addressed upload model."""
+
+from datetime import UTC, datetime
+from uuid import UUID, uuid4
+
+from sqlalchemy import Column, DateTime, UniqueConstraint
+from sqlmodel import Field, SQLModel
+
+
+class StoredFile(SQLModel, table=True):
+    """
+    An uploaded file stored once per content hash.
+
+    ``ref_count`` is the number of photo rows using the file. When the last
+    of them is deleted, so is this row, but not the file: a concurrent
+    upload of the same content may be reusing it, so unreferenced files are
+    left to the orphan collector (``app.services.upload_gc``).
+    """
+
+    __tablename__ = "stored_files"
+    __table_args__ = (UniqueConstraint("subfolder", "file_path"),)
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    subfolder: str = Field(max_length=20)
+    file_path: str = Field(max_length=500)
+    sha256: str = Field(max_length=64, index=True)
+    size: int
+    ref_count: int = Field(default=1)
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
@@ -1,20 +1,30 @@
-"""Scheduler jobs for reminders."""
+"""Scheduler jobs for reminders and housekeeping."""
 
 from datetime import UTC, datetime, timedelta
 
-from sqlmodel import select
+from sqlmodel import col, select
 
 from app.core.database import async_session_factory
-from app.models import Plant, PushSubscription, Reminder
-from app.services.push import send_reminder_notification
+from app.models import Plant, PushOutbox, PushSubscription, Reminder
+from app.services.identification import prune_identification_cache
+from app.services.identification_jobs import prune_jobs
+from app.services.outbox import deliver_outbox_batch, enqueue_notification, prune_outbox
+from app.services.push import reminder_notification_payload
+from app.services.resumable_uploads import expire_resumable_uploads
+from app.services.upload_gc import collect_orphaned_uploads
+
+# Anti-spam window: a reminder is queued at most once per window
+NOTIFY_INTERVAL = timedelta(hours=24)
 
 
 async def check_due_reminders() -> None:
     """
-    Check for due reminders and send push notifications.
+    Check for due reminders and queue push notifications.
 
     This job runs every minute via APScheduler.
-    It checks for enabled reminders that are due and haven't been notified recently.
+    It checks for enabled reminders that are due and haven't been notified recently,
+    and writes one outbox entry per subscription. Delivery happens in
+    ``deliver_push_outbox``, which also stamps ``last_notified`` on success.
     """
     async with async_session_factory() as session:
         now = datetime.now(UTC)
@@ -34,13 +44,27 @@ async def check_due_reminders() -> None:
             return
 
         # Get all push subscriptions
-        sub_result = await session.exec(select(PushSubscription))
-        subscriptions = sub_result.all()
+        sub_result = await session.exec(select(PushSubscription.id))
+        subscription_ids = sub_result.all()
 
-        if not subscriptions:
+        if not subscription_ids:
             return
 
+        # Reminders already queued within the window (delivered or not)
+        queued_result = await session.exec(
+            select(PushOutbox.reminder_id)
+            .where(
+                col(PushOutbox.reminder_id).in_([r.id for r in due_reminders]),
+                PushOutbox.created_at >= now - NOTIFY_INTERVAL,
+            )
+            .distinct()
+        )
+        queued_reminder_ids = set(queued_result.all())
+
         for reminder in due_reminders:
+            if reminder.id in queued_reminder_ids:
+                continue
+
             # Check if we recently notified (anti-spam: once every 24h)
             if reminder.last_notified:
                 last_notified = reminder.last_notified
@@ -48,7 +72,7 @@ async def check_due_reminders() -> None:
                     last_notified = last_notified.replace(tzinfo=UTC)
 
                 time_since = now - last_notified
-                if time_since < timedelta(hours=24):
+                if time_since < NOTIFY_INTERVAL:
                     continue
 
             # Get plant name
@@ -60,15 +84,52 @@ async def check_due_reminders() -> None:
             if not plant:
                 continue
 
-            # Send notification to all subscriptions
-            for subscription in subscriptions:
-                await send_reminder_notification(
-                    subscription=subscription,
+            # Queue notification for all subscriptions
+            enqueue_notification(
+                session,
+                subscription_ids,
+                reminder_notification_payload(
                     plant_name=plant.name,
                     reminder_type=reminder.reminder_type.value,
-                )
-
-            # Update last_notified
-            reminder.last_notified = now
-            session.add(reminder)
+                ),
+                reminder_id=reminder.id,
+            )
             await session.commit()
+
+
+async def deliver_push_outbox() -> None:
+    """
+    Deliver queued push notifications.
+
+    Drains the outbox batch by batch until no due entries are left.
+    """
+    while True:
+        async with async_session_factory() as session:
+            processed = await deliver_outbox_batch(session)
+        if not processed:
+            return
+
+
+async def prune_push_outbox() -> None:
+    """Remove delivered and failed outbox entries past their retention."""
+    async with async_session_factory() as session:
+        await prune_outbox(session)
+
+
+async def prune_identifications() -> None:
+    """Remove expired identification cache entries and old jobs."""
+    async with async_session_factory() as session:
+        await prune_identification_cache(session)
+        await prune_jobs(session)
+
+
+async def collect_upload_orphans() -> None:
+    """Delete (or trash) uploaded files no photo references any more."""
+    async with async_session_factory() as session:
+        await collect_orphaned_uploads(session)
+
+
+async def expire_abandoned_uploads() -> None:
+    """Delete resumable uploads that were not resumed in time."""
+    async with async_session_factory() as session:
+        await expire_resumable_uploads(session)
@@ -0,0 +1,138 @@
+"""Scheduler leader election.
+
+Only one process may run the periodic jobs, otherwise every API worker would
+send the same reminders. On PostgreSQL leadership is a session-level advisory
+lock held on a dedicated connection; on SQLite it is an exclusive ``flock``
+on a lock file. Both are released by the database or the OS as soon as the
+holder dies, so a standby process takes over at its next poll.
+"""
+
+import fcntl
+import logging
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide advisory lock id ("kratzbau" in ASCII)
+SCHEDULER_LOCK_KEY = 0x6B7261747A626175
+
+
+class LeaderLock(ABC):
+    """A lock that at most one process can hold at a time."""
+
+    @abstractmethod
+    async def acquire(self) -> bool:
+        """Try to become leader without blocking. Returns True on success."""
+
+    @abstractmethod
+    async def is_held(self) -> bool:
+        """Heartbeat: check that leadership is still held."""
+
+    @abstractmethod
+    async def release(self) -> None:
+        """Give up leadership."""
+
+
+class AdvisoryLeaderLock(LeaderLock):
+    """PostgreSQL advisory lock on a dedicated autocommit connection."""
+
+    def __init__(self, engine: AsyncEngine, key: int = SCHEDULER_LOCK_KEY):
+        self._engine = engine
+        self._key = key
+        self._conn: AsyncConnection | None = None
+
+    async def acquire(self) -> bool:
+        if self._conn is not None:
+            return await self.is_held()
+
+        conn = await self._engine.connect()
+        try:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            result = await conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self._key}
+            )
+            acquired = bool(result.scalar())
+        except Exception:
+            await conn.close()
+            raise
+
+        if not acquired:
+            await conn.close()
+            return False
+
+        self._conn = conn
+        return True
+
+    async def is_held(self) -> bool:
+        if self._conn is None:
+            return False
+        try:
+            await self._conn.execute(text("SELECT 1"))
+        except Exception:
+            # The connection is gone, and with it the lock
+            logger.warning("Lost scheduler leader connection", exc_info=True)
+            await self._discard()
+            return False
+        return True
+
+    async def release(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            await self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self._key})
+        finally:
+            await self._discard()
+
+    async def _discard(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                await conn.invalidate()
+            except Exception:
+                logger.debug("Failed to invalidate leader connection", exc_info=True)
+
+
+class FileLeaderLock(LeaderLock):
+    """Exclusive ``flock`` on a lock file, for single-host SQLite setups."""
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._fd: int | None = None
+
+    async def acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    async def is_held(self) -> bool:
+        return self._fd is not None
+
+    async def release(self) -> None:
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+def create_leader_lock(engine: AsyncEngine, lock_file: Path) -> LeaderLock:
+    """Pick the leader lock implementation for the configured database."""
+    if engine.dialect.name == "postgresql":
+        return AdvisoryLeaderLock(engine)
+    return FileLeaderLock(lock_file)
@@ -0,0 +1,149 @@
+"""Leader-aware APScheduler runner."""
+
+import logging
+from collections.abc import Callable
+from datetime import UTC, datetime
+from typing import Any
+
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from app.core.config import get_settings
+from app.core.database import engine
+from app.scheduler.jobs import (
+    check_due_reminders,
+    collect_upload_orphans,
+    deliver_push_outbox,
+    expire_abandoned_uploads,
+    prune_identifications,
+    prune_push_outbox,
+)
+from app.scheduler.leader import LeaderLock, create_leader_lock
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+ELECTION_JOB_ID = "leader_election"
+
+
+class LeaderScheduler:
+    """
+    Runs periodic jobs only while this process holds the leader lock.
+
+    Every process polls the lock. The leader heartbeats it on each poll and
+    drops its jobs as soon as the lock is lost; a standby registers them as
+    soon as it wins the lock.
+    """
+
+    def __init__(self, lock: LeaderLock, poll_seconds: int):
+        self.scheduler = AsyncIOScheduler()
+        self.is_leader = False
+        self._lock = lock
+        self._poll_seconds = poll_seconds
+        self._jobs: list[tuple[Callable[..., Any], BaseTrigger, str, dict[str, Any]]] = []
+
+    def add_job(
+        self,
+        func: Callable[..., Any],
+        trigger: BaseTrigger,
+        job_id: str,
+        **kwargs: Any,
+    ) -> None:
+        """Register a job that only runs on the leader."""
+        self._jobs.append((func, trigger, job_id, kwargs))
+
+    def start(self) -> None:
+        """Start polling for leadership."""
+        self.scheduler.add_job(
+            self.elect,
+            IntervalTrigger(seconds=self._poll_seconds),
+            id=ELECTION_JOB_ID,
+            next_run_time=datetime.now(UTC),
+            max_instances=1,
+            coalesce=True,
+        )
+        self.scheduler.start()
+
+    async def shutdown(self) -> None:
+        """Stop the scheduler and hand leadership over."""
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        if self.is_leader:
+            self.is_leader = False
+            await self._lock.release()
+
+    async def elect(self) -> None:
+        """Acquire or heartbeat the leader lock and (de)register jobs."""
+        try:
+            if self.is_leader:
+                if await self._lock.is_held():
+                    return
+                logger.warning("Lost scheduler leadership")
+                self._demote()
+            elif await self._lock.acquire():
+                logger.info("Acquired scheduler leadership")
+                self._promote()
+        except Exception:
+            logger.exception("Scheduler leader election failed")
+            if self.is_leader:
+                self._demote()
+
+    def _promote(self) -> None:
+        self.is_leader = True
+        for func, trigger, job_id, kwargs in self._jobs:
+            self.scheduler.add_job(func, trigger, id=job_id, replace_existing=True, **kwargs)
+
+    def _demote(self) -> None:
+        self.is_leader = False
+        for _, _, job_id, _ in self._jobs:
+            try:
+                self.scheduler.remove_job(job_id)
+            except JobLookupError:
+                pass
+
+
+def create_scheduler() -> LeaderScheduler:
+    """Create the scheduler with all periodic background jobs registered."""
+    runner = LeaderScheduler(
+        create_leader_lock(engine, settings.scheduler_lock_file),
+        poll_seconds=settings.scheduler_leader_poll_seconds,
+    )
+    runner.add_job(
+        check_due_reminders,
+        CronTrigger(minute="*"),  # Run every minute
+        "reminder_checker",
+    )
+    runner.add_job(
+        deliver_push_outbox,
+        IntervalTrigger(seconds=settings.push_outbox_interval_seconds),
+        "push_outbox",
+        max_instances=1,
+        coalesce=True,
+    )
+    runner.add_job(
+        prune_push_outbox,
+        CronTrigger(hour=3, minute=0),  # Run daily
+        "push_outbox_pruner",
+    )
+    runner.add_job(
+        prune_identifications,
+        CronTrigger(hour=3, minute=30),  # Run daily
+        "identification_cache_pruner",
+    )
+    runner.add_job(
+        collect_upload_orphans,
+        CronTrigger(hour=4, minute=0),  # Run daily
+        "upload_gc",
+        max_instances=1,
+    )
+    runner.add_job(
+        expire_abandoned_uploads,
+        CronTrigger(minute=15),  # Run hourly
+        "resumable_upload_expiry",
+        max_instances=1,
+    )
+    return runner
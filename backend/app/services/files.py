@@ -1,78 +1,517 @@
-"""File upload service."""
+"""File upload service.
 
+Uploads are content-addressed: a file is named after the SHA-256 of its
+bytes, so identical uploads are stored once per subfolder and shared by all
+photo rows using them. A ``stored_files`` row counts the references. When
+the last one is released the file is left to the orphan collector
+(``app.services.upload_gc``): an upload of the same bytes may be reusing
+it meanwhile, which the collector's grace period and reference check
+account for. The same picture uploaded
+for a plant and for a pot is hard-linked between the two subfolders (on
+local storage).
+
+Files are sharded into two directory levels by name (``ab/cd/abcd….jpg``)
+so no directory grows past a few thousand entries. ``file_path`` holds the
+sharded path, so URLs need no special handling; uploads stored flat before
+sharding are moved with ``shard_existing_uploads``.
+
+Files are kept by the configured storage backend (``app.services.storage``)
+under the key ``<subfolder>/<file_path>``. With S3 storage, clients can
+upload straight to the bucket (``create_direct_upload``) and then register
+the file (``register_direct_upload``).
+
+Photo metadata (dimensions, capture time, placeholder) is read from the
+temporary file of a regular upload before it is stored; for direct uploads
+it is read with the variants in the background.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import posixpath
+import re
+import shutil
 import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime
 from pathlib import Path
 
 from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import delete, update
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import get_settings
+from app.core.database import async_session_factory, dialect_insert
+from app.models import PlantPhoto, PotPhoto, StoredFile
+from app.services.images import read_photo_metadata
+from app.services.storage import LocalStorage, PresignedUpload, get_storage
+
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+CHUNK_SIZE = 256 * 1024  # 256 KB
+SUBFOLDERS = ("plants", "pots")
+PHOTO_MODELS: dict[str, type[PlantPhoto] | type[PotPhoto]] = {
+    "plants": PlantPhoto,
+    "pots": PotPhoto,
+}
+# Name of a content-addressed file: <sha256><ext>
+HASHED_NAME = re.compile(r"^(?P<sha256>[0-9a-f]{64})\.\w+$")
 
 
-async def save_upload_file(file: UploadFile, subfolder: str) -> str:
+@dataclass(frozen=True)
+class SavedUpload:
+    """A stored upload and the photo metadata read from it."""
+
+    file_path: str
+    sha256: str
+    size: int
+    # Fields for the photo row, see ``read_photo_metadata``; None if not decodable
+    metadata: dict | None
+
+
+def _upload_dir(subfolder: str) -> Path:
+    if subfolder == "plants":
+        return settings.upload_plants_dir
+    return settings.upload_pots_dir
+
+
+def shard_path(file_name: str) -> str:
+    """Relative path of a file in the sharded layout: ``ab/cd/abcd….jpg``."""
+    return f"{file_name[:2]}/{file_name[2:4]}/{file_name}"
+
+
+async def save_upload_file(file: UploadFile, subfolder: str, session: AsyncSession) -> SavedUpload:
     """
-    Save an uploaded file and return the relative path.
+    Save an uploaded file and read its photo metadata.
+
+    The upload is streamed to a temporary file in ``CHUNK_SIZE`` chunks, with
+    disk writes and hashing in a worker thread, and aborted as soon as it
+    exceeds ``MAX_FILE_SIZE``. A complete file is renamed to its content
+    hash, or dropped if that content is already stored. The metadata is read
+    from the temporary file in a worker thread before that.
 
     Args:
         file: The uploaded file
         subfolder: Subdirectory (e.g., 'plants' or 'pots')
+        session: Database session; the file reference is added to it and
+            committed together with the caller's photo row
 
     Returns:
-        Relative file path for storage in database
+        Relative (sharded) file path for storage in database, and metadata
+    """
+    saved = await _receive_upload_file(file, subfolder)
+    await _add_reference(session, subfolder, saved.file_path, saved.sha256, saved.size)
+    return saved
+
+
+async def save_upload_files(
+    files: Sequence[UploadFile], subfolder: str, session: AsyncSession
+) -> list[SavedUpload]:
     """
+    Save several uploaded files concurrently, like ``save_upload_file``.
+
+    All file names are validated before anything is stored. At most
+    ``upload_batch_concurrency`` files are streamed, hashed and stored at a
+    time; if one fails, the error is raised once the others have finished
+    (files already stored are left to the orphan collector).
+
+    Args:
+        files: The uploaded files
+        subfolder: Subdirectory (e.g., 'plants' or 'pots')
+        session: Database session; the file references are added to it and
+            committed together with the caller's photo rows
+
+    Returns:
+        The saved files, in the order of ``files``
+    """
+    for file in files:
+        _validate_upload(file)
+
+    semaphore = asyncio.Semaphore(settings.upload_batch_concurrency)
+
+    async def receive(file: UploadFile) -> SavedUpload:
+        async with semaphore:
+            return await _receive_upload_file(file, subfolder)
+
+    results = await asyncio.gather(*(receive(file) for file in files), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+    # The session is not safe for concurrent use: references are added in turn
+    for saved in results:
+        await _add_reference(session, subfolder, saved.file_path, saved.sha256, saved.size)
+    return results
+
+
+def _validate_upload(file: UploadFile) -> str:
     if not file.filename:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No filename provided",
         )
+    return validate_extension(file.filename)
+
 
-    # Validate extension
-    ext = Path(file.filename).suffix.lower()
+async def _receive_upload_file(file: UploadFile, subfolder: str) -> SavedUpload:
+    """Stream, hash and store an upload (without its reference)."""
+    ext = _validate_upload(file)
+
+    # Create upload directory if it doesn't exist
+    upload_dir = _upload_dir(subfolder)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+
+    # Stream to a temporary file next to the target, then move it into place
+    temp_path = upload_dir / f".{uuid.uuid4()}.part"
+    try:
+        sha256, size = await _stream_to_file(file, temp_path)
+        return await _store(subfolder, temp_path, ext, sha256, size)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+async def store_received_file(
+    session: AsyncSession, subfolder: str, path: Path, ext: str, sha256: str, size: int
+) -> SavedUpload:
+    """
+    Store a completely received upload under its content hash.
+
+    Args:
+        session: Database session; the file reference is added to it
+        subfolder: Subdirectory (e.g., 'plants' or 'pots')
+        path: Local file, consumed by the storage backend
+        ext: Validated file extension
+        sha256: Hex SHA-256 of the content
+        size: Size of the content
+
+    Returns:
+        Relative (sharded) file path and metadata
+    """
+    saved = await _store(subfolder, path, ext, sha256, size)
+    await _add_reference(session, subfolder, saved.file_path, sha256, size)
+    return saved
+
+
+async def _store(subfolder: str, path: Path, ext: str, sha256: str, size: int) -> SavedUpload:
+    metadata = await asyncio.to_thread(read_photo_metadata, path)
+    file_name = shard_path(f"{sha256}{ext}")
+    siblings = [f"{other}/{file_name}" for other in SUBFOLDERS if other != subfolder]
+    await get_storage().save(path, f"{subfolder}/{file_name}", siblings)
+    return SavedUpload(file_name, sha256, size, metadata)
+
+
+def validate_extension(filename: str) -> str:
+    ext = Path(filename).suffix.lower()
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File type not allowed. Allowed: {', '.join(ALLOWED_EXTENSIONS)}",
         )
+    return ext
+
+
+async def _add_reference(
+    session: AsyncSession, subfolder: str, file_path: str, sha256: str, size: int
+) -> None:
+    await session.exec(
+        dialect_insert(session, StoredFile)
+        .values(
+            id=uuid.uuid4(),
+            subfolder=subfolder,
+            file_path=file_path,
+            sha256=sha256,
+            size=size,
+            ref_count=1,
+            created_at=datetime.now(UTC),
+        )
+        .on_conflict_do_update(
+            index_elements=["subfolder", "file_path"],
+            set_={"ref_count": StoredFile.ref_count + 1},
+        )
+    )
+
 
-    # Read file content
-    content = await file.read()
+async def create_direct_upload(
+    subfolder: str, filename: str, size: int, sha256: str
+) -> tuple[str, PresignedUpload | None]:
+    """
+    Prepare an upload straight to the storage backend.
+
+    Args:
+        subfolder: Subdirectory (e.g., 'plants' or 'pots')
+        filename: Original file name (for the extension)
+        size: File size in bytes
+        sha256: Hex SHA-256 of the file, computed by the client
 
-    # Validate file size
-    if len(content) > MAX_FILE_SIZE:
+    Returns:
+        The file path to register with ``register_direct_upload``, and the
+        presigned upload, or None if the content is already stored
+    """
+    storage = get_storage()
+    if not storage.direct_uploads:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Direct uploads are not supported by the storage backend",
+        )
+    ext = validate_extension(filename)
+    if size > MAX_FILE_SIZE:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File too large. Maximum size: {MAX_FILE_SIZE // 1024 // 1024}MB",
         )
+    file_path = shard_path(f"{sha256.lower()}{ext}")
+    if not HASHED_NAME.match(posixpath.basename(file_path)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid SHA-256 digest",
+        )
 
-    # Generate unique filename
-    unique_name = f"{uuid.uuid4()}{ext}"
+    key = f"{subfolder}/{file_path}"
+    if await storage.stat(key) is not None:
+        return file_path, None
+    return file_path, await storage.presign_upload(key, size, sha256.lower())
 
-    # Create upload directory if it doesn't exist
-    if subfolder == "plants":
-        upload_dir = settings.upload_plants_dir
-    else:
-        upload_dir = settings.upload_pots_dir
 
-    upload_dir.mkdir(parents=True, exist_ok=True)
+async def register_direct_upload(session: AsyncSession, subfolder: str, file_path: str) -> None:
+    """
+    Add a reference to a file uploaded with ``create_direct_upload``.
+
+    Args:
+        session: Database session; the reference is committed together with
+            the caller's photo row
+        subfolder: Subdirectory (e.g., 'plants' or 'pots')
+        file_path: The file path returned by ``create_direct_upload``
+    """
+    match = HASHED_NAME.match(posixpath.basename(file_path))
+    if match is None or file_path != shard_path(posixpath.basename(file_path)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid file path",
+        )
+    validate_extension(file_path)
+
+    stored = await get_storage().stat(f"{subfolder}/{file_path}")
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File has not been uploaded",
+        )
+    if stored.size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File too large. Maximum size: {MAX_FILE_SIZE // 1024 // 1024}MB",
+        )
+    await _add_reference(session, subfolder, file_path, match["sha256"], stored.size)
 
-    # Save file
-    file_path = upload_dir / unique_name
-    with open(file_path, "wb") as f:
-        f.write(content)
 
-    return unique_name
+async def _stream_to_file(file: UploadFile, path: Path) -> tuple[str, int]:
+    """
+    Copy an upload to ``path`` chunk by chunk, enforcing ``MAX_FILE_SIZE``.
 
+    Returns:
+        The SHA-256 hex digest and size of the content
+    """
+    out = await asyncio.to_thread(open, path, "wb")
+    digest = hashlib.sha256()
+    try:
+        size = 0
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_FILE_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"File too large. Maximum size: {MAX_FILE_SIZE // 1024 // 1024}MB",
+                )
+            await asyncio.to_thread(_write_chunk, out, digest, chunk)
+    finally:
+        await asyncio.to_thread(out.close)
+    return digest.hexdigest(), size
 
-async def delete_upload_file(filename: str, subfolder: str) -> None:
-    """Delete an uploaded file."""
-    if subfolder == "plants":
-        file_path = settings.upload_plants_dir / filename
+
+def _write_chunk(out, digest, chunk: bytes) -> None:
+    out.write(chunk)
+    digest.update(chunk)
+
+
+async def release_upload_file(session: AsyncSession, file_path: str, subfolder: str) -> bool:
+    """
+    Drop one reference to an uploaded file.
+
+    Files without a ``stored_files`` row predate content addressing and
+    belong to a single photo. Content-addressed files are never deleted
+    here, even when unreferenced: a concurrent upload of the same bytes
+    could add a reference between the commit and the deletion.
+
+    Args:
+        session: Database session (not committed)
+        file_path: Relative file path as stored on the photo
+        subfolder: Subdirectory (e.g., 'plants' or 'pots')
+
+    Returns:
+        ``True`` if the file belonged to this photo alone and should be
+        deleted (with ``delete_upload_file``) once the session is committed
+    """
+    result = await session.exec(
+        update(StoredFile)
+        .where(StoredFile.subfolder == subfolder, StoredFile.file_path == file_path)
+        .values(ref_count=StoredFile.ref_count - 1)
+        .returning(StoredFile.ref_count)
+    )
+    ref_count = result.scalar_one_or_none()
+    if ref_count is None:
+        return True
+    if ref_count <= 0:
+        # Unreferenced: the file goes with the next orphan collection
+        await session.exec(
+            delete(StoredFile).where(
+                StoredFile.subfolder == subfolder, StoredFile.file_path == file_path
+            )
+        )
+    return False
+
+
+async def release_photo_files(
+    session: AsyncSession, photos: Sequence[PlantPhoto | PotPhoto], subfolder: str
+) -> list[PlantPhoto | PotPhoto]:
+    """
+    Release the files of photos that are about to be deleted.
+
+    Returns:
+        The photos whose files belonged to them alone; pass them to
+        ``delete_photo_files`` after the deletion is committed
+    """
+    return [
+        photo for photo in photos if await release_upload_file(session, photo.file_path, subfolder)
+    ]
+
+
+async def delete_photo_files(photos: Sequence[PlantPhoto | PotPhoto], subfolder: str) -> None:
+    """Delete the files and variants of photos released by ``release_photo_files``."""
+    for photo in photos:
+        await delete_upload_file(photo.file_path, subfolder, photo.variants)
+
+
+async def delete_upload_file(
+    filename: str, subfolder: str, variants: list[dict] | None = None
+) -> None:
+    """Delete an uploaded file and its variants."""
+    paths = [filename, *(variant["path"] for variant in variants or [])]
+    await get_storage().delete([f"{subfolder}/{path}" for path in paths])
+
+
+def _link_to_shard(root: Path, moves: list[tuple[str, str]]) -> None:
+    """Hard-link (or copy) flat files to their sharded paths."""
+    for old, new in moves:
+        source, target = root / old, root / new
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(source, target)
+        except FileNotFoundError:  # Already moved by an interrupted run, or lost
+            continue
+        except FileExistsError:  # Shared by a photo moved earlier
+            pass
+        except OSError:
+            shutil.copy2(source, target)
+        os.utime(target)
+
+
+def _unlink_flat(root: Path, moves: list[tuple[str, str]]) -> None:
+    for old, _ in moves:
+        (root / old).unlink(missing_ok=True)
+
+
+def _sharded_photo(photo: PlantPhoto | PotPhoto) -> list[tuple[str, str]]:
+    """Point a flat photo and its variants at the sharded layout; returns the moves."""
+    directory = posixpath.dirname(shard_path(photo.file_path))
+    moves = [(photo.file_path, shard_path(photo.file_path))]
+    if photo.variants:
+        variants = []
+        for variant in photo.variants:
+            path = posixpath.join(directory, variant["path"])
+            moves.append((variant["path"], path))
+            variants.append({**variant, "path": path})
+        photo.variants = variants
+    photo.file_path = moves[0][1]
+    return moves
+
+
+async def _shard_stored_file(session: AsyncSession, subfolder: str, old: str, new: str) -> None:
+    """Move a reference row, merging it with one created by a sharded upload of the content."""
+    rows = {
+        row.file_path: row
+        for row in (
+            await session.exec(
+                select(StoredFile).where(
+                    StoredFile.subfolder == subfolder,
+                    col(StoredFile.file_path).in_([old, new]),
+                )
+            )
+        ).all()
+    }
+    if old not in rows:
+        return
+    if new in rows:
+        rows[new].ref_count += rows[old].ref_count
+        session.add(rows[new])
+        await session.delete(rows[old])
     else:
-        file_path = settings.upload_pots_dir / filename
+        rows[old].file_path = new
+        session.add(rows[old])
+    await session.flush()
+
+
+async def shard_existing_uploads(batch_size: int = 500) -> int:
+    """
+    Move uploads stored flat into the sharded layout.
+
+    Each batch of photos is handled in three steps, so URLs keep working
+    throughout and an interrupted run can simply be restarted: the files
+    (and variants) are hard-linked to their sharded paths, the photo and
+    ``stored_files`` rows are rewritten and committed, then the flat files
+    are unlinked. Files left behind by a crash are removed by the orphan
+    collector.
+
+    Args:
+        batch_size: Photos rewritten per transaction
+
+    Returns:
+        Number of photos moved
+    """
+    if not isinstance(get_storage(), LocalStorage):
+        raise RuntimeError("Only uploads on local storage need to be sharded")
+    moved = 0
+    for subfolder, model in PHOTO_MODELS.items():
+        root = _upload_dir(subfolder)
+        while True:
+            async with async_session_factory() as session:
+                result = await session.exec(
+                    select(model)
+                    .where(col(model.file_path).not_like("%/%"))
+                    .order_by(col(model.id))
+                    .limit(batch_size)
+                )
+                photos = result.all()
+                if not photos:
+                    break
+
+                moves = []
+                for photo in photos:
+                    old = photo.file_path
+                    moves += _sharded_photo(photo)
+                    session.add(photo)
+                    await _shard_stored_file(session, subfolder, old, photo.file_path)
+                await asyncio.to_thread(_link_to_shard, root, moves)
+                await session.commit()
+            await asyncio.to_thread(_unlink_flat, root, moves)
 
-    if file_path.exists():
-        file_path.unlink()
+            moved += len(photos)
+            logger.info("Moved %d %s photos to the sharded layout", moved, subfolder)
+    return moved
@@ -0,0 +1,249 @@
+"""Cached plant identification.
+
+Identical photos are common (re-taps, retries, re-identifying a plant), and
+every PlantNet call costs quota. Results are keyed by a SHA-256 of the image
+bytes and organs and stored in ``plant_identifications`` for
+``identify_cache_ttl_days``. A small in-process LRU sits in front of the
+table so repeated lookups skip the database too.
+
+A multi-image identification is cached as one unit. Concurrent misses for
+the same key (double taps, PWA retries) are coalesced: only the first
+request calls PlantNet, the others await its result.
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_settings
+from app.models import OrganType, PlantIdentification
+from app.services.images import prepare_image
+from app.services.plantnet import REJECTED_LOCALLY, PlantImage, identify_plant
+from app.services.species import upsert_species
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+@dataclass
+class IdentifyStats:
+    """Counters for identification requests since process start."""
+
+    requests: int = 0
+    memory_hits: int = 0
+    database_hits: int = 0
+    upstream_calls: int = 0
+    rejected_locally: int = 0
+    coalesced: int = 0
+    errors: int = 0
+    bytes_received: int = 0
+    bytes_uploaded: int = 0
+
+
+stats = IdentifyStats()
+
+# image hash -> (expires_at, result)
+_memory_cache: OrderedDict[str, tuple[datetime, dict]] = OrderedDict()
+# image hash -> result of the identification currently in flight
+_inflight: dict[str, asyncio.Future[dict]] = {}
+
+
+def image_cache_key(images: Sequence[PlantImage]) -> str:
+    """Cache key for a set of images and their organs."""
+    digest = hashlib.sha256()
+    for image in images:
+        digest.update(image.organ.lower().encode())
+        digest.update(b"\0")
+        digest.update(len(image.data).to_bytes(8, "big"))
+        digest.update(image.data)
+    return digest.hexdigest()
+
+
+def clear_memory_cache() -> None:
+    """Drop all in-memory cache entries."""
+    _memory_cache.clear()
+
+
+def reset_stats() -> None:
+    """Reset the identification counters."""
+    global stats
+    stats = IdentifyStats()
+
+
+def get_stats() -> dict:
+    """Identification counters plus current cache and in-flight sizes."""
+    return {
+        **asdict(stats),
+        "memory_entries": len(_memory_cache),
+        "inflight": len(_inflight),
+    }
+
+
+def _memory_get(key: str, now: datetime) -> dict | None:
+    entry = _memory_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, result = entry
+    if expires_at <= now:
+        del _memory_cache[key]
+        return None
+    _memory_cache.move_to_end(key)
+    return result
+
+
+def _memory_put(key: str, expires_at: datetime, result: dict) -> None:
+    _memory_cache[key] = (expires_at, result)
+    _memory_cache.move_to_end(key)
+    while len(_memory_cache) > settings.identify_cache_size:
+        _memory_cache.popitem(last=False)
+
+
+async def _lookup(session: AsyncSession, key: str, now: datetime) -> PlantIdentification | None:
+    result = await session.exec(
+        select(PlantIdentification)
+        .where(
+            PlantIdentification.image_hash == key,
+            PlantIdentification.expires_at > now,
+        )
+        .order_by(col(PlantIdentification.requested_at).desc())
+        .limit(1)
+    )
+    return result.first()
+
+
+async def identify_cached(
+    session: AsyncSession,
+    images: Sequence[PlantImage],
+    api_key: str | None = None,
+) -> dict:
+    """
+    Identify a plant, reusing a cached result for the same images and organs.
+
+    Args:
+        session: Database session
+        images: Uploaded images with their organs (combined as one query)
+        api_key: PlantNet API key override
+
+    Returns:
+        Identification result in the ``identify_plant`` format. Errors are
+        returned as-is and never cached.
+    """
+    stats.requests += 1
+    key = image_cache_key(images)
+
+    cached = _memory_get(key, datetime.now(UTC))
+    if cached is not None:
+        stats.memory_hits += 1
+        return cached
+
+    while (inflight := _inflight.get(key)) is not None:
+        stats.coalesced += 1
+        try:
+            return await asyncio.shield(inflight)
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+            # The leading request was cancelled; take over the call.
+
+    future = asyncio.get_running_loop().create_future()
+    # Mark exceptions as retrieved when no duplicate request was waiting.
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _inflight[key] = future
+    try:
+        result = await _identify_uncached(session, key, images, api_key)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as exc:
+        future.set_exception(exc)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        del _inflight[key]
+
+
+async def _identify_uncached(
+    session: AsyncSession,
+    key: str,
+    images: Sequence[PlantImage],
+    api_key: str | None,
+) -> dict:
+    """Resolve a memory-cache miss from the database or PlantNet."""
+    now = datetime.now(UTC)
+    row = await _lookup(session, key, now)
+    if row is not None:
+        stats.database_hits += 1
+        expires_at = row.expires_at
+        if expires_at.tzinfo is None:  # SQLite drops the timezone
+            expires_at = expires_at.replace(tzinfo=UTC)
+        _memory_put(key, expires_at, row.results)
+        return row.results
+
+    prepared = await asyncio.gather(
+        *(prepare_image(image.data, image.content_type) for image in images)
+    )
+    received = sum(image.original_size for image in prepared)
+    uploaded = sum(len(image.data) for image in prepared)
+    logger.info(
+        "Identification upload: %d image(s), %d -> %d bytes (%d saved)",
+        len(prepared),
+        received,
+        uploaded,
+        received - uploaded,
+    )
+    stats.bytes_received += received
+    result = await identify_plant(
+        images=[
+            PlantImage(image.data, original.organ, image.content_type)
+            for original, image in zip(images, prepared, strict=True)
+        ],
+        api_key=api_key,
+    )
+    if result.pop(REJECTED_LOCALLY, False):
+        stats.rejected_locally += 1
+    else:
+        stats.upstream_calls += 1
+        stats.bytes_uploaded += uploaded
+    if result.get("error"):
+        stats.errors += 1
+        return result
+
+    expires_at = now + timedelta(days=settings.identify_cache_ttl_days)
+    session.add(
+        PlantIdentification(
+            organ=OrganType(images[0].organ.upper()),
+            image_hash=key,
+            results=result,
+            requested_at=now,
+            expires_at=expires_at,
+        )
+    )
+    await upsert_species(session, result.get("results", []))
+    await session.commit()
+    _memory_put(key, expires_at, result)
+    return result
+
+
+async def prune_identification_cache(session: AsyncSession) -> int:
+    """Delete expired cache entries that were never linked to a plant."""
+    result = await session.exec(
+        delete(PlantIdentification).where(
+            col(PlantIdentification.image_hash).is_not(None),
+            col(PlantIdentification.plant_id).is_(None),
+            col(PlantIdentification.selected_species).is_(None),
+            PlantIdentification.expires_at < datetime.now(UTC),
+        )
+    )
+    await session.commit()
+    return result.rowcount
@@ -0,0 +1,313 @@
+"""Asynchronous identification jobs.
+
+``POST /api/identify/jobs`` stores the uploaded images under
+``uploads/identifications/<job id>/`` and a PENDING row in
+``plant_identifications``, then returns immediately. A pool of in-process
+workers claims jobs one at a time, runs the (cached) identification and
+stores the result on the row. Because jobs live in the database, a job
+whose worker died is picked up again once it has been RUNNING for longer
+than ``identify_job_timeout_seconds``; jobs still unfinished after
+``identify_job_retention_hours`` are given up on and pruned.
+"""
+
+import asyncio
+import logging
+import shutil
+from collections import Counter
+from collections.abc import AsyncIterator, Sequence
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from uuid import UUID, uuid4
+
+from sqlalchemy import and_, delete, or_, update
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import async_session_factory
+from app.models import IdentificationStatus, OrganType, PlantIdentification, Settings
+from app.services.identification import identify_cached
+from app.services.plantnet import PlantImage
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+FINISHED_STATUSES = (IdentificationStatus.DONE, IdentificationStatus.FAILED)
+
+# job id -> event set when the job finishes in this process, and the
+# number of watchers of each job; the last watcher to leave drops the event
+_job_events: dict[UUID, asyncio.Event] = {}
+_job_watchers: Counter[UUID] = Counter()
+
+
+def _write_images(job_dir: Path, images: Sequence[PlantImage]) -> list[dict]:
+    job_dir.mkdir(parents=True, exist_ok=True)
+    stored = []
+    for index, image in enumerate(images):
+        (job_dir / str(index)).write_bytes(image.data)
+        stored.append(
+            {
+                "path": f"{job_dir.name}/{index}",
+                "organ": image.organ,
+                "content_type": image.content_type,
+            }
+        )
+    return stored
+
+
+def _read_images(stored: list[dict]) -> list[PlantImage]:
+    return [
+        PlantImage(
+            (settings.upload_identifications_dir / image["path"]).read_bytes(),
+            image["organ"],
+            image["content_type"],
+        )
+        for image in stored
+    ]
+
+
+def _delete_images(job_id: UUID) -> None:
+    shutil.rmtree(settings.upload_identifications_dir / str(job_id), ignore_errors=True)
+
+
+async def create_job(session: AsyncSession, images: Sequence[PlantImage]) -> PlantIdentification:
+    """
+    Store the images and queue an identification job.
+
+    Args:
+        session: Database session
+        images: Uploaded images with their organs
+
+    Returns:
+        The PENDING job
+    """
+    job_id = uuid4()
+    job_dir = settings.upload_identifications_dir / str(job_id)
+    stored = await asyncio.to_thread(_write_images, job_dir, images)
+
+    job = PlantIdentification(
+        id=job_id,
+        photo_path=stored[0]["path"],
+        organ=OrganType(images[0].organ.upper()),
+        status=IdentificationStatus.PENDING,
+        images=stored,
+    )
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    job_workers.wake()
+    return job
+
+
+def _claimable(now: datetime):
+    abandoned = now - timedelta(seconds=settings.identify_job_timeout_seconds)
+    return or_(
+        PlantIdentification.status == IdentificationStatus.PENDING,
+        and_(
+            PlantIdentification.status == IdentificationStatus.RUNNING,
+            PlantIdentification.started_at < abandoned,
+        ),
+    )
+
+
+async def claim_next_job(session: AsyncSession) -> PlantIdentification | None:
+    """
+    Atomically mark the oldest claimable job as RUNNING.
+
+    Claimable jobs are PENDING ones and RUNNING ones whose worker appears to
+    have died. The conditional UPDATE guarantees that only one worker (in
+    any process) wins a given job.
+    """
+    now = datetime.now(UTC)
+    result = await session.exec(
+        select(PlantIdentification.id)
+        .where(col(PlantIdentification.images).is_not(None), _claimable(now))
+        .order_by(col(PlantIdentification.requested_at))
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job_id = result.first()
+    if job_id is None:
+        await session.rollback()
+        return None
+
+    claimed = await session.exec(
+        update(PlantIdentification)
+        .where(PlantIdentification.id == job_id, _claimable(now))
+        .values(status=IdentificationStatus.RUNNING, started_at=now)
+    )
+    await session.commit()
+    if claimed.rowcount != 1:
+        return None
+    return await session.get(PlantIdentification, job_id)
+
+
+async def run_job(session: AsyncSession, job: PlantIdentification) -> None:
+    """Run a claimed job and store its result."""
+    try:
+        images = await asyncio.to_thread(_read_images, job.images)
+        settings_row = await session.get(Settings, 1)
+        api_key = settings_row.plantnet_api_key if settings_row else None
+        result = await identify_cached(session, images, api_key=api_key)
+    except Exception:
+        logger.exception("Identification job %s failed", job.id)
+        result = {
+            "error": "Identification failed",
+            "error_code": "JOB_FAILED",
+            "results": [],
+        }
+
+    job.results = result
+    job.status = IdentificationStatus.FAILED if result.get("error") else IdentificationStatus.DONE
+    job.completed_at = datetime.now(UTC)
+    session.add(job)
+    await session.commit()
+
+    await asyncio.to_thread(_delete_images, job.id)
+    event = _job_events.pop(job.id, None)
+    if event is not None:
+        event.set()
+
+
+async def process_next_job() -> bool:
+    """Claim and run one job; returns ``False`` when there was none."""
+    async with async_session_factory() as session:
+        job = await claim_next_job(session)
+        if job is None:
+            return False
+        await run_job(session, job)
+        return True
+
+
+async def wait_for_job(job_id: UUID, timeout: float) -> None:
+    """Wait until the job finishes in this process, or ``timeout`` seconds."""
+    event = _job_events.setdefault(job_id, asyncio.Event())
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except TimeoutError:
+        pass
+
+
+async def watch_job(job_id: UUID) -> AsyncIterator[PlantIdentification | None]:
+    """
+    Follow a job until it finishes.
+
+    Yields the job whenever its status changes, and ``None`` on each poll
+    without a change (useful as a keep-alive). Jobs finishing in this
+    process are reported immediately; jobs run elsewhere are seen on the
+    next poll. Each poll reads the job in a short-lived session, so a
+    watcher holds no database connection while it waits.
+    """
+    last_status = None
+    _job_watchers[job_id] += 1
+    try:
+        while True:
+            async with async_session_factory() as session:
+                job = await session.get(PlantIdentification, job_id, populate_existing=True)
+            if job is None:  # Pruned meanwhile
+                return
+            if job.status != last_status:
+                last_status = job.status
+                yield job
+                if job.status in FINISHED_STATUSES:
+                    return
+            else:
+                yield None
+            await wait_for_job(job_id, settings.identify_job_poll_seconds)
+    finally:
+        _job_watchers[job_id] -= 1
+        if _job_watchers[job_id] <= 0:
+            del _job_watchers[job_id]
+            _job_events.pop(job_id, None)
+
+
+def _delete_expired_images(job_ids: Sequence[UUID], cutoff: datetime) -> None:
+    for job_id in job_ids:
+        _delete_images(job_id)
+    # Directories of jobs whose row was never committed
+    for job_dir in settings.upload_identifications_dir.glob("*/"):
+        if datetime.fromtimestamp(job_dir.stat().st_mtime, UTC) < cutoff:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+
+async def prune_jobs(session: AsyncSession) -> int:
+    """
+    Delete jobs older than the retention period, with their stored images.
+
+    Finished jobs expire the retention period after completing. Jobs that
+    never finished (no worker picked them up, or they kept being abandoned)
+    expire the same period after they were requested.
+    """
+    cutoff = datetime.now(UTC) - timedelta(hours=settings.identify_job_retention_hours)
+    result = await session.exec(
+        select(PlantIdentification.id).where(
+            col(PlantIdentification.images).is_not(None),
+            col(PlantIdentification.plant_id).is_(None),
+            or_(
+                and_(
+                    col(PlantIdentification.status).in_(FINISHED_STATUSES),
+                    PlantIdentification.completed_at < cutoff,
+                ),
+                and_(
+                    col(PlantIdentification.status).not_in(FINISHED_STATUSES),
+                    PlantIdentification.requested_at < cutoff,
+                ),
+            ),
+        )
+    )
+    job_ids = result.all()
+    if job_ids:
+        await session.exec(
+            delete(PlantIdentification).where(col(PlantIdentification.id).in_(job_ids))
+        )
+    await session.commit()
+    await asyncio.to_thread(_delete_expired_images, job_ids, cutoff)
+    return len(job_ids)
+
+
+class JobWorkerPool:
+    """A fixed number of worker tasks that process identification jobs."""
+
+    def __init__(self) -> None:
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    def start(self, workers: int) -> None:
+        """Start ``workers`` worker tasks on the running event loop."""
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"identify-job-worker-{index}")
+            for index in range(workers)
+        ]
+        if self._tasks:
+            logger.info("Started %d identification job workers", len(self._tasks))
+
+    def wake(self) -> None:
+        """Signal idle workers that a job was queued."""
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Cancel the workers; interrupted jobs are picked up after a restart."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self) -> None:
+        while True:
+            # Clear before claiming so a job queued meanwhile still wakes us.
+            self._wakeup.clear()
+            try:
+                if await process_next_job():
+                    continue
+            except Exception:
+                logger.exception("Identification job worker error")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.identify_job_poll_seconds)
+            except TimeoutError:
+                pass
+
+
+job_workers = JobWorkerPool()
@@ -0,0 +1,261 @@
+"""Image processing: identification uploads and photo variants.
+
+Phone photos are often several megabytes, which makes the upload to PlantNet
+the slowest part of an identification. Images are decoded, rotated upright
+according to their EXIF orientation, downscaled to ``identify_image_max_side``
+and re-encoded as JPEG before they are sent. Decoding is CPU-bound, so
+``prepare_image`` runs it in a worker thread.
+
+``render_variants`` writes the resized WebP/AVIF copies of stored photos. It
+runs inside worker processes and must stay picklable and free of database
+imports. ``read_photo_metadata`` reads what lists need before any variant
+exists: dimensions, capture time and a tiny inline placeholder.
+"""
+
+import asyncio
+import base64
+import io
+import os
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError, features
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    """An image ready for upload, with its size before preprocessing."""
+
+    data: bytes
+    content_type: str
+    original_size: int
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_size - len(self.data)
+
+
+def preprocess_image(
+    data: bytes,
+    content_type: str,
+    max_side: int,
+    quality: int,
+) -> PreparedImage:
+    """
+    Rotate, downscale and re-encode an image as JPEG.
+
+    JPEGs that are already upright and small enough are passed through
+    untouched. Images Pillow cannot decode (e.g. HEIC) are passed through
+    with their original content type and left for PlantNet to handle.
+
+    Args:
+        data: Raw image bytes
+        content_type: MIME type reported by the client
+        max_side: Maximum width and height in pixels
+        quality: JPEG quality for re-encoded images
+
+    Returns:
+        The image to upload
+    """
+    original = PreparedImage(data, content_type, len(data))
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            rotated = image.getexif().get(ExifTags.Base.Orientation, 1) != 1
+            oversized = max(image.size) > max_side
+            if image.format == "JPEG" and not rotated and not oversized:
+                return original
+
+            # Let the JPEG decoder scale down while decoding (much cheaper).
+            image.draft("RGB", (max_side, max_side))
+            upright = ImageOps.exif_transpose(image)
+            upright.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            if upright.mode != "RGB":
+                upright = upright.convert("RGB")
+
+            buffer = io.BytesIO()
+            upright.save(buffer, format="JPEG", quality=quality, optimize=True)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return original
+
+    encoded = buffer.getvalue()
+    if len(encoded) >= len(data) and not rotated:
+        return original
+    return PreparedImage(encoded, "image/jpeg", len(data))
+
+
+async def prepare_image(data: bytes, content_type: str) -> PreparedImage:
+    """Preprocess an image for identification in a worker thread."""
+    return await asyncio.to_thread(
+        preprocess_image,
+        data,
+        content_type,
+        settings.identify_image_max_side,
+        settings.identify_image_quality,
+    )
+
+
+# Format name -> (file extension, encoder options besides quality)
+VARIANT_FORMATS: dict[str, tuple[str, dict]] = {
+    "webp": ("webp", {"method": 4}),
+    "avif": ("avif", {"speed": 8}),
+}
+
+
+def supported_variant_formats(formats: Sequence[str]) -> list[str]:
+    """The formats this Pillow build can encode; AVIF needs Pillow 11.3+ wheels."""
+    return [fmt for fmt in formats if fmt != "avif" or features.check("avif")]
+
+
+def variant_name(file_path: str, size: int, fmt: str) -> str:
+    """File name of a photo variant, stored next to the original."""
+    stem = file_path.rsplit(".", 1)[0]
+    return f"{stem}.{size}.{VARIANT_FORMATS[fmt][0]}"
+
+
+def render_variants(
+    source: Path,
+    sizes: Sequence[int],
+    formats: Sequence[str],
+    quality: int,
+) -> list[dict]:
+    """
+    Write resized copies of a photo next to it.
+
+    Each size bounds the longest side; photos are never upscaled, so a small
+    photo gets fewer variants. Files are written under a temporary name and
+    renamed into place.
+
+    Args:
+        source: Original photo
+        sizes: Longest-side sizes in pixels
+        formats: Keys of ``VARIANT_FORMATS``
+        quality: Encoder quality
+
+    Returns:
+        One dict per variant with ``path`` (relative to the photo's
+        directory), ``format``, ``width`` and ``height``. Empty if the photo
+        cannot be decoded.
+    """
+    try:
+        with Image.open(source) as image:
+            image.draft("RGB", (max(sizes), max(sizes)))
+            current = ImageOps.exif_transpose(image)
+            current.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return []
+
+    if current.mode not in ("RGB", "RGBA"):
+        current = current.convert("RGBA" if "transparency" in current.info else "RGB")
+
+    # Without an AVIF encoder, the WebP variants are all there is
+    formats = supported_variant_formats(formats)
+    longest = max(current.size)
+    variants = []
+    # Largest first, so each size is resampled from the previous one
+    for size in sorted({min(size, longest) for size in sizes}, reverse=True):
+        current = current.copy()
+        current.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            options = VARIANT_FORMATS[fmt][1]
+            name = variant_name(source.name, size, fmt)
+            temp_path = source.with_name(f".{name}.part")
+            current.save(temp_path, format=fmt.upper(), quality=quality, **options)
+            os.replace(temp_path, source.with_name(name))
+            variants.append(
+                {
+                    "path": name,
+                    "format": fmt,
+                    "width": current.width,
+                    "height": current.height,
+                }
+            )
+    return variants
+
+
+# Longest side of the inline placeholder; the browser scales it up blurred
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 40
+
+# EXIF orientations that swap width and height (rotated by 90 or 270 degrees)
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def _capture_time(exif: Image.Exif) -> datetime | None:
+    """
+    When a photo was taken, from ``DateTimeOriginal`` (or ``DateTime``).
+
+    EXIF times are the camera's local time. They are converted to UTC when
+    the photo records its UTC offset and taken as UTC otherwise.
+    """
+    details = exif.get_ifd(ExifTags.IFD.Exif)
+    value = details.get(ExifTags.Base.DateTimeOriginal) or exif.get(ExifTags.Base.DateTime)
+    if not isinstance(value, str):
+        return None
+    try:
+        taken_at = datetime.strptime(value.strip("\x00 "), "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+
+    offset = details.get(ExifTags.Base.OffsetTimeOriginal)
+    try:
+        tz = datetime.strptime(offset.strip("\x00 "), "%z").tzinfo if offset else UTC
+    except (AttributeError, ValueError):
+        tz = UTC
+    return taken_at.replace(tzinfo=tz).astimezone(UTC)
+
+
+def _placeholder(image: Image.Image) -> str:
+    """Encode a tiny upright copy of an image as a WebP data URI."""
+    # Let the JPEG decoder scale down while decoding
+    image.draft("RGB", (PLACEHOLDER_SIZE * 8, PLACEHOLDER_SIZE * 8))
+    small = ImageOps.exif_transpose(image)
+    small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.Resampling.BOX)
+    if small.mode not in ("RGB", "RGBA"):
+        small = small.convert("RGBA" if "transparency" in small.info else "RGB")
+
+    buffer = io.BytesIO()
+    small.save(buffer, format="WEBP", quality=PLACEHOLDER_QUALITY)
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def read_photo_metadata(source: Path) -> dict | None:
+    """
+    Read the dimensions, capture time and placeholder of a photo.
+
+    Only the header is parsed for the EXIF fields; the placeholder is decoded
+    at reduced scale, so this is cheap even for large JPEGs. It is CPU-bound
+    and must run in a worker thread.
+
+    Args:
+        source: Photo file
+
+    Returns:
+        The photo model fields ``width`` and ``height`` (as displayed, after
+        the EXIF orientation), ``orientation`` (EXIF value, 1 if absent),
+        ``taken_at`` (None if unknown) and ``placeholder`` (a data URI of at
+        most ``PLACEHOLDER_SIZE`` pixels). None if the photo cannot be decoded.
+    """
+    try:
+        with Image.open(source) as image:
+            exif = image.getexif()
+            orientation = exif.get(ExifTags.Base.Orientation, 1)
+            if orientation not in range(1, 9):
+                orientation = 1
+            width, height = image.size
+            if orientation in TRANSPOSED_ORIENTATIONS:
+                width, height = height, width
+            return {
+                "width": width,
+                "height": height,
+                "orientation": orientation,
+                "taken_at": _capture_time(exif),
+                "placeholder": _placeholder(image),
+            }
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return None
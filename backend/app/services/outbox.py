@@ -0,0 +1,199 @@
+"""Durable push notification outbox.
+
+Notifications are written to the ``push_outbox`` table first and delivered
+by a periodic worker. Failed deliveries are retried with exponential backoff
+up to ``push_max_attempts``; subscriptions the push service reports as gone
+are removed.
+"""
+
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import delete, update
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_settings
+from app.models import PushOutbox, PushOutboxStatus, PushSubscription, Reminder
+from app.services.push import PushResult, notification_data, send_push_batch
+
+settings = get_settings()
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next attempt after ``attempts`` failed deliveries."""
+    seconds = settings.push_retry_base_seconds * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, settings.push_retry_max_seconds))
+
+
+def enqueue_notification(
+    session: AsyncSession,
+    subscription_ids: Iterable[UUID],
+    payload: dict,
+    reminder_id: UUID | None = None,
+) -> int:
+    """
+    Queue a notification for each subscription.
+
+    The entries are only added to the session; the caller commits them
+    together with any other state change of the same unit of work.
+
+    Returns:
+        Number of queued entries
+    """
+    count = 0
+    for subscription_id in subscription_ids:
+        session.add(
+            PushOutbox(
+                subscription_id=subscription_id,
+                reminder_id=reminder_id,
+                payload=payload,
+            )
+        )
+        count += 1
+    return count
+
+
+async def deliver_outbox_batch(
+    session: AsyncSession,
+    batch_size: int | None = None,
+) -> int:
+    """
+    Deliver one batch of due outbox entries.
+
+    Rows are claimed with ``FOR UPDATE SKIP LOCKED`` so several workers can
+    drain the outbox concurrently without sending anything twice (SQLite
+    ignores the locking clause; it only ever has a single writer).
+
+    Returns:
+        Number of processed entries
+    """
+    if not settings.vapid_private_key:
+        # Nothing can be sent; keep entries queued until keys are configured
+        return 0
+
+    now = datetime.now(UTC)
+    result = await session.exec(
+        select(PushOutbox)
+        .where(
+            PushOutbox.status == PushOutboxStatus.PENDING,
+            PushOutbox.next_attempt_at <= now,
+        )
+        .order_by(col(PushOutbox.next_attempt_at))
+        .limit(batch_size or settings.push_outbox_batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    entries = result.all()
+    if not entries:
+        return 0
+
+    sub_result = await session.exec(
+        select(PushSubscription).where(
+            col(PushSubscription.id).in_({e.subscription_id for e in entries})
+        )
+    )
+    subscriptions = {s.id: s for s in sub_result.all()}
+
+    # Encrypt and send the whole batch as one fan-out
+    deliverable = [e for e in entries if e.subscription_id in subscriptions]
+    sent = await send_push_batch(
+        [subscriptions[e.subscription_id] for e in deliverable],
+        [
+            notification_data(
+                e.payload.get("title", ""), e.payload.get("body", ""), e.payload.get("url")
+            )
+            for e in deliverable
+        ],
+    )
+    results_by_id = dict(zip((e.id for e in deliverable), sent, strict=True))
+    results = [results_by_id.get(entry.id) for entry in entries]
+
+    gone_ids: set[UUID] = set()
+    notified_reminder_ids: set[UUID] = set()
+    for entry, push_result in zip(entries, results, strict=True):
+        subscription = subscriptions.get(entry.subscription_id)
+        _record_attempt(entry, subscription, push_result, now)
+        session.add(entry)
+
+        if subscription is None or push_result is None:
+            continue
+        if push_result.is_gone:
+            gone_ids.add(subscription.id)
+        else:
+            session.add(subscription)
+        if push_result.success and entry.reminder_id is not None:
+            notified_reminder_ids.add(entry.reminder_id)
+
+    if notified_reminder_ids:
+        await session.exec(
+            update(Reminder)
+            .where(col(Reminder.id).in_(notified_reminder_ids))
+            .values(last_notified=now)
+        )
+
+    if gone_ids:
+        await prune_subscriptions(session, gone_ids)
+
+    await session.commit()
+    return len(entries)
+
+
+def _record_attempt(
+    entry: PushOutbox,
+    subscription: PushSubscription | None,
+    push_result: PushResult | None,
+    now: datetime,
+) -> None:
+    """Update entry state and subscription stats after a delivery attempt."""
+    entry.attempts += 1
+
+    if push_result is None or subscription is None:
+        entry.status = PushOutboxStatus.FAILED
+        entry.last_error = "Subscription no longer exists"
+        return
+
+    if push_result.success:
+        entry.status = PushOutboxStatus.SENT
+        entry.sent_at = now
+        entry.last_error = None
+        subscription.success_count += 1
+        subscription.last_success_at = now
+        return
+
+    error = (push_result.error or "Unknown error")[:500]
+    entry.last_error = error
+    subscription.failure_count += 1
+    subscription.last_failure_at = now
+    subscription.last_error = error
+
+    if push_result.is_gone or entry.attempts >= settings.push_max_attempts:
+        entry.status = PushOutboxStatus.FAILED
+    else:
+        entry.next_attempt_at = now + retry_delay(entry.attempts)
+
+
+async def prune_subscriptions(session: AsyncSession, subscription_ids: set[UUID]) -> int:
+    """Delete subscriptions and their queued notifications. Does not commit."""
+    if not subscription_ids:
+        return 0
+    await session.exec(
+        delete(PushOutbox).where(col(PushOutbox.subscription_id).in_(subscription_ids))
+    )
+    result = await session.exec(
+        delete(PushSubscription).where(col(PushSubscription.id).in_(subscription_ids))
+    )
+    return result.rowcount
+
+
+async def prune_outbox(session: AsyncSession) -> int:
+    """Delete delivered and failed entries older than the retention period."""
+    cutoff = datetime.now(UTC) - timedelta(days=settings.push_outbox_retention_days)
+    result = await session.exec(
+        delete(PushOutbox).where(
+            col(PushOutbox.status).in_([PushOutboxStatus.SENT, PushOutboxStatus.FAILED]),
+            PushOutbox.created_at < cutoff,
+        )
+    )
+    await session.commit()
+    return result.rowcount
@@ -0,0 +1,272 @@
+"""Responsive photo variants.
+
+List views only need small images, but photos are stored as uploaded (often
+several megabytes). After an upload, the photo is resized to each of
+``photo_variant_sizes`` in each of ``photo_variant_formats`` and the variants
+are recorded on the photo row. Encoding is CPU-bound (AVIF especially), so
+it runs in a process pool after the response has been sent. Photos whose
+metadata was not read on upload (direct uploads, older photos) get it here.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import posixpath
+from concurrent.futures import Executor, ProcessPoolExecutor
+from uuid import UUID
+
+from sqlmodel import col, select
+
+from app.core.config import get_settings
+from app.core.database import async_session_factory
+from app.models import PlantPhoto, PotPhoto
+from app.services.files import PHOTO_MODELS
+from app.services.images import read_photo_metadata, render_variants
+from app.services.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def get_executor() -> Executor | None:
+    """Process pool for variant encoding, or None when disabled."""
+    global _executor
+    if settings.photo_variant_workers <= 0:
+        return None
+    if _executor is None:
+        # Spawn instead of fork: the API process is multi-threaded
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.photo_variant_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Stop the variant worker processes."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+async def process_photo(
+    subfolder: str, file_path: str, *, variants: bool = True, metadata: bool = False
+) -> tuple[list[dict] | None, dict | None]:
+    """
+    Render the variants and/or read the metadata of a stored photo.
+
+    Both work on one local copy of the file, off the event loop.
+
+    Args:
+        subfolder: Subdirectory (e.g., 'plants' or 'pots')
+        file_path: Photo path relative to the subfolder
+        variants: Render the variants
+        metadata: Read the metadata
+
+    Returns:
+        Variant dicts as stored in ``variants``, with paths relative to the
+        subfolder like ``file_path`` (None if not requested), and the
+        metadata fields from ``read_photo_metadata`` (None if not requested
+        or not decodable)
+    """
+    storage = get_storage()
+    directory = posixpath.dirname(file_path)
+    rendered = info = None
+    async with storage.local_copy(f"{subfolder}/{file_path}") as source:
+        if metadata:
+            info = await asyncio.to_thread(read_photo_metadata, source)
+        if not variants:
+            return None, info
+
+        args = (
+            source,
+            settings.photo_variant_sizes,
+            settings.photo_variant_formats,
+            settings.photo_variant_quality,
+        )
+        executor = get_executor()
+        if executor is None:
+            rendered = await asyncio.to_thread(render_variants, *args)
+        else:
+            loop = asyncio.get_running_loop()
+            rendered = await loop.run_in_executor(executor, render_variants, *args)
+
+        for variant in rendered:
+            variant["path"] = posixpath.join(directory, variant["path"])
+            await storage.save(
+                source.parent / posixpath.basename(variant["path"]),
+                f"{subfolder}/{variant['path']}",
+            )
+    return rendered, info
+
+
+async def render_photo_variants(subfolder: str, file_path: str) -> list[dict]:
+    """
+    Render the variants of a stored photo without blocking the event loop.
+
+    Returns:
+        Variant dicts as stored in ``variants``, with paths relative to the
+        subfolder like ``file_path``
+    """
+    rendered, _ = await process_photo(subfolder, file_path)
+    return rendered or []
+
+
+async def create_photo_variants(subfolder: str, photo_id: UUID, file_path: str) -> None:
+    """Render a new photo's variants and record them (run as a background task)."""
+    model = PHOTO_MODELS[subfolder]
+    try:
+        async with async_session_factory() as session:
+            photo = await session.get(model, photo_id)
+            if photo is None:  # Deleted meanwhile
+                return
+            needs_metadata = photo.width is None
+            # Identical uploads share a file, and so its variants
+            result = await session.exec(
+                select(model.variants)
+                .where(model.file_path == file_path, col(model.variants).is_not(None))
+                .limit(1)
+            )
+            variants = result.first()
+        info = None
+        if variants is None or needs_metadata:
+            rendered, info = await process_photo(
+                subfolder, file_path, variants=variants is None, metadata=needs_metadata
+            )
+            variants = variants if rendered is None else rendered
+
+        async with async_session_factory() as session:
+            photo = await session.get(model, photo_id)
+            if photo is None:  # Deleted meanwhile
+                return
+            photo.variants = variants
+            if info is not None:
+                photo.sqlmodel_update(info)
+            session.add(photo)
+            await session.commit()
+    except Exception:
+        logger.exception("Creating variants for %s/%s failed", subfolder, file_path)
+
+
+async def create_batch_variants(subfolder: str, photos: list[tuple[UUID, str]]) -> None:
+    """
+    Render the variants of photos uploaded together (run as a background task).
+
+    At most ``upload_batch_concurrency`` files are processed at a time.
+    Photos sharing a file are processed one after the other, so the first
+    renders the variants and the others reuse them.
+
+    Args:
+        subfolder: Subdirectory (e.g., 'plants' or 'pots')
+        photos: Photo ids and file paths
+    """
+    by_file: dict[str, list[UUID]] = {}
+    for photo_id, file_path in photos:
+        by_file.setdefault(file_path, []).append(photo_id)
+    semaphore = asyncio.Semaphore(settings.upload_batch_concurrency)
+
+    async def create(file_path: str, photo_ids: list[UUID]) -> None:
+        async with semaphore:
+            for photo_id in photo_ids:
+                await create_photo_variants(subfolder, photo_id, file_path)
+
+    await asyncio.gather(*(create(path, ids) for path, ids in by_file.items()))
+
+
+async def backfill_variants(batch_size: int = 20, force: bool = False) -> int:
+    """
+    Render variants and read metadata for photos that have none yet.
+
+    Args:
+        batch_size: Photos processed concurrently and committed together
+        force: Re-render and re-read photos that already have them
+
+    Returns:
+        Number of photos processed
+    """
+    processed = 0
+    for subfolder, model in PHOTO_MODELS.items():
+        last_id = None
+        while True:
+            async with async_session_factory() as session:
+                query = select(model).order_by(col(model.id)).limit(batch_size)
+                if not force:
+                    query = query.where(col(model.variants).is_(None) | col(model.width).is_(None))
+                if last_id is not None:
+                    query = query.where(col(model.id) > last_id)
+                photos = (await session.exec(query)).all()
+                if not photos:
+                    break
+                # Undecodable photos (no variants) have no metadata to read
+                pending = [p for p in photos if force or p.variants is None or p.variants]
+
+                results = await asyncio.gather(
+                    *(
+                        process_photo(
+                            subfolder,
+                            p.file_path,
+                            variants=force or p.variants is None,
+                            metadata=force or p.width is None,
+                        )
+                        for p in pending
+                    )
+                )
+                for photo, (variants, info) in zip(pending, results, strict=True):
+                    if variants is not None:
+                        photo.variants = variants
+                    if info is not None:
+                        photo.sqlmodel_update(info)
+                    session.add(photo)
+                await session.commit()
+
+            last_id = photos[-1].id
+            processed += len(pending)
+            logger.info("Processed %d %s photos", processed, subfolder)
+    return processed
+
+
+def _srcset(subfolder: str, variants: list[dict], fmt: str) -> str | None:
+    entries = [
+        f"/uploads/{subfolder}/{v['path']} {v['width']}w"
+        for v in sorted(variants, key=lambda v: v["width"])
+        if v["format"] == fmt
+    ]
+    return ", ".join(entries) or None
+
+
+def _thumbnail(variants: list[dict]) -> dict | None:
+    webp = sorted(
+        (v for v in variants if v["format"] == "webp"),
+        key=lambda v: max(v["width"], v["height"]),
+    )
+    large_enough = [
+        v for v in webp if max(v["width"], v["height"]) >= settings.photo_thumbnail_size
+    ]
+    if large_enough:
+        return large_enough[0]
+    return webp[-1] if webp else None
+
+
+def photo_urls(subfolder: str, photo: PlantPhoto | PotPhoto | None) -> dict[str, str | None]:
+    """
+    URLs of a photo and its variants for API responses.
+
+    ``thumbnail_url`` and ``srcset`` use the WebP variants, ``avif_srcset``
+    the AVIF ones (for a ``<picture>`` source). They are ``None`` until the
+    variants exist.
+    """
+    if photo is None:
+        return {"url": None, "thumbnail_url": None, "srcset": None, "avif_srcset": None}
+
+    variants = photo.variants or []
+    thumbnail = _thumbnail(variants)
+    return {
+        "url": f"/uploads/{subfolder}/{photo.file_path}",
+        "thumbnail_url": f"/uploads/{subfolder}/{thumbnail['path']}" if thumbnail else None,
+        "srcset": _srcset(subfolder, variants, "webp"),
+        "avif_srcset": _srcset(subfolder, variants, "avif"),
+    }
@@ -1,36 +1,222 @@
 """PlantNet API client."""
 
+import importlib.util
+import logging
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass
+
 import httpx
 
 from app.core.config import get_settings
+from app.services.resilience import CircuitBreaker, DailyQuota, TokenBucket
+
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+# PlantNet accepts at most this many images per identification
+MAX_IMAGES = 5
+
+# Set on error results produced before any request reached PlantNet
+REJECTED_LOCALLY = "rejected_locally"
+
+# Module-level guards, set up by `reset_limits` below. The quota is seeded
+# from `remainingIdentificationRequests` in each response, and the bucket's
+# refill rate is lowered to spread what remains until the daily reset; the
+# breaker fails fast after consecutive 5xx responses, timeouts or network
+# errors.
+_bucket: TokenBucket
+_quota: DailyQuota
+_breaker: CircuitBreaker
+
+# Application-scoped client, opened in the app lifespan and reused across
+# requests so identifications skip the TCP+TLS handshake.
+_client: httpx.AsyncClient | None = None
+
+
+def create_client(**overrides) -> httpx.AsyncClient:
+    """Create the pooled PlantNet HTTP client from settings.
+
+    Keyword arguments override the ``httpx.AsyncClient`` options (e.g.
+    ``verify`` for a local stub server with a self-signed certificate).
+    """
+    http2 = settings.plantnet_http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("PLANTNET_HTTP2 is enabled but 'h2' is not installed; using HTTP/1.1")
+        http2 = False
+
+    options = {
+        "http2": http2,
+        "timeout": httpx.Timeout(
+            settings.plantnet_read_timeout,
+            connect=settings.plantnet_connect_timeout,
+        ),
+        "limits": httpx.Limits(
+            max_connections=settings.plantnet_max_connections,
+            max_keepalive_connections=settings.plantnet_max_keepalive_connections,
+            keepalive_expiry=settings.plantnet_keepalive_expiry,
+        ),
+    }
+    return httpx.AsyncClient(**{**options, **overrides})
+
+
+async def start_client(**overrides) -> None:
+    """Open the shared client (called on application startup)."""
+    global _client
+    if _client is None:
+        _client = create_client(**overrides)
+
+
+async def close_client() -> None:
+    """Close the shared client (called on application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Get the shared client, creating it lazily outside the app lifespan."""
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
+
+
+def reset_limits() -> None:
+    """Recreate the rate limiter, quota tracker and circuit breaker from settings."""
+    global _bucket, _quota, _breaker
+    _bucket = TokenBucket(
+        rate=settings.plantnet_rate_limit_per_minute / 60,
+        capacity=settings.plantnet_rate_limit_burst,
+    )
+    _quota = DailyQuota()
+    _breaker = CircuitBreaker(
+        failure_threshold=settings.plantnet_breaker_failure_threshold,
+        reset_timeout=settings.plantnet_breaker_reset_seconds,
+    )
+
+
+reset_limits()
+
+
+def _error(
+    message: str, code: str, retry_after: float | None = None, *, local: bool = False
+) -> dict:
+    error = {"error": message, "error_code": code, "results": []}
+    if retry_after is not None:
+        error["retry_after"] = math.ceil(retry_after)
+    if local:
+        error[REJECTED_LOCALLY] = True
+    return error
+
+
+def _pace_bucket() -> None:
+    """
+    Slow the bucket down if its rate would use up the quota before the reset.
+
+    The configured rate applies as long as the remaining quota covers it
+    until the daily reset; otherwise the remaining calls are spread evenly
+    over that time. A configured rate of 0 disables limiting altogether.
+    """
+    rate = settings.plantnet_rate_limit_per_minute / 60
+    seconds = _quota.seconds_until_reset()
+    if rate > 0 and seconds and _quota.remaining and rate * seconds > _quota.remaining:
+        rate = _quota.remaining / seconds
+    _bucket.set_rate(rate)
+
+
+def _check_limits() -> dict | None:
+    """Refuse a call early when the quota, rate limit or breaker forbid it."""
+    wait = _quota.retry_after()
+    if wait:
+        return _error(
+            "PlantNet identification quota exhausted", "QUOTA_EXHAUSTED", wait, local=True
+        )
+
+    wait = _breaker.before_call()
+    if wait:
+        return _error(
+            "PlantNet API temporarily unavailable", "UPSTREAM_UNAVAILABLE", wait, local=True
+        )
+
+    _pace_bucket()
+    wait = _bucket.try_acquire()
+    if wait:
+        # Don't use up a half-open breaker's trial on a call never sent
+        _breaker.cancel_call()
+        return _error("Too many identification requests", "RATE_LIMITED", wait, local=True)
+
+    _quota.consume()
+    return None
+
+
+def _check_response(response: httpx.Response) -> dict | None:
+    """Update the breaker and quota from a response; error dict on failure."""
+    if response.status_code >= 500:
+        _breaker.record_failure()
+    else:
+        _breaker.record_success()
+
+    if response.status_code == 429:
+        _quota.exhaust()
+        return _error(
+            "PlantNet identification quota exhausted",
+            "QUOTA_EXHAUSTED",
+            _quota.retry_after(),
+        )
+    if response.status_code != 200:
+        return _error(f"PlantNet API error: {response.status_code}", "UPSTREAM_ERROR")
+    return None
+
+
+@dataclass(frozen=True)
+class PlantImage:
+    """One image of a plant and the organ it shows."""
+
+    data: bytes
+    organ: str = "leaf"
+    content_type: str = "image/jpeg"
+
 
 async def identify_plant(
-    image_data: bytes,
+    image_data: bytes | None = None,
     organ: str = "leaf",
     api_key: str | None = None,
+    content_type: str = "image/jpeg",
+    images: Sequence[PlantImage] | None = None,
 ) -> dict:
     """
     Identify a plant using the PlantNet API.
 
+    PlantNet combines up to ``MAX_IMAGES`` images of the same plant (e.g. a
+    leaf and a flower) into one, more accurate, identification.
+
     Args:
-        image_data: Raw image bytes
+        image_data: Raw image bytes (single-image form)
         organ: Plant organ type (leaf, flower, fruit, bark)
+        api_key: PlantNet API key, overriding the configured one
+        content_type: MIME type of the image
+        images: Images with per-image organs; replaces ``image_data``
 
     Returns:
-        API response with identification results
+        API response with identification results. Errors raised before any
+        request was sent carry a ``REJECTED_LOCALLY`` key.
     """
+    if images is None:
+        images = [PlantImage(image_data, organ, content_type)]
+
     key = api_key or settings.plantnet_api_key or None
     if not key:
-        return {
-            "error": "PlantNet API key not configured",
-            "error_code": "MISSING_API_KEY",
-            "results": [],
-        }
+        return _error("PlantNet API key not configured", "MISSING_API_KEY", local=True)
+
+    rejection = _check_limits()
+    if rejection is not None:
+        return rejection
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    client = get_client()
+    try:
         response = await client.post(
             settings.plantnet_api_url,
             params={
@@ -39,41 +225,45 @@ async def identify_plant(
                 "no-reject": "false",
                 "lang": "en",
             },
-            files={
-                "images": ("plant.jpg", image_data, "image/jpeg"),
-            },
+            files=[
+                ("images", (f"plant-{index}", image.data, image.content_type))
+                for index, image in enumerate(images)
+            ],
             data={
-                "organs": organ,
+                "organs": [image.organ for image in images],
             },
         )
+    except httpx.TimeoutException:
+        _breaker.record_failure()
+        return _error("PlantNet API timed out", "UPSTREAM_TIMEOUT")
+    except httpx.TransportError:
+        _breaker.record_failure()
+        return _error("PlantNet API unreachable", "UPSTREAM_UNAVAILABLE")
 
-        if response.status_code != 200:
-            return {
-                "error": f"PlantNet API error: {response.status_code}",
-                "results": [],
+    failure = _check_response(response)
+    if failure is not None:
+        return failure
+
+    data = response.json()
+
+    # Transform results into a cleaner format
+    results = []
+    for result in data.get("results", [])[:5]:  # Top 5 results
+        species = result.get("species", {})
+        results.append(
+            {
+                "score": result.get("score", 0),
+                "scientific_name": species.get("scientificNameWithoutAuthor", ""),
+                "common_names": species.get("commonNames", []),
+                "family": species.get("family", {}).get("scientificNameWithoutAuthor", ""),
+                "genus": species.get("genus", {}).get("scientificNameWithoutAuthor", ""),
             }
+        )
 
-        data = response.json()
-
-        # Transform results into a cleaner format
-        results = []
-        for result in data.get("results", [])[:5]:  # Top 5 results
-            species = result.get("species", {})
-            results.append(
-                {
-                    "score": result.get("score", 0),
-                    "scientific_name": species.get("scientificNameWithoutAuthor", ""),
-                    "common_names": species.get("commonNames", []),
-                    "family": species.get("family", {}).get(
-                        "scientificNameWithoutAuthor", ""
-                    ),
-                    "genus": species.get("genus", {}).get(
-                        "scientificNameWithoutAuthor", ""
-                    ),
-                }
-            )
-
-        return {
-            "results": results,
-            "remaining_identifications": data.get("remainingIdentificationRequests", 0),
-        }
+    remaining = data.get("remainingIdentificationRequests")
+    if remaining is not None:
+        _quota.update(remaining)
+    return {
+        "results": results,
+        "remaining_identifications": remaining or 0,
+    }
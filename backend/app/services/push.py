@@ -1,21 +1,122 @@
 """Web push notification service."""
 
+import asyncio
 import json
+from dataclasses import dataclass
 
-from pywebpush import WebPushException, webpush
+import httpx
 
 from app.core.config import get_settings
 from app.models import PushSubscription
+from app.services.push_crypto import EncryptedPush, PushMessage, encrypt_messages
 
 settings = get_settings()
 
+# Push services answer with these codes once a subscription has expired or
+# the user revoked permission. Such subscriptions will never work again.
+GONE_STATUS_CODES = {404, 410}
+
+_http_client: httpx.AsyncClient | None = None
+
+
+@dataclass
+class PushResult:
+    """Outcome of a single push delivery attempt."""
+
+    success: bool
+    status_code: int | None = None
+    error: str | None = None
+
+    @property
+    def is_gone(self) -> bool:
+        """Whether the subscription is permanently invalid."""
+        return self.status_code in GONE_STATUS_CODES
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared HTTP client for push services (keeps connections alive)."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, connect=5.0))
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared push HTTP client."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def send_push_batch(
+    subscriptions: list[PushSubscription],
+    payloads: list[str],
+) -> list[PushResult]:
+    """
+    Encrypt and send one payload per subscription.
+
+    Encryption runs off the event loop (in the process pool for large
+    batches); the encrypted requests are then sent concurrently, bounded by
+    ``push_delivery_concurrency``.
+
+    Returns:
+        One result per subscription, in order
+    """
+    if not settings.vapid_private_key:
+        return [
+            PushResult(success=False, error="VAPID private key not configured")
+            for _ in subscriptions
+        ]
+
+    encrypted = await encrypt_messages(
+        [
+            PushMessage(
+                endpoint=subscription.endpoint,
+                p256dh_key=subscription.p256dh_key,
+                auth_key=subscription.auth_key,
+                data=payload,
+            )
+            for subscription, payload in zip(subscriptions, payloads, strict=True)
+        ]
+    )
+
+    semaphore = asyncio.Semaphore(settings.push_delivery_concurrency)
+
+    async def post(message: EncryptedPush | str) -> PushResult:
+        if isinstance(message, str):
+            return PushResult(success=False, error=message)
+        async with semaphore:
+            return await _post_encrypted(message)
+
+    return list(await asyncio.gather(*(post(message) for message in encrypted)))
+
+
+async def _post_encrypted(message: EncryptedPush) -> PushResult:
+    try:
+        response = await get_http_client().post(
+            message.endpoint,
+            content=message.body,
+            headers=message.headers,
+        )
+    except httpx.HTTPError as e:  # Connection errors, timeouts: retried by the outbox
+        return PushResult(success=False, error=str(e) or type(e).__name__)
+
+    if response.status_code > 202:
+        return PushResult(
+            success=False,
+            status_code=response.status_code,
+            error=f"Push failed: {response.status_code} {response.reason_phrase}",
+        )
+    return PushResult(success=True, status_code=response.status_code)
+
 
 async def send_push_notification(
     subscription: PushSubscription,
     title: str,
     body: str,
     url: str | None = None,
-) -> bool:
+) -> PushResult:
     """
     Send a web push notification.
 
@@ -26,49 +127,40 @@ async def send_push_notification(
         url: Optional URL to open on click
 
     Returns:
-        True if successful, False otherwise
+        Delivery result including the push service status code on failure
     """
-    if not settings.vapid_private_key:
-        return False
+    results = await send_push_batch([subscription], [notification_data(title, body, url)])
+    return results[0]
 
-    try:
-        payload = json.dumps(
-            {
-                "title": title,
-                "body": body,
-                "url": url,
-            }
-        )
 
-        webpush(
-            subscription_info={
-                "endpoint": subscription.endpoint,
-                "keys": {
-                    "p256dh": subscription.p256dh_key,
-                    "auth": subscription.auth_key,
-                },
-            },
-            data=payload,
-            vapid_private_key=settings.vapid_private_key,
-            vapid_claims={"sub": settings.vapid_email},
-        )
-        return True
-    except WebPushException as e:
-        # If subscription is invalid, it should be removed
-        print(f"Push notification failed: {e}")
-        return False
+async def probe_subscriptions(subscriptions: list[PushSubscription]) -> list[PushResult]:
+    """
+    Check whether subscriptions are still accepted by their push services.
 
+    Web push has no read-only probe, so this sends a ``{"type": "probe"}``
+    message with TTL 0 (dropped if the device is offline). Browsers may
+    still show it, so callers probe only subscriptions that are suspect.
+    """
+    probe = json.dumps({"type": "probe"})
+    return await send_push_batch(subscriptions, [probe] * len(subscriptions))
 
-async def send_reminder_notification(
-    subscription: PushSubscription,
-    plant_name: str,
-    reminder_type: str,
-) -> bool:
-    """Send a reminder notification."""
-    type_label = "water" if reminder_type == "WATERING" else "fertilize"
-    return await send_push_notification(
-        subscription=subscription,
-        title=f"Time to {type_label} {plant_name}",
-        body=f"Your plant {plant_name} needs {type_label}ing!",
-        url="/plants",
+
+def notification_data(title: str, body: str, url: str | None = None) -> str:
+    """Serialize a notification as expected by the service worker."""
+    return json.dumps(
+        {
+            "title": title,
+            "body": body,
+            "url": url,
+        }
     )
+
+
+def reminder_notification_payload(plant_name: str, reminder_type: str) -> dict:
+    """Build the notification payload for a due reminder."""
+    type_label = "water" if reminder_type == "WATERING" else "fertilize"
+    return {
+        "title": f"Time to {type_label} {plant_name}",
+        "body": f"Your plant {plant_name} needs {type_label}ing!",
+        "url": "/plants",
+    }
@@ -0,0 +1,174 @@
+"""Web push payload encryption.
+
+Every push message needs an ephemeral ECDH key agreement plus AES-128-GCM
+encryption (RFC 8291), and a VAPID signature per push service origin. This
+is CPU-bound, so large fan-outs encrypt in a process pool and hand the
+ready-to-send requests back to the async sender.
+
+Functions here run inside worker processes and must stay picklable and free
+of database imports.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from py_vapid import Vapid
+from pywebpush import WebPusher
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# VAPID tokens are valid for 12 hours; re-sign well before they expire
+VAPID_TOKEN_LIFETIME = 12 * 60 * 60
+VAPID_RESIGN_MARGIN = 60 * 60
+
+
+@dataclass(frozen=True)
+class PushMessage:
+    """Plaintext push message for a single subscription."""
+
+    endpoint: str
+    p256dh_key: str
+    auth_key: str
+    data: str
+
+
+@dataclass(frozen=True)
+class EncryptedPush:
+    """Encrypted push request ready to be POSTed to the endpoint."""
+
+    endpoint: str
+    headers: dict[str, str]
+    body: bytes
+
+
+@lru_cache(maxsize=4)
+def _load_vapid(private_key: str) -> Vapid:
+    if os.path.isfile(private_key):
+        return Vapid.from_file(private_key_file=private_key)
+    return Vapid.from_string(private_key=private_key)
+
+
+# (private_key, audience) -> (expires_at, headers); per process
+_vapid_headers: dict[tuple[str, str], tuple[int, dict[str, str]]] = {}
+
+
+def _vapid_auth_headers(endpoint: str, private_key: str, subject: str) -> dict[str, str]:
+    """VAPID headers for the endpoint's origin, signed once per token lifetime."""
+    url = urlparse(endpoint)
+    audience = f"{url.scheme}://{url.netloc}"
+    now = int(time.time())
+
+    cached = _vapid_headers.get((private_key, audience))
+    if cached and cached[0] - VAPID_RESIGN_MARGIN > now:
+        return cached[1]
+
+    expires_at = now + VAPID_TOKEN_LIFETIME
+    headers = _load_vapid(private_key).sign({"aud": audience, "exp": expires_at, "sub": subject})
+    _vapid_headers[(private_key, audience)] = (expires_at, headers)
+    return headers
+
+
+def encrypt_message(
+    message: PushMessage,
+    vapid_private_key: str,
+    vapid_subject: str,
+    ttl: int = 0,
+) -> EncryptedPush:
+    """Encrypt one message (aes128gcm) and attach VAPID authorization."""
+    pusher = WebPusher(
+        {
+            "endpoint": message.endpoint,
+            "keys": {"p256dh": message.p256dh_key, "auth": message.auth_key},
+        }
+    )
+    encoded = pusher.encode(message.data.encode("utf-8"), "aes128gcm")
+    headers = {
+        **_vapid_auth_headers(message.endpoint, vapid_private_key, vapid_subject),
+        "Content-Encoding": "aes128gcm",
+        "TTL": str(ttl),
+    }
+    return EncryptedPush(endpoint=message.endpoint, headers=headers, body=encoded["body"])
+
+
+def encrypt_batch(
+    messages: list[PushMessage],
+    vapid_private_key: str,
+    vapid_subject: str,
+    ttl: int = 0,
+) -> list[EncryptedPush | str]:
+    """
+    Encrypt a batch of messages in one worker round trip.
+
+    Failures are returned as error strings so one bad subscription key does
+    not fail the whole batch.
+    """
+    results: list[EncryptedPush | str] = []
+    for message in messages:
+        try:
+            results.append(encrypt_message(message, vapid_private_key, vapid_subject, ttl))
+        except Exception as e:  # Invalid subscription keys
+            results.append(f"Encryption failed: {e}")
+    return results
+
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def get_executor() -> Executor | None:
+    """Process pool for large fan-outs, or None when disabled."""
+    global _executor
+    if settings.push_crypto_workers <= 0:
+        return None
+    if _executor is None:
+        # Spawn instead of fork: the API process is multi-threaded
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.push_crypto_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Stop the encryption worker processes."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+async def encrypt_messages(
+    messages: list[PushMessage],
+    ttl: int = 0,
+) -> list[EncryptedPush | str]:
+    """
+    Encrypt messages without blocking the event loop.
+
+    Batches of at least ``push_crypto_min_batch`` messages are split into
+    chunks and encrypted in the process pool; smaller batches are not worth
+    the IPC overhead and run in a thread.
+    """
+    if not messages:
+        return []
+
+    key, subject = settings.vapid_private_key, settings.vapid_email
+    executor = get_executor()
+    if executor is None or len(messages) < settings.push_crypto_min_batch:
+        return await asyncio.to_thread(encrypt_batch, messages, key, subject, ttl)
+
+    loop = asyncio.get_running_loop()
+    size = settings.push_crypto_chunk_size
+    chunks = await asyncio.gather(
+        *(
+            loop.run_in_executor(executor, encrypt_batch, messages[i : i + size], key, subject, ttl)
+            for i in range(0, len(messages), size)
+        )
+    )
+    return [result for chunk in chunks for result in chunk]
@@ -0,0 +1,184 @@
+"""Rate limiting and circuit breaking for upstream APIs.
+
+Small, single-process building blocks: they keep their state in memory and
+are meant to be used from one event loop.
+"""
+
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from enum import Enum
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    Holds up to ``capacity`` tokens and refills at ``rate`` tokens per
+    second. A ``rate`` of zero disables limiting.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate: float) -> None:
+        """Change the refill rate, keeping the tokens accumulated so far."""
+        if rate != self.rate:
+            self._refill()
+            self.rate = rate
+
+    def try_acquire(self) -> float:
+        """
+        Take a token if one is available.
+
+        Returns:
+            ``0.0`` if a token was taken, otherwise the seconds until one is.
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class DailyQuota:
+    """
+    Remaining upstream quota as last reported by the upstream service.
+
+    The count is unknown until the first response reports it. Once it
+    reaches zero, calls are refused until the next daily reset (midnight
+    UTC), after which the count is unknown again.
+    """
+
+    def __init__(self, clock: Callable[[], datetime] = lambda: datetime.now(UTC)) -> None:
+        self._clock = clock
+        self.remaining: int | None = None
+        self._resets_at: datetime | None = None
+
+    def update(self, remaining: int) -> None:
+        """Record the remaining quota reported by the upstream service."""
+        now = self._clock()
+        self.remaining = max(remaining, 0)
+        tomorrow = (now + timedelta(days=1)).date()
+        self._resets_at = datetime(tomorrow.year, tomorrow.month, tomorrow.day, tzinfo=UTC)
+
+    def exhaust(self) -> None:
+        """Mark the quota as used up (e.g. after an HTTP 429)."""
+        self.update(0)
+
+    def seconds_until_reset(self) -> float | None:
+        """Seconds until the daily reset, ``None`` while the quota is unknown."""
+        if self.remaining is None:
+            return None
+        wait = (self._resets_at - self._clock()).total_seconds()
+        if wait <= 0:
+            self.remaining = None
+            return None
+        return wait
+
+    def retry_after(self) -> float:
+        """Seconds until calls are allowed again, ``0.0`` if allowed now."""
+        wait = self.seconds_until_reset()
+        if wait is None or self.remaining > 0:
+            return 0.0
+        return wait
+
+    def consume(self) -> None:
+        """Count one call against the known quota."""
+        if self.remaining:
+            self.remaining -= 1
+
+
+class CircuitState(str, Enum):
+    """Circuit breaker states."""
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitBreaker:
+    """
+    Fail fast after repeated upstream failures.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are refused for ``reset_timeout`` seconds. Then a single trial
+    call is let through: success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_started: float | None = None
+
+    def before_call(self) -> float:
+        """
+        Check whether a call may proceed.
+
+        Returns:
+            ``0.0`` if the call may proceed, otherwise the seconds to wait.
+        """
+        if self.state == CircuitState.CLOSED:
+            return 0.0
+
+        now = self._clock()
+        if self.state == CircuitState.OPEN:
+            wait = self._opened_at + self.reset_timeout - now
+            if wait > 0:
+                return wait
+            self.state = CircuitState.HALF_OPEN
+            self._trial_started = None
+
+        # Half-open: one trial at a time; a trial that never reported back
+        # (e.g. a cancelled request) is replaced after `reset_timeout`.
+        if self._trial_started is not None:
+            wait = self._trial_started + self.reset_timeout - now
+            if wait > 0:
+                return wait
+        self._trial_started = now
+        return 0.0
+
+    def cancel_call(self) -> None:
+        """Give back the trial slot of a call that was allowed but not made."""
+        if self.state == CircuitState.HALF_OPEN:
+            self._trial_started = None
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._trial_started = None
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the circuit at the threshold."""
+        self.failures += 1
+        if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = CircuitState.OPEN
+            self._opened_at = self._clock()
+            self._trial_started = None
@@ -0,0 +1,313 @@
+"""Resumable photo uploads.
+
+A regular upload that fails halfway has to be sent again from the start,
+which on a patchy mobile connection may never succeed. Resumable uploads
+follow the tus protocol's create/HEAD/PATCH model: the client creates an
+upload with the file size, sends the content in one or more PATCH requests
+that each start at the current offset, asks for the offset (HEAD) after a
+failure and continues from there. Whatever part of a chunk was received
+before a connection dropped counts.
+
+Chunks are appended to a staging file under ``<upload_dir>/.resumable``
+(local disk, whatever the storage backend) and the offset is stored on the
+``resumable_uploads`` row. A complete upload is hashed and stored like a
+regular one. Uploads not resumed within ``resumable_upload_expiry_hours``
+are deleted by ``expire_resumable_uploads``.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import time
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, update
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_settings
+from app.models import ResumableUpload
+from app.services.files import (
+    CHUNK_SIZE,
+    MAX_FILE_SIZE,
+    SavedUpload,
+    store_received_file,
+    validate_extension,
+)
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+STAGING_DIR = ".resumable"
+
+
+def staging_path(upload_id: UUID) -> Path:
+    """Local file the chunks of an upload are written to."""
+    return settings.upload_dir / STAGING_DIR / f"{upload_id}.part"
+
+
+def _expires_at() -> datetime:
+    return datetime.now(UTC) + timedelta(hours=settings.resumable_upload_expiry_hours)
+
+
+def _create_staging_file(path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch(exist_ok=False)
+
+
+async def create_resumable_upload(
+    session: AsyncSession, subfolder: str, owner_id: UUID, filename: str, size: int
+) -> ResumableUpload:
+    """
+    Start a resumable upload.
+
+    Args:
+        session: Database session (committed)
+        subfolder: Subdirectory (e.g., 'plants' or 'pots')
+        owner_id: Plant or pot the photo is for
+        filename: Original file name (for the extension)
+        size: File size in bytes
+
+    Returns:
+        The upload, at offset 0
+    """
+    validate_extension(filename)
+    if size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File too large. Maximum size: {MAX_FILE_SIZE // 1024 // 1024}MB",
+        )
+
+    upload = ResumableUpload(
+        subfolder=subfolder,
+        owner_id=owner_id,
+        filename=filename,
+        size=size,
+        expires_at=_expires_at(),
+    )
+    await asyncio.to_thread(_create_staging_file, staging_path(upload.id))
+    session.add(upload)
+    await session.commit()
+    return upload
+
+
+async def get_resumable_upload(
+    session: AsyncSession, subfolder: str, owner_id: UUID, upload_id: UUID
+) -> ResumableUpload:
+    """Look up an upload of a plant's or pot's photo; 404 if unknown or expired."""
+    upload = await session.get(ResumableUpload, upload_id)
+    if upload is None or (upload.subfolder, upload.owner_id) != (subfolder, owner_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found",
+        )
+    if upload.expires_at.tzinfo is None:  # SQLite drops the timezone
+        upload.expires_at = upload.expires_at.replace(tzinfo=UTC)
+    if upload.expires_at <= datetime.now(UTC):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found",
+        )
+    return upload
+
+
+def _open_at(path: Path, offset: int):
+    out = open(path, "r+b")
+    out.seek(offset)
+    return out
+
+
+async def append_to_resumable_upload(
+    session: AsyncSession, upload: ResumableUpload, offset: int, chunks: AsyncIterator[bytes]
+) -> int:
+    """
+    Write the next part of an upload.
+
+    The bytes written are recorded even if the stream breaks off, so the
+    client can resume from there.
+
+    Args:
+        session: Database session (committed)
+        upload: The upload
+        offset: Offset the client sends from; must be the current one
+        chunks: The request body
+
+    Returns:
+        The new offset
+    """
+    if offset != upload.received:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload offset is {upload.received}",
+        )
+    try:
+        out = await asyncio.to_thread(_open_at, staging_path(upload.id), offset)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found",
+        ) from None
+
+    received = offset
+    try:
+        async for chunk in chunks:
+            if received + len(chunk) > upload.size:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Upload exceeds its declared size",
+                )
+            await asyncio.to_thread(out.write, chunk)
+            received += len(chunk)
+    finally:
+        await asyncio.to_thread(out.close)
+        recorded = received == offset or await _record_offset(session, upload, offset, received)
+    if not recorded:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload was resumed concurrently",
+        )
+    return received
+
+
+async def _record_offset(
+    session: AsyncSession, upload: ResumableUpload, offset: int, received: int
+) -> bool:
+    """Move an upload from ``offset`` to ``received``; False if it has moved already."""
+    # A concurrent request resending the same part may have been first
+    expires_at = _expires_at()
+    result = await session.exec(
+        update(ResumableUpload)
+        .where(ResumableUpload.id == upload.id, ResumableUpload.received == offset)
+        .values(received=received, expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    if result.rowcount == 0:
+        return False
+    upload.received, upload.expires_at = received, expires_at
+    return True
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        while chunk := source.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _link_for_storing(path: Path) -> Path:
+    """A second name for the staging file, for the storage backend to consume."""
+    link = path.with_suffix(".storing")
+    link.unlink(missing_ok=True)
+    try:
+        os.link(path, link)
+    except OSError:  # No hard links on this filesystem
+        shutil.copyfile(path, link)
+    return link
+
+
+async def complete_resumable_upload(session: AsyncSession, upload: ResumableUpload) -> SavedUpload:
+    """
+    Store a fully received upload like a regular one.
+
+    The staging file is kept: if the caller's commit fails, the upload row
+    is restored and can be completed again. Call ``remove_staging_file``
+    once the commit succeeded.
+
+    Args:
+        session: Database session; the upload row is deleted and the file
+            reference added, to be committed together with the caller's
+            photo row
+        upload: The upload
+
+    Returns:
+        Relative (sharded) file path and metadata
+    """
+    if upload.received != upload.size:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload is incomplete: {upload.received} of {upload.size} bytes received",
+        )
+    # Claim the upload, so a concurrent completion finds it gone
+    result = await session.exec(delete(ResumableUpload).where(ResumableUpload.id == upload.id))
+    path = staging_path(upload.id)
+    if result.rowcount == 0 or not path.exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found",
+        )
+
+    sha256 = await asyncio.to_thread(_hash_file, path)
+    ext = validate_extension(upload.filename)
+    link = await asyncio.to_thread(_link_for_storing, path)
+    try:
+        return await store_received_file(session, upload.subfolder, link, ext, sha256, upload.size)
+    finally:
+        await asyncio.to_thread(link.unlink, missing_ok=True)
+
+
+async def remove_staging_file(upload_id: UUID) -> None:
+    """Delete the staging file of an upload whose completion was committed."""
+    await asyncio.to_thread(staging_path(upload_id).unlink, missing_ok=True)
+
+
+async def cancel_resumable_upload(session: AsyncSession, upload: ResumableUpload) -> None:
+    """Delete an upload and what has been received of it."""
+    await session.exec(delete(ResumableUpload).where(ResumableUpload.id == upload.id))
+    await session.commit()
+    await remove_staging_file(upload.id)
+
+
+def _remove_stale_files(cutoff: float) -> int:
+    """Delete staging files last written before ``cutoff``."""
+    removed = 0
+    directory = settings.upload_dir / STAGING_DIR
+    if not directory.is_dir():
+        return removed
+    for path in directory.iterdir():
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:  # Completed or cancelled meanwhile
+            continue
+    return removed
+
+
+async def expire_resumable_uploads(session: AsyncSession) -> int:
+    """
+    Delete uploads that were not resumed in time.
+
+    Staging files are removed by age, which also covers files whose upload
+    row was never committed.
+
+    Returns:
+        Number of expired uploads
+    """
+    result = await session.exec(
+        select(ResumableUpload.id).where(col(ResumableUpload.expires_at) <= datetime.now(UTC))
+    )
+    expired = list(result.all())
+    if expired:
+        await session.exec(delete(ResumableUpload).where(col(ResumableUpload.id).in_(expired)))
+        await session.commit()
+
+    cutoff = time.time() - settings.resumable_upload_expiry_hours * 3600
+
+    def remove() -> None:
+        for upload_id in expired:
+            staging_path(upload_id).unlink(missing_ok=True)
+
+    await asyncio.to_thread(remove)
+    stale = await asyncio.to_thread(_remove_stale_files, cutoff)
+    if expired or stale:
+        logger.info("Expired %d resumable uploads (%d stale files)", len(expired), stale)
+    return len(expired)
@@ -0,0 +1,133 @@
+"""Local species catalogue.
+
+Species seen in identification results (and an optional bundled seed list)
+are kept in the ``species`` table, with every scientific and common name
+stored normalized in ``species_names``. Autocomplete is a prefix range scan
+on the indexed ``species_names.name`` column.
+"""
+
+import json
+import unicodedata
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import func
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.database import dialect_insert
+from app.models import Species, SpeciesName
+
+# Upper bound for prefix range scans: sorts after any other character.
+_MAX_CHAR = "\U0010ffff"
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip accents and collapse whitespace for searching."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+async def upsert_species(session: AsyncSession, entries: Iterable[dict]) -> None:
+    """
+    Add species to the catalogue, merging new common names into known ones.
+
+    Args:
+        session: Database session (not committed)
+        entries: Dicts with ``scientific_name`` and optional ``common_names``,
+            ``genus`` and ``family`` (the identification result format)
+    """
+    by_name = {
+        entry["scientific_name"].strip(): entry
+        for entry in entries
+        if entry.get("scientific_name", "").strip()
+    }
+    if not by_name:
+        return
+
+    now = datetime.now(UTC)
+    await session.exec(
+        dialect_insert(session, Species)
+        .values(
+            [
+                {
+                    "id": uuid4(),
+                    "scientific_name": name,
+                    "common_names": list(entry.get("common_names") or []),
+                    "genus": entry.get("genus") or "",
+                    "family": entry.get("family") or "",
+                    "created_at": now,
+                }
+                for name, entry in by_name.items()
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=["scientific_name"])
+    )
+
+    result = await session.exec(select(Species).where(col(Species.scientific_name).in_(by_name)))
+    names = []
+    for species in result.all():
+        common_names = list(species.common_names)
+        for common_name in by_name[species.scientific_name].get("common_names") or []:
+            if common_name not in common_names:
+                common_names.append(common_name)
+        if common_names != species.common_names:
+            species.common_names = common_names
+            session.add(species)
+
+        searchable = {normalize_name(n) for n in [species.scientific_name, *common_names]}
+        names.extend(
+            {"id": uuid4(), "species_id": species.id, "name": name} for name in searchable if name
+        )
+
+    await session.exec(
+        dialect_insert(session, SpeciesName)
+        .values(names)
+        .on_conflict_do_nothing(index_elements=["species_id", "name"])
+    )
+
+
+async def search_species(session: AsyncSession, query: str, limit: int = 10) -> list[Species]:
+    """
+    Find species whose scientific or common name starts with ``query``.
+
+    Matching ignores case, accents and repeated whitespace. Results are
+    ordered by the matching name.
+    """
+    prefix = normalize_name(query)
+    if not prefix:
+        return []
+
+    result = await session.exec(
+        select(Species)
+        .join(SpeciesName, col(SpeciesName.species_id) == Species.id)
+        .where(SpeciesName.name >= prefix, SpeciesName.name < prefix + _MAX_CHAR)
+        .order_by(col(SpeciesName.name))
+        .limit(limit * 4)  # a species can match through several names
+    )
+    matches: dict = {}
+    for species in result.all():
+        matches.setdefault(species.id, species)
+        if len(matches) == limit:
+            break
+    return list(matches.values())
+
+
+async def seed_species(session: AsyncSession, path: Path) -> int:
+    """
+    Load the bundled species list into an empty catalogue.
+
+    Returns:
+        Number of species loaded (0 if the catalogue already has entries)
+    """
+    existing = await session.exec(select(func.count()).select_from(Species))
+    if existing.one() or not path.is_file():
+        return 0
+
+    entries = json.loads(path.read_text(encoding="utf-8"))
+    await upsert_species(session, entries)
+    await session.commit()
+    return len(entries)
@@ -0,0 +1,508 @@
+"""Photo storage backends.
+
+Photos and their variants are stored under keys of the form
+``<subfolder>/<file_path>`` (e.g. ``plants/ab/cd/abcd….jpg``) and served at
+``/uploads/<key>``. ``STORAGE_BACKEND`` selects where the bytes live:
+
+- ``local``: files under ``upload_dir``, served by the API.
+- ``s3``: an S3-compatible bucket (AWS, MinIO). ``/uploads`` redirects to
+  presigned GET URLs and clients can upload with presigned PUT URLs, so
+  photo bytes do not pass through the API.
+"""
+
+import asyncio
+import base64
+import hashlib
+import mimetypes
+import os
+import posixpath
+import shutil
+import stat
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Iterator, Sequence
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import quote
+
+import httpx
+from fastapi import HTTPException, Request, status
+from fastapi.responses import FileResponse, RedirectResponse, Response
+
+from app.core.config import get_settings
+from app.services.s3 import SigV4Signer
+
+settings = get_settings()
+
+CHUNK_SIZE = 256 * 1024  # 256 KB
+# Stored files never change: a new content gets a new key
+IMMUTABLE = "public, max-age=31536000, immutable"
+S3_NS = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("image/avif", ".avif")
+
+
+def content_type(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+def etag(key: str) -> str:
+    """Strong ETag of a stored file, derived from its (immutable) key."""
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def _etag_matches(request: Request, tag: str) -> bool:
+    """Whether ``If-None-Match`` lists ``tag`` (weak comparison, RFC 9110)."""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+    return "*" in candidates or tag in candidates
+
+
+@dataclass
+class StoredObject:
+    """A stored file."""
+
+    key: str
+    size: int
+    modified: float  # Unix time
+
+
+@dataclass
+class PresignedUpload:
+    """A URL a client uploads one file to, bypassing the API."""
+
+    url: str
+    headers: dict[str, str]  # To send with the PUT request
+    expires_at: datetime
+
+
+class Storage(ABC):
+    """Where uploaded photos and their variants are kept."""
+
+    # Whether clients can upload with presigned URLs
+    direct_uploads = False
+
+    @abstractmethod
+    async def save(self, path: Path, key: str, alternatives: Sequence[str] = ()) -> None:
+        """
+        Store a local file under ``key``; the local file is consumed.
+
+        If ``key`` already exists it holds the same content (keys are
+        content hashes): the file is dropped and the stored object touched,
+        which restarts the orphan collector's grace period.
+
+        Args:
+            path: Local file
+            key: Storage key
+            alternatives: Keys that may hold the same content, which the
+                backend can link instead of storing another copy
+        """
+
+    @abstractmethod
+    async def stat(self, key: str) -> StoredObject | None:
+        """Size and modification time of a stored file, or None if missing."""
+
+    @abstractmethod
+    async def delete(self, keys: Sequence[str]) -> None:
+        """Delete stored files; missing ones are ignored."""
+
+    @abstractmethod
+    async def move(self, key: str, target: str) -> None:
+        """Move a stored file, setting its modification time to now."""
+
+    @abstractmethod
+    def list_files(self, prefix: str, batch_size: int) -> AsyncIterator[list[StoredObject]]:
+        """Stream the files under the ``prefix`` directory in batches."""
+
+    @abstractmethod
+    def local_copy(self, key: str) -> AbstractAsyncContextManager[Path]:
+        """
+        A local path holding the file while the context is open.
+
+        Files written next to it can be stored with ``save``.
+        """
+
+    @abstractmethod
+    async def serve(self, key: str, request: Request) -> Response:
+        """Response for ``GET /uploads/<key>``."""
+
+    @abstractmethod
+    async def presign_upload(self, key: str, size: int, sha256: str) -> PresignedUpload:
+        """
+        Presigned PUT URL for a direct upload of ``size`` bytes with the given hash.
+
+        Backends without ``direct_uploads`` reject the request with a 400.
+        """
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Release connections."""
+
+
+def _scan(root: Path, prefix: str, batch_size: int) -> Iterator[list[StoredObject]]:
+    """
+    Walk ``root`` with ``os.scandir`` iterators, yielding batches of files.
+
+    Directory listings are streamed rather than read into memory. Hidden
+    directories (such as the trash) are skipped.
+    """
+    batch: list[StoredObject] = []
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith("."):
+                        pending.append(Path(entry.path))
+                    continue
+                info = entry.stat(follow_symlinks=False)
+                relative = Path(entry.path).relative_to(root).as_posix()
+                batch.append(StoredObject(f"{prefix}/{relative}", info.st_size, info.st_mtime))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+class LocalStorage(Storage):
+    """Files under ``upload_dir``."""
+
+    def path(self, key: str) -> Path:
+        return settings.upload_dir / key
+
+    async def save(self, path: Path, key: str, alternatives: Sequence[str] = ()) -> None:
+        target = self.path(key)
+        if path == target:  # Written in place, e.g. a variant
+            return
+        siblings = [self.path(alternative) for alternative in alternatives]
+        await asyncio.to_thread(self._save, path, target, siblings)
+
+    @staticmethod
+    def _save(path: Path, target: Path, siblings: list[Path]) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if target.exists():
+            path.unlink()
+            os.utime(target)
+            return
+        for sibling in siblings:
+            try:
+                os.link(sibling, target)
+            except FileNotFoundError:
+                continue
+            except FileExistsError:  # A concurrent upload of the same content
+                pass
+            except OSError:  # No hard links (other filesystem): keep a copy
+                break
+            path.unlink()
+            os.utime(target)
+            return
+        os.replace(path, target)
+
+    async def stat(self, key: str) -> StoredObject | None:
+        try:
+            info = await asyncio.to_thread(self.path(key).stat)
+        except FileNotFoundError:
+            return None
+        return StoredObject(key, info.st_size, info.st_mtime)
+
+    async def delete(self, keys: Sequence[str]) -> None:
+        def unlink_all() -> None:
+            for key in keys:
+                self.path(key).unlink(missing_ok=True)
+
+        await asyncio.to_thread(unlink_all)
+
+    async def move(self, key: str, target: str) -> None:
+        def move() -> None:
+            target_path = self.path(target)
+            target_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self.path(key), target_path)
+            os.utime(target_path)
+
+        await asyncio.to_thread(move)
+
+    async def list_files(self, prefix: str, batch_size: int) -> AsyncIterator[list[StoredObject]]:
+        root = self.path(prefix)
+        if not await asyncio.to_thread(root.is_dir):
+            return
+        batches = _scan(root, prefix, batch_size)
+        while batch := await asyncio.to_thread(next, batches, None):
+            yield batch
+
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[Path]:
+        yield self.path(key)
+
+    async def serve(self, key: str, request: Request) -> Response:
+        """
+        Serve a file with long-lived caching headers.
+
+        Revalidations get a 304 without touching the file. Range requests
+        and, on servers with the ASGI ``pathsend`` extension, zero-copy
+        transfers are handled by ``FileResponse``; a front proxy can take
+        over the transfer entirely (``upload_sendfile_header``).
+        """
+        path = self.path(key)
+        try:
+            stat_result = await asyncio.to_thread(path.stat)
+        except FileNotFoundError:
+            stat_result = None
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+        headers = {"Cache-Control": IMMUTABLE, "ETag": etag(key)}
+        if _etag_matches(request, headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        sendfile_header = settings.upload_sendfile_header.lower()
+        if sendfile_header == "x-accel-redirect":
+            headers["X-Accel-Redirect"] = quote(settings.upload_accel_prefix + key)
+            return Response(headers=headers, media_type=content_type(key))
+        if sendfile_header == "x-sendfile":
+            headers["X-Sendfile"] = str(path.resolve())
+            return Response(headers=headers, media_type=content_type(key))
+        return FileResponse(path, headers=headers, stat_result=stat_result)
+
+    async def presign_upload(self, key: str, size: int, sha256: str) -> PresignedUpload:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Direct uploads are not supported by the storage backend",
+        )
+
+    async def close(self) -> None:
+        pass
+
+
+class S3Storage(Storage):
+    """Files in an S3-compatible bucket, addressed path-style."""
+
+    direct_uploads = True
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        public_endpoint_url: str = "",
+        presign_expiry: int = 3600,
+        client: httpx.AsyncClient | None = None,
+    ) -> None:
+        self.endpoint_url = endpoint_url.rstrip("/")
+        # Presigned URLs are used by browsers, which may reach the storage
+        # under another host name than the API does (e.g. inside Docker)
+        self.public_endpoint_url = (public_endpoint_url or endpoint_url).rstrip("/")
+        self.bucket = bucket
+        self.signer = SigV4Signer(access_key, secret_key, region)
+        self.presign_expiry = presign_expiry
+        self._client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=5.0))
+        return self._client
+
+    def _url(self, key: str = "", public: bool = False) -> str:
+        endpoint = self.public_endpoint_url if public else self.endpoint_url
+        return f"{endpoint}/{self.bucket}/{key}".rstrip("/")
+
+    async def _request(
+        self,
+        method: str,
+        key: str = "",
+        *,
+        query: dict[str, str] | None = None,
+        headers: dict[str, str] | None = None,
+        content: AsyncIterator[bytes] | None = None,
+    ) -> httpx.Response:
+        url = self._url(key)
+        signed = self.signer.sign_headers(method, url, query, headers)
+        return await self.client.request(method, url, params=query, headers=signed, content=content)
+
+    async def save(self, path: Path, key: str, alternatives: Sequence[str] = ()) -> None:
+        try:
+            if await self.stat(key) is not None:
+                await self._copy(key, key)  # Touch
+                return
+            size = (await asyncio.to_thread(path.stat)).st_size
+            response = await self._request(
+                "PUT",
+                key,
+                headers={
+                    "cache-control": IMMUTABLE,
+                    "content-type": content_type(key),
+                    "content-length": str(size),
+                },
+                content=_read_chunks(path),
+            )
+            response.raise_for_status()
+        finally:
+            await asyncio.to_thread(path.unlink, missing_ok=True)
+
+    async def _copy(self, key: str, target: str) -> None:
+        response = await self._request(
+            "PUT",
+            target,
+            headers={
+                "cache-control": IMMUTABLE,
+                "content-type": content_type(target),
+                "x-amz-copy-source": f"/{self.bucket}/{key}",
+                "x-amz-metadata-directive": "REPLACE",
+            },
+        )
+        response.raise_for_status()
+
+    async def stat(self, key: str) -> StoredObject | None:
+        response = await self._request("HEAD", key)
+        if response.status_code == status.HTTP_404_NOT_FOUND:
+            return None
+        response.raise_for_status()
+        modified = parsedate_to_datetime(response.headers["last-modified"])
+        return StoredObject(key, int(response.headers["content-length"]), modified.timestamp())
+
+    async def delete(self, keys: Sequence[str]) -> None:
+        async def delete_one(key: str) -> None:
+            response = await self._request("DELETE", key)
+            if response.status_code != status.HTTP_404_NOT_FOUND:
+                response.raise_for_status()
+
+        await asyncio.gather(*(delete_one(key) for key in keys))
+
+    async def move(self, key: str, target: str) -> None:
+        await self._copy(key, target)
+        await self.delete([key])
+
+    async def list_files(self, prefix: str, batch_size: int) -> AsyncIterator[list[StoredObject]]:
+        query = {"list-type": "2", "max-keys": str(min(batch_size, 1000)), "prefix": f"{prefix}/"}
+        while True:
+            response = await self._request("GET", query=query)
+            response.raise_for_status()
+            result = ET.fromstring(response.content)
+            batch = [
+                StoredObject(
+                    key=item.findtext(f"{S3_NS}Key", ""),
+                    size=int(item.findtext(f"{S3_NS}Size", "0")),
+                    modified=datetime.fromisoformat(
+                        item.findtext(f"{S3_NS}LastModified", "")
+                    ).timestamp(),
+                )
+                for item in result.iter(f"{S3_NS}Contents")
+            ]
+            if batch:
+                yield batch
+            token = result.findtext(f"{S3_NS}NextContinuationToken")
+            if result.findtext(f"{S3_NS}IsTruncated") != "true" or not token:
+                return
+            query["continuation-token"] = token
+
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[Path]:
+        directory = Path(await asyncio.to_thread(tempfile.mkdtemp, prefix="kratzbaum-"))
+        try:
+            path = directory / posixpath.basename(key)
+            url = self._url(key)
+            headers = self.signer.sign_headers("GET", url)
+            async with self.client.stream("GET", url, headers=headers) as response:
+                response.raise_for_status()
+                out = await asyncio.to_thread(open, path, "wb")
+                try:
+                    async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                        await asyncio.to_thread(out.write, chunk)
+                finally:
+                    await asyncio.to_thread(out.close)
+            yield path
+        finally:
+            await asyncio.to_thread(shutil.rmtree, directory, ignore_errors=True)
+
+    async def serve(self, key: str, request: Request) -> Response:
+        # Sign with a time rounded down to half the expiry, so the URL of a
+        # photo stays the same for a while and browsers can cache the image
+        window = max(self.presign_expiry // 2, 1)
+        now = time.time()
+        signed_at = now - now % window
+        url = self.signer.presign(
+            "GET",
+            self._url(key, public=True),
+            self.presign_expiry,
+            now=datetime.fromtimestamp(signed_at, UTC),
+        )
+        return RedirectResponse(
+            url,
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+            headers={"Cache-Control": f"private, max-age={int(signed_at + window - now)}"},
+        )
+
+    async def presign_upload(self, key: str, size: int, sha256: str) -> PresignedUpload:
+        # The storage rejects a body of another length or hash
+        headers = {
+            "cache-control": IMMUTABLE,
+            "content-type": content_type(key),
+            "x-amz-checksum-sha256": base64.b64encode(bytes.fromhex(sha256)).decode(),
+        }
+        now = datetime.now(UTC)
+        url = self.signer.presign(
+            "PUT",
+            self._url(key, public=True),
+            self.presign_expiry,
+            headers={**headers, "content-length": str(size)},
+            now=now,
+        )
+        return PresignedUpload(url, headers, now + timedelta(seconds=self.presign_expiry))
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+async def _read_chunks(path: Path) -> AsyncIterator[bytes]:
+    file = await asyncio.to_thread(open, path, "rb")
+    try:
+        while chunk := await asyncio.to_thread(file.read, CHUNK_SIZE):
+            yield chunk
+    finally:
+        await asyncio.to_thread(file.close)
+
+
+_storage: Storage | None = None
+
+
+def get_storage() -> Storage:
+    """The configured storage backend."""
+    global _storage
+    if _storage is None:
+        if settings.storage_backend == "local":
+            _storage = LocalStorage()
+        elif settings.storage_backend == "s3":
+            _storage = S3Storage(
+                settings.s3_endpoint_url,
+                settings.s3_bucket,
+                settings.s3_access_key,
+                settings.s3_secret_key,
+                region=settings.s3_region,
+                public_endpoint_url=settings.s3_public_endpoint_url,
+                presign_expiry=settings.s3_presign_expiry_seconds,
+            )
+        else:
+            raise ValueError(f"Unknown storage backend: {settings.storage_backend}")
+    return _storage
+
+
+async def close_storage() -> None:
+    """Close the storage backend's connections (on shutdown)."""
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
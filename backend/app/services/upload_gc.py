@@ -0,0 +1,179 @@
+"""Orphaned upload collection.
+
+Photo deletions release their files through reference counting, and a
+content-addressed file whose last reference is released is left for the
+collector, as a concurrent upload may be reusing it. Files are also left
+behind by requests that crashed between writing the file and committing
+the photo, variants of re-rendered photos and abandoned ``.part`` files,
+besides uploads from before content addressing. The collector walks
+each upload subfolder in batches and looks the batch up in the database, so
+neither the directory listing nor the referenced paths are held in memory
+at once. Unreferenced files older than the grace period are deleted, or
+moved to ``.trash/`` in the storage when trash mode is on.
+"""
+
+import logging
+import re
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import delete
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_settings
+from app.models import StoredFile
+from app.services.files import ALLOWED_EXTENSIONS, PHOTO_MODELS
+from app.services.storage import Storage, StoredObject, get_storage
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+TRASH_DIR = ".trash"
+
+# Variant files are named ``<stem>.<size>.<format>`` after their photo
+VARIANT_NAME = re.compile(r"^(?P<stem>.+)\.\d+\.(?:webp|avif)$")
+
+
+@dataclass
+class GcReport:
+    """Outcome of a collection run."""
+
+    scanned: int = 0
+    orphans: int = 0
+    reclaimed_bytes: int = 0
+    trash_purged: int = 0
+    trash_purged_bytes: int = 0
+    dry_run: bool = False
+
+
+def _owner_paths(path: str) -> list[str]:
+    """Photo ``file_path`` values that keep the file at ``path`` alive."""
+    match = VARIANT_NAME.match(path)
+    if match is None:
+        return [path]
+    return [path, *(match["stem"] + ext for ext in sorted(ALLOWED_EXTENSIONS))]
+
+
+async def _remove(
+    storage: Storage, orphans: list[StoredObject], cutoff: float, trash: bool
+) -> list[StoredObject]:
+    """
+    Delete or trash orphaned files.
+
+    A file touched since it was listed (reused by a new upload) is kept.
+
+    Returns:
+        The files actually removed
+    """
+    removed = []
+    for orphan in orphans:
+        current = await storage.stat(orphan.key)
+        if current is None or current.modified >= cutoff:
+            continue
+        if trash:
+            await storage.move(orphan.key, f"{TRASH_DIR}/{orphan.key}")
+        else:
+            await storage.delete([orphan.key])
+        removed.append(orphan)
+    return removed
+
+
+async def _purge_trash(storage: Storage, cutoff: float, batch_size: int) -> tuple[int, int]:
+    """Delete trashed files older than ``cutoff``; returns (files, bytes)."""
+    files = size = 0
+    async for batch in storage.list_files(TRASH_DIR, batch_size):
+        expired = [item for item in batch if item.modified < cutoff]
+        await storage.delete([item.key for item in expired])
+        files += len(expired)
+        size += sum(item.size for item in expired)
+    return files, size
+
+
+async def collect_orphaned_uploads(
+    session: AsyncSession,
+    *,
+    dry_run: bool = False,
+    grace_hours: float | None = None,
+    trash: bool | None = None,
+    batch_size: int | None = None,
+) -> GcReport:
+    """
+    Delete uploaded files that no photo references.
+
+    Args:
+        session: Database session
+        dry_run: Only count the orphans, remove nothing
+        grace_hours: Minimum file age; defaults to ``upload_gc_grace_hours``
+        trash: Move orphans to the trash instead of deleting them; defaults
+            to ``upload_gc_trash``
+        batch_size: Files looked up per query; defaults to ``upload_gc_batch_size``
+
+    Returns:
+        Counts and bytes of the orphans found (and removed unless ``dry_run``)
+    """
+    if grace_hours is None:
+        grace_hours = settings.upload_gc_grace_hours
+    if trash is None:
+        trash = settings.upload_gc_trash
+    batch_size = batch_size or settings.upload_gc_batch_size
+    cutoff = time.time() - grace_hours * 3600
+    storage = get_storage()
+    report = GcReport(dry_run=dry_run)
+
+    for subfolder, model in PHOTO_MODELS.items():
+        async for listed in storage.list_files(subfolder, batch_size):
+            batch = {
+                item.key.removeprefix(f"{subfolder}/"): item
+                for item in listed
+                if item.modified < cutoff
+            }
+            report.scanned += len(batch)
+            if not batch:
+                continue
+            candidates = {owner for path in batch for owner in _owner_paths(path)}
+            result = await session.exec(
+                select(model.file_path).where(col(model.file_path).in_(candidates))
+            )
+            referenced = set(result.all())
+            orphans = {
+                path: item
+                for path, item in batch.items()
+                if referenced.isdisjoint(_owner_paths(path))
+            }
+            if not orphans:
+                continue
+
+            if dry_run:
+                removed = list(orphans.values())
+            else:
+                removed = await _remove(storage, list(orphans.values()), cutoff, trash)
+                await session.exec(
+                    delete(StoredFile).where(
+                        StoredFile.subfolder == subfolder,
+                        col(StoredFile.file_path).in_(
+                            [item.key.removeprefix(f"{subfolder}/") for item in removed]
+                        ),
+                    )
+                )
+                await session.commit()
+            report.orphans += len(removed)
+            report.reclaimed_bytes += sum(item.size for item in removed)
+
+    if not dry_run:
+        report.trash_purged, report.trash_purged_bytes = await _purge_trash(
+            storage, time.time() - settings.upload_gc_trash_days * 86400, batch_size
+        )
+
+    logger.info(
+        "Upload GC%s: scanned %d files, %d orphans, %d bytes reclaimed, "
+        "%d trashed files purged (%d bytes)",
+        " (dry run)" if dry_run else "",
+        report.scanned,
+        report.orphans,
+        report.reclaimed_bytes,
+        report.trash_purged,
+        report.trash_purged_bytes,
+    )
+    return report
@@ -0,0 +1,62 @@
+"""Standalone background worker.
+
+Runs the periodic jobs (due reminders, push outbox delivery, cleanup) in a
+dedicated process with its own database pool, so a slow tick never competes
+with API requests for the event loop::
+
+    python -m app.worker
+
+Set ``SCHEDULER_ENABLED=false`` on the API processes when using it. Several
+workers may run at once; leader election ensures only one executes jobs.
+"""
+
+import asyncio
+import logging
+import signal
+
+from app.core.database import engine, init_db
+from app.scheduler.runner import create_scheduler
+from app.services import storage
+from app.services.push import close_http_client
+from app.services.push_crypto import shutdown_executor
+
+logger = logging.getLogger(__name__)
+
+
+async def run(stop: asyncio.Event | None = None) -> None:
+    """Run the scheduler until ``stop`` is set or SIGINT/SIGTERM is received."""
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await init_db()
+
+    scheduler = create_scheduler()
+    scheduler.start()
+    logger.info("Background worker started")
+
+    try:
+        await stop.wait()
+    finally:
+        await scheduler.shutdown()
+        await close_http_client()
+        shutdown_executor()
+        await storage.close_storage()
+        await engine.dispose()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+        logger.info("Background worker stopped")
+
+
+def main() -> None:
+    """Console entry point."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""Load test ``POST /api/identify`` with concurrent users.
+
+By default runs the whole stack locally: the PlantNet stub (with optional
+latency, errors and quota) and the API under uvicorn, both in background
+threads, with a throwaway SQLite database and upload directory. A probe on
+the API's event loop measures how late its timers fire (event-loop lag),
+which shows work blocking the loop, e.g. image decoding or hashing.
+
+Each user sends identifications back to back until ``--requests`` have
+been sent. Images are real JPEGs; ``--repeat-ratio`` controls how many
+requests reuse an already identified image (cache hits) instead of a
+unique one.
+
+Usage::
+
+    uv run python -m benchmarks.bench_identify_load --users 20 --requests 500
+    uv run python -m benchmarks.bench_identify_load --latency-ms 800 --jitter-ms 200 \\
+        --error-rate 0.05 --repeat-ratio 0.3
+
+    # Against a running API (no stub, no loop lag)
+    uv run python -m benchmarks.bench_identify_load --url http://127.0.0.1:8000 --token ...
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+from PIL import Image
+
+from benchmarks.plantnet_stub import (
+    IDENTIFY_PATH,
+    add_stub_arguments,
+    create_app,
+    serve_in_thread,
+    stub_config_from_args,
+)
+
+LAG_INTERVAL = 0.01  # seconds between event-loop lag samples
+
+# Outcomes where the API refused to call PlantNet; a run dominated by them
+# measures the limiter, not the identify path
+REFUSED_OUTCOMES = {"RATE_LIMITED", "UPSTREAM_UNAVAILABLE", "HTTP 429", "HTTP 503"}
+
+
+class LoopLagMonitor:
+    """Samples how late ``asyncio.sleep`` wakes up on the loop it runs on."""
+
+    def __init__(self, interval: float = LAG_INTERVAL) -> None:
+        self.interval = interval
+        self.samples: list[float] = []  # milliseconds
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append((loop.time() - start - self.interval) * 1000)
+
+
+@dataclass
+class LoadResult:
+    """Outcome of the measured requests."""
+
+    latencies: list[float] = field(default_factory=list)  # milliseconds
+    outcomes: Counter = field(default_factory=Counter)
+    elapsed: float = 0.0
+
+
+def make_jpeg(side: int) -> bytes:
+    """A noisy ``side`` x ``3/4 side`` JPEG, roughly the size of a phone photo."""
+    image = Image.effect_noise((side, side * 3 // 4), 48).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def percentile(values: list[float], pct: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+class ImageSource:
+    """
+    Hands out request images.
+
+    Unique images are the base JPEG with a counter appended after the end
+    marker: decoders ignore it, but it changes the content hash, so each one
+    is a cache miss.
+    """
+
+    def __init__(self, base: bytes, repeat_ratio: float, seed: int | None) -> None:
+        self.base = base
+        self.repeat_ratio = repeat_ratio
+        self._rng = random.Random(seed)
+        self._counter = 0
+
+    def next(self) -> bytes:
+        if self._rng.random() < self.repeat_ratio:
+            return self.base
+        self._counter += 1
+        return self.base + self._counter.to_bytes(8, "big")
+
+
+def _outcome(response: httpx.Response) -> str:
+    if response.status_code != 200:
+        return f"HTTP {response.status_code}"
+    return response.json().get("error_code") or "OK"
+
+
+async def run_load(
+    base_url: str,
+    token: str,
+    images: ImageSource,
+    users: int,
+    requests: int,
+) -> LoadResult:
+    """Send ``requests`` identifications from ``users`` concurrent users."""
+    result = LoadResult()
+    remaining = requests
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"Authorization": f"Bearer {token}"},
+        limits=limits,
+        timeout=120.0,
+    ) as client:
+
+        async def user() -> None:
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                files = {"image": ("plant.jpg", images.next(), "image/jpeg")}
+                start = time.perf_counter()
+                try:
+                    response = await client.post(
+                        "/api/identify", files=files, data={"organ": "leaf"}
+                    )
+                    outcome = _outcome(response)
+                except httpx.HTTPError as exc:
+                    outcome = type(exc).__name__
+                result.latencies.append((time.perf_counter() - start) * 1000)
+                result.outcomes[outcome] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(users)))
+        result.elapsed = time.perf_counter() - start
+    return result
+
+
+async def fetch_stats(base_url: str, token: str) -> dict | None:
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.get(
+            "/api/identify/stats", headers={"Authorization": f"Bearer {token}"}
+        )
+    return response.json() if response.status_code == 200 else None
+
+
+def report(result: LoadResult, lag: list[float] | None, stats: dict | None) -> None:
+    latencies = result.latencies
+    print(f"requests    {len(latencies)} in {result.elapsed:.2f} s")
+    print(f"throughput  {len(latencies) / result.elapsed:.1f} req/s")
+    print(
+        f"latency     p50 {percentile(latencies, 50):8.1f} ms"
+        f"   p95 {percentile(latencies, 95):8.1f} ms"
+        f"   p99 {percentile(latencies, 99):8.1f} ms"
+        f"   max {max(latencies):8.1f} ms"
+    )
+    if lag:
+        print(
+            f"loop lag    p50 {percentile(lag, 50):8.1f} ms"
+            f"   p95 {percentile(lag, 95):8.1f} ms"
+            f"   p99 {percentile(lag, 99):8.1f} ms"
+            f"   max {max(lag):8.1f} ms"
+        )
+    else:
+        print("loop lag    n/a (external API)")
+    print("outcomes    " + ", ".join(f"{k}: {v}" for k, v in result.outcomes.most_common()))
+    if stats:
+        print(
+            "server      "
+            f"memory hits {stats['memory_hits']}, database hits {stats['database_hits']}, "
+            f"upstream calls {stats['upstream_calls']}, "
+            f"rejected locally {stats['rejected_locally']}, coalesced {stats['coalesced']}, "
+            f"bytes {stats['bytes_received']} -> {stats['bytes_uploaded']}"
+        )
+
+
+def check_outcomes(result: LoadResult) -> bool:
+    """Warn on stderr and return False if most requests were refused."""
+    refused = sum(result.outcomes[outcome] for outcome in REFUSED_OUTCOMES)
+    total = sum(result.outcomes.values())
+    if total and refused * 2 > total:
+        print(
+            f"WARNING: {refused} of {total} requests were refused (rate limit or open "
+            "circuit breaker); results do not reflect the identify path",
+            file=sys.stderr,
+        )
+        return False
+    return True
+
+
+def _configure_environment(workdir: Path, plantnet_url: str) -> None:
+    """Point the application at throwaway storage and the stub (before import)."""
+    os.environ.update(
+        {
+            "DATABASE_URL": f"sqlite+aiosqlite:///{workdir / 'bench.db'}",
+            "UPLOAD_DIR": str(workdir / "uploads"),
+            "PLANTNET_API_URL": plantnet_url,
+            "PLANTNET_API_KEY": "bench",
+            "PLANTNET_RATE_LIMIT_PER_MINUTE": "0",
+            "IDENTIFY_JOB_WORKERS": "0",
+            "SCHEDULER_ENABLED": "false",
+        }
+    )
+
+
+@contextmanager
+def local_stack(args: argparse.Namespace) -> Iterator[tuple[str, str, LoopLagMonitor]]:
+    """Start the stub and the API; yields (base URL, token, lag monitor)."""
+    stub_app = create_app(stub_config_from_args(args))
+    with (
+        tempfile.TemporaryDirectory() as tmp,
+        serve_in_thread(stub_app) as stub_url,
+    ):
+        _configure_environment(Path(tmp), stub_url + IDENTIFY_PATH)
+        (Path(tmp) / "uploads").mkdir()
+
+        from app.core.security import create_access_token
+        from app.main import app
+
+        monitor = LoopLagMonitor()
+        app_lifespan = app.router.lifespan_context
+
+        @asynccontextmanager
+        async def lifespan_with_monitor(app):
+            task = asyncio.create_task(monitor.run())
+            try:
+                async with app_lifespan(app) as state:
+                    yield state
+            finally:
+                task.cancel()
+
+        app.router.lifespan_context = lifespan_with_monitor
+        with serve_in_thread(app) as api_url:
+            yield api_url, create_access_token({"sub": "bench"}), monitor
+        stub_stats = stub_app.state.stats
+        print(
+            f"stub        calls {stub_stats.calls}, errors {stub_stats.errors}, "
+            f"quota rejections {stub_stats.quota_rejections}"
+        )
+        if not stub_stats.calls:
+            print("WARNING: no request reached the PlantNet stub", file=sys.stderr)
+
+
+def benchmark(
+    base_url: str,
+    token: str,
+    args: argparse.Namespace,
+    monitor: LoopLagMonitor | None,
+) -> LoadResult:
+    base = make_jpeg(args.image_side)
+    images = ImageSource(base, args.repeat_ratio, args.seed)
+    print(
+        f"users: {args.users}, requests: {args.requests}, image: {len(base) // 1024} KB, "
+        f"repeat ratio: {args.repeat_ratio}"
+    )
+
+    if args.warmup:
+        asyncio.run(run_load(base_url, token, images, min(args.users, args.warmup), args.warmup))
+    lag_start = len(monitor.samples) if monitor else 0
+    result = asyncio.run(run_load(base_url, token, images, args.users, args.requests))
+    lag = monitor.samples[lag_start:] if monitor else None
+    report(result, lag, asyncio.run(fetch_stats(base_url, token)))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="concurrent users")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests first")
+    parser.add_argument("--image-side", type=int, default=2000, help="image width in pixels")
+    parser.add_argument(
+        "--repeat-ratio", type=float, default=0.0, help="fraction of requests reusing an image"
+    )
+    parser.add_argument("--url", help="benchmark a running API instead of a local one")
+    parser.add_argument("--token", help="bearer token for --url")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    if args.url:
+        if not args.token:
+            parser.error("--token is required with --url")
+        result = benchmark(args.url.rstrip("/"), args.token, args, monitor=None)
+    else:
+        with local_stack(args) as (base_url, token, monitor):
+            result = benchmark(base_url, token, args, monitor)
+    if not check_outcomes(result):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
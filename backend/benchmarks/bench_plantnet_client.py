@@ -0,0 +1,98 @@
+"""Benchmark PlantNet per-call latency: client per request vs. shared pool.
+
+Starts the local PlantNet stub over HTTPS (self-signed certificate) and
+runs sequential identifications twice:
+
+- **before**: a new ``httpx.AsyncClient`` per call (fresh TCP+TLS handshake)
+- **after**: ``identify_plant`` with the application-scoped pooled client
+
+Usage::
+
+    uv run python -m benchmarks.bench_plantnet_client --calls 200
+"""
+
+import argparse
+import asyncio
+import ssl
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from app.services import plantnet
+from benchmarks.plantnet_stub import (
+    IDENTIFY_PATH,
+    create_app,
+    generate_self_signed_cert,
+    serve_in_thread,
+)
+
+IMAGE = b"\xff\xd8\xff" + b"0" * 200_000  # ~200 KB payload
+
+
+async def call_with_new_client(url: str, verify: ssl.SSLContext) -> None:
+    """The previous implementation: one client (and handshake) per call."""
+    async with httpx.AsyncClient(timeout=30.0, verify=verify) as client:
+        response = await client.post(
+            url,
+            params={"api-key": "bench"},
+            files={"images": ("plant.jpg", IMAGE, "image/jpeg")},
+            data={"organs": "leaf"},
+        )
+        response.json()
+
+
+async def measure(calls: int, func) -> list[float]:
+    await func()  # warm up
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label: str, timings: list[float]) -> None:
+    quantiles = statistics.quantiles(timings, n=100)
+    print(
+        f"{label:<8} mean {statistics.mean(timings):7.2f} ms"
+        f"   p50 {quantiles[49]:7.2f} ms   p95 {quantiles[94]:7.2f} ms"
+    )
+
+
+async def run(base_url: str, cert: Path, calls: int) -> None:
+    url = base_url + IDENTIFY_PATH
+    verify = ssl.create_default_context(cafile=str(cert))
+
+    before = await measure(calls, lambda: call_with_new_client(url, verify))
+
+    plantnet.settings.plantnet_api_url = url
+    plantnet.settings.plantnet_rate_limit_per_minute = 0
+    plantnet.reset_limits()
+    await plantnet.start_client(verify=verify)
+    try:
+        after = await measure(calls, lambda: plantnet.identify_plant(IMAGE, api_key="bench"))
+    finally:
+        await plantnet.close_client()
+
+    print(f"calls: {calls} (HTTPS stub at {base_url})")
+    report("before", before)
+    report("after", after)
+    print(f"speedup  {statistics.mean(before) / statistics.mean(after):.1f}x (mean)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = generate_self_signed_cert(Path(tmp))
+        with serve_in_thread(create_app(), certfile=cert, keyfile=key) as base_url:
+            asyncio.run(run(base_url, cert, args.calls))
+
+
+if __name__ == "__main__":
+    main()
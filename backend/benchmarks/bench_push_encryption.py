@@ -0,0 +1,95 @@
+"""Benchmark web push encryption throughput: one core vs. a process pool.
+
+Encrypts a digest fan-out to synthetic subscriptions (real P-256 keys) and
+reports notifications per second. Nothing is sent over the network.
+
+Usage::
+
+    uv run python -m benchmarks.bench_push_encryption --messages 2000
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from app.services.push_crypto import (
+    PushMessage,
+    encrypt_batch,
+    encrypt_messages,
+    settings,
+    shutdown_executor,
+)
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).strip(b"=").decode()
+
+
+def make_subscriptions(count: int, data: str) -> list[PushMessage]:
+    messages = []
+    for i in range(count):
+        key = ec.generate_private_key(ec.SECP256R1())
+        public = key.public_key().public_bytes(
+            serialization.Encoding.X962,
+            serialization.PublicFormat.UncompressedPoint,
+        )
+        messages.append(
+            PushMessage(
+                endpoint=f"https://push{i % 4}.example.com/send/{i}",
+                p256dh_key=b64url(public),
+                auth_key=b64url(os.urandom(16)),
+                data=data,
+            )
+        )
+    return messages
+
+
+async def run_pool(messages: list[PushMessage], vapid_key: str, workers: int) -> float:
+    settings.vapid_private_key = vapid_key
+    settings.vapid_email = "mailto:bench@kratzbaum.local"
+    settings.push_crypto_workers = workers
+    settings.push_crypto_min_batch = 1
+    settings.push_crypto_chunk_size = max(len(messages) // (workers * 4), 16)
+
+    try:
+        # Warm up the worker processes before timing
+        await encrypt_messages(messages[: workers * settings.push_crypto_chunk_size])
+        start = time.perf_counter()
+        await encrypt_messages(messages)
+        return time.perf_counter() - start
+    finally:
+        shutdown_executor()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    vapid = ec.generate_private_key(ec.SECP256R1())
+    vapid_key = b64url(vapid.private_numbers().private_value.to_bytes(32, "big"))
+    data = '{"title": "Daily digest", "body": "3 plants need water", "url": "/reminders"}'
+    messages = make_subscriptions(args.messages, data)
+
+    start = time.perf_counter()
+    encrypt_batch(messages, vapid_key, "mailto:bench@kratzbaum.local")
+    inline = time.perf_counter() - start
+
+    pooled = asyncio.run(run_pool(messages, vapid_key, args.workers))
+
+    print(f"messages: {args.messages}")
+    print(f"{'1 core, inline':<28}{args.messages / inline:10.0f} notifications/s")
+    print(
+        f"{f'{args.workers} process(es), pool':<28}{args.messages / pooled:10.0f} notifications/s"
+        f"  ({inline / pooled:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
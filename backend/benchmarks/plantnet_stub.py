@@ -0,0 +1,223 @@
+"""Local PlantNet-compatible stub server for benchmarks.
+
+Answers ``POST /v2/identify/all`` with a canned identification result, so
+the identify path can be exercised without the real API or its quota.
+Latency, a random error rate and a finite daily quota can be configured to
+reproduce slow, flaky or exhausted upstream behavior.
+
+Usage::
+
+    uv run python -m benchmarks.plantnet_stub --port 8001
+    uv run python -m benchmarks.plantnet_stub --latency-ms 800 --error-rate 0.05 --quota 500
+    PLANTNET_API_URL=http://127.0.0.1:8001/v2/identify/all uv run fastapi dev app/main.py
+"""
+
+import argparse
+import asyncio
+import datetime
+import random
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+import uvicorn
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+IDENTIFY_PATH = "/v2/identify/all"
+
+CANNED_RESULT = {
+    "results": [
+        {
+            "score": 0.91,
+            "species": {
+                "scientificNameWithoutAuthor": "Monstera deliciosa",
+                "commonNames": ["Swiss cheese plant", "Split-leaf philodendron"],
+                "genus": {"scientificNameWithoutAuthor": "Monstera"},
+                "family": {"scientificNameWithoutAuthor": "Araceae"},
+            },
+        },
+        {
+            "score": 0.04,
+            "species": {
+                "scientificNameWithoutAuthor": "Philodendron bipinnatifidum",
+                "commonNames": ["Tree philodendron"],
+                "genus": {"scientificNameWithoutAuthor": "Philodendron"},
+                "family": {"scientificNameWithoutAuthor": "Araceae"},
+            },
+        },
+    ],
+}
+
+
+@dataclass
+class StubConfig:
+    """
+    Simulated upstream behavior.
+
+    Attributes:
+        latency_ms: Mean response time added to every call
+        jitter_ms: Latency is drawn uniformly from ``latency_ms ± jitter_ms``
+        error_rate: Fraction of calls answered with ``error_status``
+        error_status: HTTP status of simulated failures
+        quota: Identifications allowed before answering 429 (``None`` = unlimited)
+        seed: Random seed for reproducible runs
+    """
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    quota: int | None = None
+    seed: int | None = None
+
+
+@dataclass
+class StubStats:
+    """Calls answered by the stub, by outcome."""
+
+    calls: int = 0
+    errors: int = 0
+    quota_rejections: int = 0
+
+
+def create_app(config: StubConfig | None = None) -> FastAPI:
+    """Create the stub application; its counters are on ``app.state.stats``."""
+    config = config or StubConfig()
+    rng = random.Random(config.seed)
+    stats = StubStats()
+    remaining = config.quota
+
+    app = FastAPI(title="PlantNet stub")
+    app.state.stats = stats
+
+    @app.post(IDENTIFY_PATH)
+    async def identify(request: Request) -> JSONResponse:
+        nonlocal remaining
+        await request.body()
+        stats.calls += 1
+
+        latency = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+        if remaining is not None and remaining <= 0:
+            stats.quota_rejections += 1
+            return JSONResponse({"message": "Too Many Requests"}, status_code=429)
+        if rng.random() < config.error_rate:
+            stats.errors += 1
+            return JSONResponse({"message": "Simulated failure"}, status_code=config.error_status)
+
+        if remaining is None:
+            # Like an account without a daily quota: nothing to pace against
+            return JSONResponse(CANNED_RESULT)
+        remaining -= 1
+        return JSONResponse({**CANNED_RESULT, "remainingIdentificationRequests": remaining})
+
+    return app
+
+
+def generate_self_signed_cert(directory: Path) -> tuple[Path, Path]:
+    """Write a self-signed localhost certificate; returns (cert, key) paths."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.UTC)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = directory / "stub-cert.pem"
+    key_path = directory / "stub-key.pem"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    return cert_path, key_path
+
+
+@contextmanager
+def serve_in_thread(
+    app: FastAPI,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    certfile: Path | None = None,
+    keyfile: Path | None = None,
+) -> Iterator[str]:
+    """Run an app with uvicorn in a background thread; yields its base URL."""
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        log_level="warning",
+        ssl_certfile=certfile,
+        ssl_keyfile=keyfile,
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Stub server failed to start")
+        threading.Event().wait(0.01)
+
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    scheme = "https" if certfile else "http"
+    hostname = "localhost" if certfile else host
+    try:
+        yield f"{scheme}://{hostname}:{bound_port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the ``StubConfig`` options to a command line parser."""
+    group = parser.add_argument_group("PlantNet stub")
+    group.add_argument("--latency-ms", type=float, default=0.0)
+    group.add_argument("--jitter-ms", type=float, default=0.0)
+    group.add_argument("--error-rate", type=float, default=0.0)
+    group.add_argument("--error-status", type=int, default=500)
+    group.add_argument("--quota", type=int, default=None, help="identifications before 429")
+    group.add_argument("--seed", type=int, default=None)
+
+
+def stub_config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        quota=args.quota,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PlantNet stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    app = create_app(stub_config_from_args(args))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
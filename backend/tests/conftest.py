@@ -2,6 +2,7 @@
 
 import asyncio
 from collections.abc import AsyncGenerator, Generator
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 import pytest_asyncio
@@ -15,6 +16,8 @@ from app.api.deps import get_db
 from app.core.security import hash_password
 from app.main import app
 from app.models import Settings as SettingsModel
+from app.services import photo_variants
+from app.services.identification import clear_memory_cache, reset_stats
 
 # Use SQLite for tests
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
@@ -40,6 +43,15 @@ def event_loop() -> Generator[asyncio.AbstractEventLoop, None, None]:
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+def _clear_identification_cache() -> Generator[None, None, None]:
+    """Keep the in-memory identification cache from leaking between tests."""
+    clear_memory_cache()
+    reset_stats()
+    yield
+    clear_memory_cache()
+
+
 @pytest_asyncio.fixture(scope="function")
 async def db_session() -> AsyncGenerator[AsyncSession, None]:
     """Create a fresh database session for each test."""
@@ -62,9 +74,19 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
 
     app.dependency_overrides[get_db] = override_get_db
 
+    # Photo variants are recorded by a background task with its own session
+    context_manager = MagicMock()
+    context_manager.__aenter__ = AsyncMock(return_value=db_session)
+    context_manager.__aexit__ = AsyncMock(return_value=None)
+    session_factory = MagicMock(return_value=context_manager)
+
     transport = ASGITransport(app=app)
-    async with AsyncClient(transport=transport, base_url="http://test") as ac:
-        yield ac
+    with (
+        patch.object(photo_variants, "async_session_factory", session_factory),
+        patch.object(photo_variants.settings, "photo_variant_workers", 0),
+    ):
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            yield ac
 
     app.dependency_overrides.clear()
 
@@ -3,6 +3,10 @@
 import pytest
 from httpx import AsyncClient
 
+from app.core import security
+from app.core.config import get_settings
+from app.services.upload_gc import collect_orphaned_uploads
+
 
 class TestHealthEndpoint:
     """Tests for health check endpoint."""
@@ -76,6 +80,36 @@ class TestAuthEndpoints:
 
         assert response.status_code == 401
 
+    @pytest.mark.asyncio
+    async def test_login_rehashes_on_cost_change(
+        self, client: AsyncClient, db_session, test_user, monkeypatch
+    ):
+        """Test login upgrades a hash made with another bcrypt cost."""
+        monkeypatch.setattr(get_settings(), "bcrypt_rounds", 4)
+        credentials = {"username": "testuser", "password": "testpass123"}
+
+        response = await client.post("/api/auth/login", json=credentials)
+
+        assert response.status_code == 200
+        await db_session.refresh(test_user)
+        assert test_user.password_hash.startswith("$2b$04$")
+        assert (await client.post("/api/auth/login", json=credentials)).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_login_refused_when_hashing_is_saturated(
+        self, client: AsyncClient, test_user, monkeypatch
+    ):
+        """Test login answers 503 instead of queueing more password checks."""
+        monkeypatch.setattr(security, "_pending", get_settings().password_hash_max_pending)
+
+        response = await client.post(
+            "/api/auth/login",
+            json={"username": "testuser", "password": "testpass123"},
+        )
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+
 
 class TestPlantEndpoints:
     """Tests for plant CRUD endpoints."""
@@ -154,6 +188,12 @@ class TestPlantEndpoints:
             "watering_interval",
             "fertilizing_interval",
             "primary_photo_url",
+            "thumbnail_url",
+            "srcset",
+            "avif_srcset",
+            "placeholder",
+            "photo_width",
+            "photo_height",
             "created_at",
             "updated_at",
         }
@@ -224,6 +264,12 @@ class TestPlantEndpoints:
             "watering_interval",
             "fertilizing_interval",
             "primary_photo_url",
+            "thumbnail_url",
+            "srcset",
+            "avif_srcset",
+            "placeholder",
+            "photo_width",
+            "photo_height",
             "created_at",
             "updated_at",
             "photos",
@@ -541,6 +587,40 @@ class TestPlantEndpoints:
         assert response.status_code == 404
         assert response.json()["detail"] == "Photo not found"
 
+    @pytest.mark.asyncio
+    async def test_shared_photo_file_collected_after_last_reference(
+        self, client: AsyncClient, auth_headers: dict, db_session, tmp_path, monkeypatch
+    ):
+        """Test identical uploads share one file until the last photo is deleted."""
+        monkeypatch.setattr(get_settings(), "upload_dir", tmp_path)
+        plant_ids = []
+        for name in ("First", "Second"):
+            response = await client.post("/api/plants", json={"name": name}, headers=auth_headers)
+            plant_ids.append(response.json()["id"])
+
+        photos = []
+        for plant_id in plant_ids:
+            response = await client.post(
+                f"/api/plants/{plant_id}/photos",
+                files={"file": ("same.jpg", b"identical-bytes", "image/jpeg")},
+                headers=auth_headers,
+            )
+            photos.append(response.json())
+        assert photos[0]["url"] == photos[1]["url"]
+        file_path = tmp_path / photos[0]["url"].removeprefix("/uploads/")
+
+        await client.delete(
+            f"/api/plants/{plant_ids[0]}/photos/{photos[0]['id']}", headers=auth_headers
+        )
+        assert file_path.exists()
+
+        # Not deleted inline: a concurrent upload of the same bytes may reuse it
+        await client.delete(f"/api/plants/{plant_ids[1]}", headers=auth_headers)
+        assert file_path.exists()
+
+        await collect_orphaned_uploads(db_session, grace_hours=0)
+        assert not file_path.exists()
+
 
 class TestPotEndpoints:
     """Tests for pot CRUD endpoints."""
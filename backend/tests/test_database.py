@@ -0,0 +1,25 @@
+"""Tests for database engine setup."""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import get_settings
+from app.core.database import create_engine
+
+
+@pytest.mark.asyncio
+async def test_in_memory_sqlite_engine():
+    engine = create_engine("sqlite+aiosqlite:///:memory:")
+    try:
+        assert isinstance(engine.pool, StaticPool)
+        async with engine.connect() as conn:
+            assert (await conn.execute(text("SELECT 1"))).scalar() == 1
+    finally:
+        await engine.dispose()
+
+
+def test_file_database_engine_is_pooled(tmp_path):
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+
+    assert engine.pool.size() == get_settings().database_pool_size
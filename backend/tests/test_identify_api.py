@@ -5,6 +5,8 @@ from unittest.mock import AsyncMock, patch
 import pytest
 from httpx import AsyncClient
 
+from app.services.plantnet import PlantImage
+
 
 class TestIdentifyEndpoint:
     """Tests for POST /api/identify."""
@@ -39,7 +41,7 @@ class TestIdentifyEndpoint:
         }
 
         with patch(
-            "app.api.identify.identify_plant",
+            "app.services.identification.identify_plant",
             AsyncMock(return_value=mock_payload),
         ) as mock_identify:
             response = await client.post(
@@ -63,10 +65,10 @@ class TestIdentifyEndpoint:
             "error": None,
             "error_code": None,
             "remaining_identifications": 91,
+            "retry_after": None,
         }
         mock_identify.assert_awaited_once_with(
-            image_data=b"fake-image",
-            organ="leaf",
+            images=[PlantImage(b"fake-image", "leaf", "image/jpeg")],
             api_key=None,
         )
 
@@ -103,6 +105,22 @@ class TestIdentifyEndpoint:
         assert response.status_code == 400
         assert response.json()["detail"] == "Uploaded file is empty"
 
+    @pytest.mark.asyncio
+    async def test_identify_rejects_oversized_file(
+        self, client: AsyncClient, auth_headers: dict[str, str], monkeypatch
+    ):
+        """Endpoint should stop reading a file once it exceeds the size limit."""
+        monkeypatch.setattr("app.api.identify.MAX_FILE_SIZE", 1024)
+        response = await client.post(
+            "/api/identify",
+            files={"image": ("leaf.jpg", b"x" * 1025, "image/jpeg")},
+            data={"organ": "leaf"},
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith("File too large")
+
     @pytest.mark.asyncio
     async def test_identify_rejects_non_image_file(
         self, client: AsyncClient, auth_headers: dict[str, str]
@@ -133,7 +151,7 @@ class TestIdentifyEndpoint:
         }
 
         with patch(
-            "app.api.identify.identify_plant",
+            "app.services.identification.identify_plant",
             AsyncMock(return_value=mock_payload),
         ):
             response = await client.post(
@@ -149,4 +167,132 @@ class TestIdentifyEndpoint:
             "error": "PlantNet API key not configured",
             "error_code": "MISSING_API_KEY",
             "remaining_identifications": None,
+            "retry_after": None,
         }
+
+    @pytest.mark.asyncio
+    async def test_identify_repeated_image_is_served_from_cache(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ):
+        """Identifying the same photo twice should call PlantNet once."""
+        mock_payload = {"results": [], "remaining_identifications": 90}
+
+        with patch(
+            "app.services.identification.identify_plant",
+            AsyncMock(return_value=mock_payload),
+        ) as mock_identify:
+            for _ in range(2):
+                response = await client.post(
+                    "/api/identify",
+                    files={"image": ("leaf.jpg", b"fake-image", "image/jpeg")},
+                    data={"organ": "leaf"},
+                    headers=auth_headers,
+                )
+                assert response.status_code == 200
+                assert response.json()["remaining_identifications"] == 90
+
+        mock_identify.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_identify_stats(self, client: AsyncClient, auth_headers: dict[str, str]):
+        """Stats endpoint should report cache hits and upstream calls."""
+        with patch(
+            "app.services.identification.identify_plant",
+            AsyncMock(return_value={"results": [], "remaining_identifications": 5}),
+        ):
+            for _ in range(2):
+                await client.post(
+                    "/api/identify",
+                    files={"image": ("leaf.jpg", b"fake-image", "image/jpeg")},
+                    data={"organ": "leaf"},
+                    headers=auth_headers,
+                )
+
+        response = await client.get("/api/identify/stats", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "requests": 2,
+            "memory_hits": 1,
+            "database_hits": 0,
+            "upstream_calls": 1,
+            "rejected_locally": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "bytes_received": 10,
+            "bytes_uploaded": 10,
+            "memory_entries": 1,
+            "inflight": 0,
+        }
+
+    @pytest.mark.asyncio
+    async def test_identify_multiple_images_and_organs(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ):
+        """Several images with per-image organs should go upstream together."""
+        with patch(
+            "app.services.identification.identify_plant",
+            AsyncMock(return_value={"results": [], "remaining_identifications": 5}),
+        ) as mock_identify:
+            response = await client.post(
+                "/api/identify",
+                files=[
+                    ("images", ("leaf.jpg", b"leaf-image", "image/jpeg")),
+                    ("images", ("flower.png", b"flower-image", "image/png")),
+                ],
+                data={"organs": ["leaf", "Flower"]},
+                headers=auth_headers,
+            )
+
+        assert response.status_code == 200
+        mock_identify.assert_awaited_once_with(
+            images=[
+                PlantImage(b"leaf-image", "leaf", "image/jpeg"),
+                PlantImage(b"flower-image", "flower", "image/png"),
+            ],
+            api_key=None,
+        )
+
+    @pytest.mark.asyncio
+    async def test_identify_rejects_too_many_images(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ):
+        """At most five images are accepted."""
+        response = await client.post(
+            "/api/identify",
+            files=[("images", (f"{i}.jpg", b"img", "image/jpeg")) for i in range(6)],
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "At most 5 images can be identified at once"
+
+    @pytest.mark.asyncio
+    async def test_identify_requires_one_organ_per_image(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ):
+        """The organs list must match the number of images."""
+        response = await client.post(
+            "/api/identify",
+            files=[
+                ("images", ("a.jpg", b"a", "image/jpeg")),
+                ("images", ("b.jpg", b"b", "image/jpeg")),
+            ],
+            data={"organs": ["leaf"]},
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Provide one organ per image"
+
+    @pytest.mark.asyncio
+    async def test_identify_requires_an_image(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ):
+        """Requests without any image are rejected."""
+        response = await client.post(
+            "/api/identify", data={"organ": "leaf"}, headers=auth_headers
+        )
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Please upload an image."
@@ -0,0 +1,320 @@
+"""Tests for asynchronous identification jobs."""
+
+import asyncio
+import json
+import os
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import AsyncClient
+from sqlmodel import select
+
+from app.core.config import get_settings
+from app.models import IdentificationStatus, OrganType, PlantIdentification
+from app.services import identification_jobs
+from app.services.identification_jobs import (
+    claim_next_job,
+    process_next_job,
+    prune_jobs,
+    run_job,
+    wait_for_job,
+    watch_job,
+)
+
+RESULT = {"results": [], "remaining_identifications": 42}
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_dir", tmp_path)
+    return tmp_path / "identifications"
+
+
+@pytest.fixture
+def mock_session_factory(db_session):
+    context_manager = MagicMock()
+    context_manager.__aenter__ = AsyncMock(return_value=db_session)
+    context_manager.__aexit__ = AsyncMock(return_value=None)
+    factory = MagicMock(return_value=context_manager)
+    with patch("app.services.identification_jobs.async_session_factory", factory):
+        yield factory
+
+
+async def submit(client: AsyncClient, auth_headers: dict[str, str]) -> dict:
+    response = await client.post(
+        "/api/identify/jobs",
+        files=[
+            ("images", ("leaf.jpg", b"leaf-image", "image/jpeg")),
+            ("images", ("flower.jpg", b"flower-image", "image/jpeg")),
+        ],
+        data={"organs": ["leaf", "flower"]},
+        headers=auth_headers,
+    )
+    assert response.status_code == 202
+    return response.json()
+
+
+class TestIdentifyJobs:
+    """Tests for /api/identify/jobs."""
+
+    @pytest.mark.asyncio
+    async def test_submit_returns_pending_job(
+        self, client: AsyncClient, auth_headers: dict[str, str], upload_dir
+    ):
+        """Submitting stores the images and returns without identifying."""
+        with patch("app.services.identification.identify_plant") as mock_identify:
+            job = await submit(client, auth_headers)
+
+        mock_identify.assert_not_called()
+        assert job["status"] == "PENDING"
+        assert job["result"] is None
+        assert (upload_dir / job["id"] / "0").read_bytes() == b"leaf-image"
+        assert (upload_dir / job["id"] / "1").read_bytes() == b"flower-image"
+
+    @pytest.mark.asyncio
+    async def test_worker_completes_job(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        mock_session_factory,
+        upload_dir,
+    ):
+        """A worker runs the identification and stores the result."""
+        job = await submit(client, auth_headers)
+
+        with patch(
+            "app.services.identification.identify_plant", AsyncMock(return_value=RESULT)
+        ) as mock_identify:
+            assert await process_next_job() is True
+            assert await process_next_job() is False
+
+        images = mock_identify.await_args.kwargs["images"]
+        assert [(image.data, image.organ) for image in images] == [
+            (b"leaf-image", "leaf"),
+            (b"flower-image", "flower"),
+        ]
+        assert not (upload_dir / job["id"]).exists()
+
+        response = await client.get(f"/api/identify/jobs/{job['id']}", headers=auth_headers)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "DONE"
+        assert body["completed_at"] is not None
+        assert body["result"]["remaining_identifications"] == 42
+
+    @pytest.mark.asyncio
+    async def test_failed_identification_marks_job_failed(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        mock_session_factory,
+    ):
+        """Service errors finish the job as FAILED with the error payload."""
+        job = await submit(client, auth_headers)
+        error = {"error": "PlantNet API error: 500", "error_code": "UPSTREAM_ERROR", "results": []}
+
+        with patch("app.services.identification.identify_plant", AsyncMock(return_value=error)):
+            await process_next_job()
+
+        response = await client.get(f"/api/identify/jobs/{job['id']}", headers=auth_headers)
+        body = response.json()
+        assert body["status"] == "FAILED"
+        assert body["result"]["error_code"] == "UPSTREAM_ERROR"
+
+    @pytest.mark.asyncio
+    async def test_events_stream_ends_with_result(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        mock_session_factory,
+    ):
+        """The SSE stream sends the final result and closes."""
+        job = await submit(client, auth_headers)
+        with patch("app.services.identification.identify_plant", AsyncMock(return_value=RESULT)):
+            await process_next_job()
+
+        response = await client.get(f"/api/identify/jobs/{job['id']}/events", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        event, data = response.text.strip().split("\n")
+        assert event == "event: result"
+        assert json.loads(data.removeprefix("data: "))["status"] == "DONE"
+
+    @pytest.mark.asyncio
+    async def test_events_stream_accepts_job_token_in_query(
+        self,
+        client: AsyncClient,
+        auth_headers: dict[str, str],
+        mock_session_factory,
+    ):
+        """EventSource clients authenticate with the job's events token."""
+        job = await submit(client, auth_headers)
+        other = await submit(client, auth_headers)
+        with patch("app.services.identification.identify_plant", AsyncMock(return_value=RESULT)):
+            await process_next_job()
+            await process_next_job()
+
+        response = await client.get(
+            f"/api/identify/jobs/{job['id']}/events", params={"token": job["events_token"]}
+        )
+        assert response.status_code == 200
+        assert response.text.startswith("event: result")
+
+        # Scoped to its job, and not a substitute for an access token
+        response = await client.get(
+            f"/api/identify/jobs/{other['id']}/events", params={"token": job["events_token"]}
+        )
+        assert response.status_code == 401
+        response = await client.get(
+            f"/api/identify/jobs/{job['id']}",
+            headers={"Authorization": f"Bearer {job['events_token']}"},
+        )
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_events_stream_rejects_access_token_in_query(
+        self, client: AsyncClient, auth_headers: dict[str, str]
+    ):
+        """Access tokens are only accepted in the Authorization header."""
+        job = await submit(client, auth_headers)
+        access_token = auth_headers["Authorization"].removeprefix("Bearer ")
+
+        response = await client.get(
+            f"/api/identify/jobs/{job['id']}/events", params={"token": access_token}
+        )
+        assert response.status_code == 401
+        response = await client.get(f"/api/identify/jobs/{job['id']}/events")
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_unknown_job_returns_404(self, client: AsyncClient, auth_headers: dict[str, str]):
+        """Unknown job ids return 404."""
+        response = await client.get(
+            "/api/identify/jobs/00000000-0000-0000-0000-000000000000",
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Identification job not found"
+
+
+def make_job(**fields) -> PlantIdentification:
+    return PlantIdentification(
+        organ=OrganType.LEAF,
+        images=[{"path": "missing/0", "organ": "leaf", "content_type": "image/jpeg"}],
+        **fields,
+    )
+
+
+@pytest.mark.asyncio
+async def test_claim_skips_running_jobs_and_cache_rows(db_session):
+    db_session.add_all(
+        [
+            PlantIdentification(organ=OrganType.LEAF, image_hash="cached"),
+            make_job(status=IdentificationStatus.RUNNING, started_at=datetime.now(UTC)),
+        ]
+    )
+    await db_session.commit()
+
+    assert await claim_next_job(db_session) is None
+
+
+@pytest.mark.asyncio
+async def test_claim_recovers_abandoned_running_job(db_session):
+    job = make_job(
+        status=IdentificationStatus.RUNNING,
+        started_at=datetime.now(UTC) - timedelta(hours=1),
+    )
+    db_session.add(job)
+    await db_session.commit()
+
+    claimed = await claim_next_job(db_session)
+
+    assert claimed.id == job.id
+    assert claimed.status == IdentificationStatus.RUNNING
+    assert await claim_next_job(db_session) is None
+
+
+@pytest.mark.asyncio
+async def test_run_job_notifies_waiters(db_session):
+    job = make_job(status=IdentificationStatus.PENDING)
+    db_session.add(job)
+    await db_session.commit()
+    claimed = await claim_next_job(db_session)
+
+    waiter = asyncio.create_task(wait_for_job(job.id, timeout=60))
+    await asyncio.sleep(0)
+    await run_job(db_session, claimed)  # image file is missing -> job fails
+
+    await asyncio.wait_for(waiter, timeout=1)
+    assert claimed.status == IdentificationStatus.FAILED
+    assert claimed.results["error_code"] == "JOB_FAILED"
+
+
+@pytest.mark.asyncio
+async def test_watcher_leaving_does_not_orphan_other_watchers(
+    db_session, mock_session_factory, monkeypatch
+):
+    monkeypatch.setattr(get_settings(), "identify_job_poll_seconds", 60)
+    job = make_job(status=IdentificationStatus.PENDING)
+    db_session.add(job)
+    await db_session.commit()
+    leaving, staying = watch_job(job.id), watch_job(job.id)
+    assert (await anext(leaving)).status == IdentificationStatus.PENDING
+    assert (await anext(staying)).status == IdentificationStatus.PENDING
+
+    update = asyncio.create_task(anext(staying))
+    await asyncio.sleep(0)
+    await leaving.aclose()
+    claimed = await claim_next_job(db_session)
+    await run_job(db_session, claimed)
+
+    assert (await asyncio.wait_for(update, timeout=1)).status == IdentificationStatus.FAILED
+    await staying.aclose()
+    assert not identification_jobs._job_events
+    assert not identification_jobs._job_watchers
+    # Every poll read the job in a session of its own
+    assert mock_session_factory.call_count >= 3
+
+
+@pytest.mark.asyncio
+async def test_prune_jobs_removes_old_finished_jobs(db_session):
+    old = datetime.now(UTC) - timedelta(days=2)
+    db_session.add_all(
+        [
+            make_job(status=IdentificationStatus.DONE, completed_at=old),
+            make_job(status=IdentificationStatus.PENDING),
+            make_job(status=IdentificationStatus.DONE, completed_at=datetime.now(UTC)),
+        ]
+    )
+    await db_session.commit()
+
+    assert await prune_jobs(db_session) == 1
+
+
+@pytest.mark.asyncio
+async def test_prune_jobs_expires_abandoned_jobs_and_images(db_session, upload_dir):
+    old = datetime.now(UTC) - timedelta(days=2)
+    abandoned = [
+        make_job(status=IdentificationStatus.PENDING, requested_at=old),
+        make_job(status=IdentificationStatus.RUNNING, requested_at=old, started_at=old),
+    ]
+    queued = make_job(status=IdentificationStatus.PENDING)
+    db_session.add_all([*abandoned, queued])
+    await db_session.commit()
+    for job in [*abandoned, queued]:
+        (upload_dir / str(job.id)).mkdir(parents=True)
+        (upload_dir / str(job.id) / "0").write_bytes(b"image")
+    # Images written for a job whose row was never committed
+    orphan = upload_dir / "orphan"
+    orphan.mkdir()
+    os.utime(orphan, (old.timestamp(), old.timestamp()))
+
+    assert await prune_jobs(db_session) == 2
+
+    assert [job.id for job in (await db_session.exec(select(PlantIdentification))).all()] == [
+        queued.id
+    ]
+    assert sorted(path.name for path in upload_dir.iterdir()) == [str(queued.id)]
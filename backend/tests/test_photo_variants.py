@@ -0,0 +1,258 @@
+"""Tests for responsive photo variants."""
+
+import io
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import AsyncClient
+from PIL import ExifTags, Image
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_settings
+from app.models import Plant, PlantPhoto
+from app.services import images
+from app.services.images import render_variants
+from app.services.photo_variants import backfill_variants, photo_urls
+
+
+def make_jpeg(width: int, height: int, taken_at: str | None = None) -> bytes:
+    exif = Image.Exif()
+    if taken_at:
+        exif.get_ifd(ExifTags.IFD.Exif)[ExifTags.Base.DateTimeOriginal] = taken_at
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (30, 120, 40)).save(buffer, format="JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "upload_dir", tmp_path)
+    monkeypatch.setattr(settings, "photo_variant_workers", 0)
+    monkeypatch.setattr(settings, "photo_variant_sizes", [128, 512, 1600])
+    monkeypatch.setattr(settings, "photo_variant_formats", ["webp", "avif"])
+    return tmp_path
+
+
+class TestRenderVariants:
+    """Tests for the variant encoder."""
+
+    def test_renders_each_size_and_format(self, tmp_path):
+        source = tmp_path / "photo.jpg"
+        source.write_bytes(make_jpeg(2000, 1500))
+
+        variants = render_variants(source, [128, 512, 1600], ["webp", "avif"], 60)
+
+        assert [(v["format"], v["width"], v["height"]) for v in variants] == [
+            ("webp", 1600, 1200),
+            ("avif", 1600, 1200),
+            ("webp", 512, 384),
+            ("avif", 512, 384),
+            ("webp", 128, 96),
+            ("avif", 128, 96),
+        ]
+        for variant in variants:
+            with Image.open(tmp_path / variant["path"]) as image:
+                assert image.format == variant["format"].upper()
+                assert image.size == (variant["width"], variant["height"])
+        assert not list(tmp_path.glob(".*.part"))
+
+    def test_never_upscales(self, tmp_path):
+        source = tmp_path / "small.png"
+        Image.new("RGB", (300, 200)).save(source)
+
+        variants = render_variants(source, [128, 512, 1600], ["webp"], 60)
+
+        assert [(v["path"], v["width"]) for v in variants] == [
+            ("small.300.webp", 300),
+            ("small.128.webp", 128),
+        ]
+
+    def test_falls_back_to_webp_without_avif_encoder(self, tmp_path, monkeypatch):
+        source = tmp_path / "photo.jpg"
+        source.write_bytes(make_jpeg(300, 200))
+        monkeypatch.setattr(images.features, "check", lambda feature: feature != "avif")
+
+        variants = render_variants(source, [128], ["webp", "avif"], 60)
+
+        assert [v["path"] for v in variants] == ["photo.128.webp"]
+
+    def test_undecodable_photo_has_no_variants(self, tmp_path):
+        source = tmp_path / "broken.jpg"
+        source.write_bytes(b"not an image")
+
+        assert render_variants(source, [128], ["webp"], 60) == []
+
+
+class TestPhotoUrls:
+    """Tests for variant URLs in API responses."""
+
+    def test_without_variants(self):
+        photo = PlantPhoto(file_path="a.jpg")
+
+        assert photo_urls("plants", photo) == {
+            "url": "/uploads/plants/a.jpg",
+            "thumbnail_url": None,
+            "srcset": None,
+            "avif_srcset": None,
+        }
+
+    def test_with_variants(self):
+        photo = PlantPhoto(
+            file_path="a.jpg",
+            variants=[
+                {"path": f"a.{size}.{fmt}", "format": fmt, "width": size, "height": size}
+                for size in (1600, 512, 128)
+                for fmt in ("webp", "avif")
+            ],
+        )
+
+        urls = photo_urls("plants", photo)
+
+        assert urls["thumbnail_url"] == "/uploads/plants/a.512.webp"
+        assert urls["srcset"] == (
+            "/uploads/plants/a.128.webp 128w, "
+            "/uploads/plants/a.512.webp 512w, "
+            "/uploads/plants/a.1600.webp 1600w"
+        )
+        assert urls["avif_srcset"].startswith("/uploads/plants/a.128.avif 128w")
+
+
+class TestPhotoUploadVariants:
+    """Tests for variants of uploaded photos."""
+
+    @pytest.mark.asyncio
+    async def test_upload_renders_variants(
+        self, client: AsyncClient, auth_headers: dict, upload_dir
+    ):
+        plant = await client.post("/api/plants", json={"name": "Fern"}, headers=auth_headers)
+        plant_id = plant.json()["id"]
+
+        upload = await client.post(
+            f"/api/plants/{plant_id}/photos?is_primary=true",
+            files={"file": ("fern.jpg", make_jpeg(1000, 800), "image/jpeg")},
+            headers=auth_headers,
+        )
+        assert upload.status_code == 200
+
+        detail = (await client.get(f"/api/plants/{plant_id}", headers=auth_headers)).json()
+        stem = detail["primary_photo_url"].removeprefix("/uploads/plants/").split(".")[0]
+        assert detail["thumbnail_url"] == f"/uploads/plants/{stem}.512.webp"
+        assert detail["srcset"].endswith(f"/uploads/plants/{stem}.1000.webp 1000w")
+        assert detail["photos"][0]["avif_srcset"].count("w,") == 2
+        assert (upload_dir / "plants" / f"{stem}.128.avif").exists()
+
+        listed = (await client.get("/api/plants", headers=auth_headers)).json()
+        assert listed[0]["thumbnail_url"] == detail["thumbnail_url"]
+
+    @pytest.mark.asyncio
+    async def test_upload_reads_metadata(self, client: AsyncClient, auth_headers: dict, upload_dir):
+        plant = await client.post("/api/plants", json={"name": "Fern"}, headers=auth_headers)
+        plant_id = plant.json()["id"]
+
+        photos = {}
+        for name, taken_at in [("new.jpg", "2024:06:01 09:00:00"), ("old.jpg", None)]:
+            upload = await client.post(
+                f"/api/plants/{plant_id}/photos?is_primary=true",
+                files={"file": (name, make_jpeg(640, 480, taken_at), "image/jpeg")},
+                headers=auth_headers,
+            )
+            assert upload.status_code == 200
+            photos[name] = upload.json()
+        assert (photos["new.jpg"]["width"], photos["new.jpg"]["height"]) == (640, 480)
+        assert photos["new.jpg"]["taken_at"].startswith("2024-06-01T09:00:00")
+        assert photos["new.jpg"]["placeholder"].startswith("data:image/webp;base64,")
+        assert photos["old.jpg"]["taken_at"] is None
+
+        # Ordered by capture time, falling back to the upload time
+        detail = (await client.get(f"/api/plants/{plant_id}", headers=auth_headers)).json()
+        assert [p["id"] for p in detail["photos"]] == [
+            photos["new.jpg"]["id"],
+            photos["old.jpg"]["id"],
+        ]
+        listed = (await client.get("/api/plants", headers=auth_headers)).json()
+        assert listed[0]["placeholder"] == photos["old.jpg"]["placeholder"]
+        assert (listed[0]["photo_width"], listed[0]["photo_height"]) == (640, 480)
+
+    @pytest.mark.asyncio
+    async def test_batch_upload(
+        self, client: AsyncClient, auth_headers: dict, db_session: AsyncSession, upload_dir
+    ):
+        plant = await client.post("/api/plants", json={"name": "Fern"}, headers=auth_headers)
+        plant_id = plant.json()["id"]
+        first = await client.post(
+            f"/api/plants/{plant_id}/photos?is_primary=true",
+            files={"file": ("first.jpg", make_jpeg(300, 200), "image/jpeg")},
+            headers=auth_headers,
+        )
+        same = make_jpeg(640, 480)
+
+        response = await client.post(
+            f"/api/plants/{plant_id}/photos/batch?primary_index=2",
+            files=[
+                ("files", ("a.jpg", same, "image/jpeg")),
+                ("files", ("b.jpg", same, "image/jpeg")),
+                ("files", ("c.jpg", make_jpeg(800, 600), "image/jpeg")),
+            ],
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 200
+        photos = response.json()
+        assert [p["is_primary"] for p in photos] == [False, False, True]
+        assert [p["width"] for p in photos] == [640, 640, 800]
+        assert photos[0]["url"] == photos[1]["url"]
+        rows = {p.id.hex: p for p in (await db_session.exec(select(PlantPhoto))).all()}
+        assert not rows[first.json()["id"].replace("-", "")].is_primary
+        # Rendered once per file, then shared
+        variants = [rows[p["id"].replace("-", "")].variants for p in photos]
+        assert variants[0] == variants[1]
+        assert all(len(v) == 6 for v in variants)
+
+    @pytest.mark.asyncio
+    async def test_batch_upload_is_validated_first(
+        self, client: AsyncClient, auth_headers: dict, db_session: AsyncSession, upload_dir
+    ):
+        plant = await client.post("/api/plants", json={"name": "Fern"}, headers=auth_headers)
+        url = f"/api/plants/{plant.json()['id']}/photos/batch"
+        files = [
+            ("files", ("a.jpg", make_jpeg(100, 100), "image/jpeg")),
+            ("files", ("notes.txt", b"text", "text/plain")),
+        ]
+
+        response = await client.post(url, files=files, headers=auth_headers)
+        assert response.status_code == 400
+        assert "File type not allowed" in response.json()["detail"]
+        response = await client.post(f"{url}?primary_index=2", files=files, headers=auth_headers)
+        assert response.status_code == 400
+
+        assert (await db_session.exec(select(PlantPhoto))).all() == []
+        assert list(upload_dir.rglob("*.jpg")) == []
+
+    @pytest.mark.asyncio
+    async def test_backfill(self, db_session: AsyncSession, upload_dir):
+        plant = Plant(name="Old")
+        db_session.add(plant)
+        (upload_dir / "plants").mkdir()
+        (upload_dir / "plants" / "old.jpg").write_bytes(make_jpeg(800, 600))
+        (upload_dir / "plants" / "gone.jpg").write_bytes(b"corrupt")
+        db_session.add(PlantPhoto(plant_id=plant.id, file_path="old.jpg"))
+        db_session.add(PlantPhoto(plant_id=plant.id, file_path="gone.jpg"))
+        await db_session.commit()
+
+        context_manager = MagicMock()
+        context_manager.__aenter__ = AsyncMock(return_value=db_session)
+        context_manager.__aexit__ = AsyncMock(return_value=None)
+        factory = MagicMock(return_value=context_manager)
+        with patch("app.services.photo_variants.async_session_factory", factory):
+            assert await backfill_variants(batch_size=1) == 2
+            # Undecodable photos are recorded with no variants, not retried
+            assert await backfill_variants(batch_size=1) == 0
+
+        photos = {p.file_path: p for p in (await db_session.exec(select(PlantPhoto))).all()}
+        assert len(photos["old.jpg"].variants) == 6
+        assert (photos["old.jpg"].width, photos["old.jpg"].height) == (800, 600)
+        assert photos["old.jpg"].placeholder is not None
+        assert photos["gone.jpg"].variants == []
+        assert photos["gone.jpg"].width is None
@@ -0,0 +1,160 @@
+"""Tests for push subscription endpoints."""
+
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient
+from sqlmodel import select
+
+from app.models import PushSubscription
+from app.services.push import PushResult
+
+SUBSCRIPTION = {
+    "endpoint": "https://push.example.com/abc",
+    "keys": {"p256dh": "client-key", "auth": "auth-secret"},
+}
+
+
+class TestSubscribe:
+    """Tests for POST/DELETE /api/push/subscribe."""
+
+    @pytest.mark.asyncio
+    async def test_subscribe_requires_auth(self, client: AsyncClient):
+        """Endpoint should reject unauthenticated requests."""
+        response = await client.post("/api/push/subscribe", json=SUBSCRIPTION)
+
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_subscribe_creates_subscription(
+        self, client: AsyncClient, auth_headers: dict[str, str], db_session
+    ):
+        """Subscribing stores the endpoint and keys."""
+        response = await client.post("/api/push/subscribe", json=SUBSCRIPTION, headers=auth_headers)
+
+        assert response.status_code == 201
+        data = response.json()
+        assert data["endpoint"] == SUBSCRIPTION["endpoint"]
+        assert data["success_count"] == 0
+
+        result = await db_session.exec(select(PushSubscription))
+        subscription = result.one()
+        assert subscription.p256dh_key == "client-key"
+
+    @pytest.mark.asyncio
+    async def test_resubscribe_updates_keys(
+        self, client: AsyncClient, auth_headers: dict[str, str], db_session
+    ):
+        """Subscribing the same endpoint again upserts instead of failing."""
+        first = await client.post("/api/push/subscribe", json=SUBSCRIPTION, headers=auth_headers)
+        second = await client.post(
+            "/api/push/subscribe",
+            json={**SUBSCRIPTION, "keys": {"p256dh": "new-key", "auth": "new-auth"}},
+            headers=auth_headers,
+        )
+
+        assert second.status_code == 201
+        assert second.json()["id"] == first.json()["id"]
+
+        result = await db_session.exec(select(PushSubscription))
+        subscriptions = result.all()
+        assert len(subscriptions) == 1
+        assert subscriptions[0].p256dh_key == "new-key"
+        assert subscriptions[0].auth_key == "new-auth"
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe(self, client: AsyncClient, auth_headers: dict[str, str], db_session):
+        """Unsubscribing removes the subscription."""
+        await client.post("/api/push/subscribe", json=SUBSCRIPTION, headers=auth_headers)
+
+        response = await client.request(
+            "DELETE",
+            "/api/push/subscribe",
+            json={"endpoint": SUBSCRIPTION["endpoint"]},
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 204
+        result = await db_session.exec(select(PushSubscription))
+        assert result.all() == []
+
+
+class TestValidateSubscriptions:
+    """Tests for POST /api/push/subscriptions/validate."""
+
+    @pytest.mark.asyncio
+    async def test_validate_prunes_gone_subscriptions(
+        self, client: AsyncClient, auth_headers: dict[str, str], db_session
+    ):
+        """Gone endpoints are removed, transient failures are kept."""
+        now = datetime.now(UTC)
+        for name in ("alive", "gone", "flaky"):
+            db_session.add(
+                PushSubscription(
+                    endpoint=f"https://push.example.com/{name}",
+                    p256dh_key="k",
+                    auth_key="a",
+                    last_failure_at=now,
+                )
+            )
+        # Delivered to since its last failure: not probed
+        db_session.add(
+            PushSubscription(
+                endpoint="https://push.example.com/healthy",
+                p256dh_key="k",
+                auth_key="a",
+                last_failure_at=now - timedelta(days=1),
+                last_success_at=now,
+            )
+        )
+        await db_session.commit()
+
+        async def fake_probe(subscription: PushSubscription) -> PushResult:
+            if subscription.endpoint.endswith("gone"):
+                return PushResult(success=False, status_code=410)
+            if subscription.endpoint.endswith("flaky"):
+                return PushResult(success=False, status_code=503)
+            return PushResult(success=True)
+
+        async def fake_probes(subscriptions):
+            return [await fake_probe(s) for s in subscriptions]
+
+        with patch("app.api.push.probe_subscriptions", AsyncMock(side_effect=fake_probes)):
+            response = await client.post("/api/push/subscriptions/validate", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json() == {"checked": 3, "removed": 1, "errors": 1}
+
+        result = await db_session.exec(select(PushSubscription.endpoint))
+        assert sorted(result.all()) == [
+            "https://push.example.com/alive",
+            "https://push.example.com/flaky",
+            "https://push.example.com/healthy",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_validate_probes_only_the_given_subscriptions(
+        self, client: AsyncClient, auth_headers: dict[str, str], db_session
+    ):
+        """Explicitly listed subscriptions are probed, healthy or not."""
+        subscriptions = [
+            PushSubscription(
+                endpoint=f"https://push.example.com/{name}", p256dh_key="k", auth_key="a"
+            )
+            for name in ("first", "second")
+        ]
+        db_session.add_all(subscriptions)
+        await db_session.commit()
+
+        probe = AsyncMock(return_value=[PushResult(success=False, status_code=404)])
+        with patch("app.api.push.probe_subscriptions", probe):
+            response = await client.post(
+                "/api/push/subscriptions/validate",
+                json={"subscription_ids": [str(subscriptions[0].id)]},
+                headers=auth_headers,
+            )
+
+        assert response.json() == {"checked": 1, "removed": 1, "errors": 0}
+        probed = probe.await_args.args[0]
+        assert [s.endpoint for s in probed] == ["https://push.example.com/first"]
@@ -0,0 +1,237 @@
+"""Tests for resumable photo uploads."""
+
+import io
+import os
+import time
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from PIL import Image
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_settings
+from app.models import Plant, PlantPhoto, ResumableUpload, StoredFile
+from app.services.resumable_uploads import (
+    append_to_resumable_upload,
+    complete_resumable_upload,
+    create_resumable_upload,
+    expire_resumable_uploads,
+    remove_staging_file,
+    staging_path,
+)
+
+
+def make_jpeg() -> bytes:
+    buffer = io.BytesIO()
+    Image.effect_noise((300, 200), 64).convert("RGB").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "upload_dir", tmp_path)
+    monkeypatch.setattr(settings, "photo_variant_workers", 0)
+    monkeypatch.setattr(settings, "photo_variant_sizes", [128])
+    monkeypatch.setattr(settings, "photo_variant_formats", ["webp"])
+    return tmp_path
+
+
+async def create_plant(client: AsyncClient, auth_headers: dict) -> str:
+    plant = await client.post("/api/plants", json={"name": "Fern"}, headers=auth_headers)
+    return plant.json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_upload_in_parts(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, upload_dir
+):
+    plant_id = await create_plant(client, auth_headers)
+    content = make_jpeg()
+    half = len(content) // 2
+
+    response = await client.post(
+        f"/api/plants/{plant_id}/photos/resumable",
+        json={"filename": "fern.jpg", "size": len(content)},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201
+    upload = response.json()
+    assert (upload["offset"], upload["size"]) == (0, len(content))
+    location = response.headers["location"]
+    assert location == f"/api/plants/{plant_id}/photos/resumable/{upload['id']}"
+
+    def patch(offset: int, data: bytes):
+        headers = {
+            **auth_headers,
+            "Upload-Offset": str(offset),
+            "Content-Type": "application/offset+octet-stream",
+        }
+        return client.patch(location, content=data, headers=headers)
+
+    response = await patch(0, content[:half])
+    assert response.status_code == 204
+    assert response.headers["upload-offset"] == str(half)
+
+    # The connection dropped: ask where to resume, and not from the start
+    response = await client.head(location, headers=auth_headers)
+    assert response.headers["upload-offset"] == str(half)
+    assert response.headers["upload-length"] == str(len(content))
+    assert (await patch(0, content)).status_code == 409
+
+    response = await client.post(f"{location}/complete", headers=auth_headers)
+    assert response.status_code == 409
+
+    assert (await patch(half, content[half:])).status_code == 204
+    response = await client.post(f"{location}/complete?is_primary=true", headers=auth_headers)
+    assert response.status_code == 200
+    photo = response.json()
+    assert photo["is_primary"] is True
+    assert (photo["width"], photo["height"]) == (300, 200)
+
+    stored = (await db_session.exec(select(StoredFile))).one()
+    assert (upload_dir / "plants" / stored.file_path).read_bytes() == content
+    assert photo["url"] == f"/uploads/plants/{stored.file_path}"
+    assert (await db_session.exec(select(ResumableUpload))).all() == []
+    assert list((upload_dir / ".resumable").iterdir()) == []
+    assert (await client.head(location, headers=auth_headers)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_upload_is_bound_to_its_declared_size_and_owner(
+    client: AsyncClient, auth_headers: dict, upload_dir
+):
+    plant_id = await create_plant(client, auth_headers)
+    response = await client.post(
+        f"/api/plants/{plant_id}/photos/resumable",
+        json={"filename": "fern.jpg", "size": 4},
+        headers=auth_headers,
+    )
+    location = response.headers["location"]
+
+    response = await client.patch(
+        location, content=b"too long", headers={**auth_headers, "Upload-Offset": "0"}
+    )
+    assert response.status_code == 400
+    assert (await client.get(location, headers=auth_headers)).json()["offset"] == 0
+
+    pot = await client.post(
+        "/api/pots", json={"name": "Pot", "diameter_cm": 10, "height_cm": 10}, headers=auth_headers
+    )
+    other = location.replace(f"/plants/{plant_id}/", f"/pots/{pot.json()['id']}/")
+    assert (await client.get(other, headers=auth_headers)).status_code == 404
+
+    response = await client.post(
+        f"/api/plants/{plant_id}/photos/resumable",
+        json={"filename": "notes.txt", "size": 4},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_complete_after_the_plant_was_deleted(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, upload_dir
+):
+    plant_id = await create_plant(client, auth_headers)
+    response = await client.post(
+        f"/api/plants/{plant_id}/photos/resumable",
+        json={"filename": "fern.jpg", "size": 4},
+        headers=auth_headers,
+    )
+    location = response.headers["location"]
+    await client.patch(location, content=b"fern", headers={**auth_headers, "Upload-Offset": "0"})
+    await client.delete(f"/api/plants/{plant_id}", headers=auth_headers)
+
+    response = await client.post(f"{location}/complete", headers=auth_headers)
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Plant not found"
+    assert (await db_session.exec(select(PlantPhoto))).all() == []
+
+
+@pytest.mark.asyncio
+async def test_part_received_before_a_failure_counts(db_session: AsyncSession, upload_dir):
+    plant = Plant(name="Fern")
+    db_session.add(plant)
+    await db_session.commit()
+    upload = await create_resumable_upload(db_session, "plants", plant.id, "fern.jpg", 10)
+
+    async def broken_body():
+        yield b"abcd"
+        raise ConnectionResetError
+
+    with pytest.raises(ConnectionResetError):
+        await append_to_resumable_upload(db_session, upload, 0, broken_body())
+
+    await db_session.refresh(upload)
+    assert upload.received == 4
+    assert staging_path(upload.id).read_bytes() == b"abcd"
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_leaves_upload_completable(db_session: AsyncSession, upload_dir):
+    plant = Plant(name="Fern")
+    db_session.add(plant)
+    await db_session.commit()
+    content = make_jpeg()
+    upload = await create_resumable_upload(db_session, "plants", plant.id, "fern.jpg", len(content))
+
+    async def body():
+        yield content
+
+    await append_to_resumable_upload(db_session, upload, 0, body())
+
+    upload_id = upload.id
+    await complete_resumable_upload(db_session, upload)
+    await db_session.rollback()  # The caller's commit failed
+
+    assert staging_path(upload_id).read_bytes() == content
+    upload = await db_session.get(ResumableUpload, upload_id)
+    saved = await complete_resumable_upload(db_session, upload)
+    await db_session.commit()
+    await remove_staging_file(upload_id)
+
+    assert (upload_dir / "plants" / saved.file_path).read_bytes() == content
+    assert list((upload_dir / ".resumable").iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_cancel(client: AsyncClient, auth_headers: dict, db_session, upload_dir):
+    plant_id = await create_plant(client, auth_headers)
+    response = await client.post(
+        f"/api/plants/{plant_id}/photos/resumable",
+        json={"filename": "fern.jpg", "size": 10},
+        headers=auth_headers,
+    )
+    location = response.headers["location"]
+
+    assert (await client.delete(location, headers=auth_headers)).status_code == 204
+    assert (await db_session.exec(select(ResumableUpload))).all() == []
+    assert list((upload_dir / ".resumable").iterdir()) == []
+    assert (await db_session.exec(select(PlantPhoto))).all() == []
+
+
+@pytest.mark.asyncio
+async def test_abandoned_uploads_expire(db_session: AsyncSession, upload_dir):
+    plant = Plant(name="Fern")
+    db_session.add(plant)
+    await db_session.commit()
+    active = await create_resumable_upload(db_session, "plants", plant.id, "a.jpg", 10)
+    abandoned = await create_resumable_upload(db_session, "plants", plant.id, "b.jpg", 10)
+    abandoned.expires_at = datetime.now(UTC) - timedelta(minutes=1)
+    db_session.add(abandoned)
+    await db_session.commit()
+    # A staging file whose row was never committed
+    stale = upload_dir / ".resumable" / "crashed.part"
+    stale.write_bytes(b"x")
+    old = time.time() - 2 * 24 * 3600
+    os.utime(stale, (old, old))
+
+    assert await expire_resumable_uploads(db_session) == 1
+
+    remaining = (await db_session.exec(select(ResumableUpload))).all()
+    assert [upload.id for upload in remaining] == [active.id]
+    assert sorted(p.name for p in (upload_dir / ".resumable").iterdir()) == [f"{active.id}.part"]
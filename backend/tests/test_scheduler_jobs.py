@@ -3,8 +3,16 @@ from datetime import UTC, datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-
-from app.models import Plant, PushSubscription, Reminder, ReminderType
+from sqlmodel import select
+
+from app.models import (
+    Plant,
+    PushOutbox,
+    PushOutboxStatus,
+    PushSubscription,
+    Reminder,
+    ReminderType,
+)
 from app.scheduler.jobs import check_due_reminders
 
 
@@ -50,28 +58,47 @@ async def test_check_due_reminders_sends_notification(db_session, mock_session_f
 
     await db_session.commit()
 
-    # Mock send_reminder_notification
-    with patch("app.scheduler.jobs.async_session_factory", mock_session_factory), \
-         patch("app.scheduler.jobs.send_reminder_notification",
-               new_callable=AsyncMock) as mock_send:
-
+    with patch("app.scheduler.jobs.async_session_factory", mock_session_factory):
         await check_due_reminders()
 
-        # Verify notification sent
-        mock_send.assert_called_once()
-        call_args = mock_send.call_args[1]
-        assert call_args["plant_name"] == "Test Plant"
-        assert call_args["reminder_type"] == "WATERING"
+    # Verify notification queued for delivery
+    result = await db_session.exec(select(PushOutbox))
+    entries = result.all()
+    assert len(entries) == 1
+    assert entries[0].subscription_id == sub.id
+    assert entries[0].reminder_id == reminder.id
+    assert entries[0].status == PushOutboxStatus.PENDING
+    assert entries[0].payload["title"] == "Time to water Test Plant"
 
-        # Verify reminder updated
-        await db_session.refresh(reminder)
-        assert reminder.last_notified is not None
-        # Should be recent (handle naive/aware mismatch from sqlite)
-        last_notified = reminder.last_notified
-        if last_notified.tzinfo is None:
-            last_notified = last_notified.replace(tzinfo=UTC)
+    # last_notified is only stamped once delivery succeeds
+    await db_session.refresh(reminder)
+    assert reminder.last_notified is None
 
-        assert (datetime.now(UTC) - last_notified) < timedelta(seconds=10)
+@pytest.mark.asyncio
+async def test_check_due_reminders_does_not_requeue(db_session, mock_session_factory):
+    plant = Plant(name="Test Plant")
+    db_session.add(plant)
+    sub = PushSubscription(endpoint="https://push.example.com", p256dh_key="key", auth_key="auth")
+    db_session.add(sub)
+    await db_session.commit()
+    await db_session.refresh(plant)
+
+    reminder = Reminder(
+        plant_id=plant.id,
+        reminder_type=ReminderType.WATERING,
+        next_due=datetime.now(UTC) - timedelta(minutes=10),
+        is_enabled=True
+    )
+    db_session.add(reminder)
+    await db_session.commit()
+
+    with patch("app.scheduler.jobs.async_session_factory", mock_session_factory):
+        await check_due_reminders()
+        # Second tick while the first notification is still queued
+        await check_due_reminders()
+
+    result = await db_session.exec(select(PushOutbox))
+    assert len(result.all()) == 1
 
 @pytest.mark.asyncio
 async def test_check_due_reminders_spam_prevention(db_session, mock_session_factory):
@@ -95,11 +122,9 @@ async def test_check_due_reminders_spam_prevention(db_session, mock_session_fact
     db_session.add(reminder)
     await db_session.commit()
 
-    with patch("app.scheduler.jobs.async_session_factory", mock_session_factory), \
-         patch("app.scheduler.jobs.send_reminder_notification",
-               new_callable=AsyncMock) as mock_send:
-
+    with patch("app.scheduler.jobs.async_session_factory", mock_session_factory):
         await check_due_reminders()
 
-        # Should verify that NO notification was sent (spam prevention < 24h)
-        mock_send.assert_not_called()
+    # Should verify that NO notification was queued (spam prevention < 24h)
+    result = await db_session.exec(select(PushOutbox))
+    assert result.all() == []
@@ -0,0 +1,88 @@
+"""Tests for scheduler leader election."""
+
+import pytest
+from apscheduler.triggers.interval import IntervalTrigger
+
+from app.scheduler.leader import FileLeaderLock, LeaderLock
+from app.scheduler.runner import LeaderScheduler
+
+
+class FakeLock(LeaderLock):
+    """Leader lock controlled by the test."""
+
+    def __init__(self):
+        self.available = True
+        self.held = False
+
+    async def acquire(self) -> bool:
+        self.held = self.available
+        return self.held
+
+    async def is_held(self) -> bool:
+        return self.held
+
+    async def release(self) -> None:
+        self.held = False
+
+
+async def noop() -> None:
+    """Placeholder job."""
+
+
+class TestFileLeaderLock:
+    """Tests for the SQLite file lock fallback."""
+
+    @pytest.mark.asyncio
+    async def test_only_one_holder(self, tmp_path):
+        """A second lock on the same file cannot be acquired."""
+        first = FileLeaderLock(tmp_path / "scheduler.lock")
+        second = FileLeaderLock(tmp_path / "scheduler.lock")
+
+        assert await first.acquire() is True
+        assert await second.acquire() is False
+        assert await first.is_held() is True
+        assert await second.is_held() is False
+
+        await first.release()
+        assert await second.acquire() is True
+        await second.release()
+
+
+class TestLeaderScheduler:
+    """Tests for leader-only job registration."""
+
+    @pytest.mark.asyncio
+    async def test_jobs_registered_only_when_leader(self):
+        """Jobs are added when the lock is won and removed when it is lost."""
+        lock = FakeLock()
+        lock.available = False
+        runner = LeaderScheduler(lock, poll_seconds=5)
+        runner.add_job(noop, IntervalTrigger(seconds=60), "noop")
+
+        await runner.elect()
+        assert runner.is_leader is False
+        assert runner.scheduler.get_job("noop") is None
+
+        lock.available = True
+        await runner.elect()
+        assert runner.is_leader is True
+        assert runner.scheduler.get_job("noop") is not None
+
+        # Heartbeat fails: leadership and jobs are dropped
+        lock.held = False
+        await runner.elect()
+        assert runner.is_leader is False
+        assert runner.scheduler.get_job("noop") is None
+
+    @pytest.mark.asyncio
+    async def test_shutdown_releases_lock(self):
+        """Shutting down hands leadership to the next process."""
+        lock = FakeLock()
+        runner = LeaderScheduler(lock, poll_seconds=5)
+
+        await runner.elect()
+        assert lock.held is True
+
+        await runner.shutdown()
+        assert lock.held is False
+        assert runner.is_leader is False
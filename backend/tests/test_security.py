@@ -1,12 +1,20 @@
 """Tests for security module."""
 
+import asyncio
+import threading
 from datetime import timedelta
 
+import pytest
+
+from app.core import security
 from app.core.security import (
     create_access_token,
     decode_token,
     hash_password,
+    hash_password_async,
+    needs_rehash,
     verify_password,
+    verify_password_async,
 )
 
 
@@ -44,6 +52,53 @@ class TestPasswordHashing:
 
         assert verify_password("wrongpassword", hashed) is False
 
+    def test_needs_rehash_compares_work_factor(self, monkeypatch):
+        """Test that only hashes with another cost need rehashing."""
+        monkeypatch.setattr(security.settings, "bcrypt_rounds", 5)
+
+        assert needs_rehash(hash_password("pw")) is False
+        assert needs_rehash(hash_password("pw", rounds=4)) is True
+        assert needs_rehash("not-a-bcrypt-hash") is True
+
+    @pytest.mark.asyncio
+    async def test_async_hashing_runs_on_the_pool(self, monkeypatch):
+        """Test that the async variants hash off the event loop thread."""
+        monkeypatch.setattr(security.settings, "bcrypt_rounds", 4)
+        threads = []
+        checkpw = security.bcrypt.checkpw
+
+        def record(*args):
+            threads.append(threading.current_thread().name)
+            return checkpw(*args)
+
+        monkeypatch.setattr(security.bcrypt, "checkpw", record)
+
+        hashed = await hash_password_async("pw")
+        assert hashed.startswith("$2b$04$")
+        assert await verify_password_async("pw", hashed) is True
+        assert threads[0].startswith("bcrypt")
+        assert security._pending == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_keeps_its_slot_until_the_hash_ends(self, monkeypatch):
+        """Test that a running hash counts as pending after its request is gone."""
+        release = threading.Event()
+        monkeypatch.setattr(security, "verify_password", lambda *args: release.wait(5))
+
+        task = asyncio.create_task(verify_password_async("pw", "hashed"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert security._pending == 1
+
+        release.set()
+        for _ in range(100):
+            if security._pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert security._pending == 0
+
 
 class TestJWT:
     """Tests for JWT token handling."""
@@ -1,53 +1,162 @@
 
-from unittest.mock import MagicMock, patch
+import asyncio
+import hashlib
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi import HTTPException, UploadFile
-
-from app.services.files import delete_upload_file, save_upload_file
+from sqlmodel import select
+
+from app.core.config import get_settings
+from app.models import Plant, PlantPhoto, StoredFile
+from app.services import files as files_module
+from app.services.files import (
+    CHUNK_SIZE,
+    MAX_FILE_SIZE,
+    delete_upload_file,
+    release_upload_file,
+    save_upload_file,
+    save_upload_files,
+    shard_existing_uploads,
+)
 
 
 @pytest.fixture
-def mock_settings(tmp_path):
-    with patch("app.services.files.settings") as mock:
-        mock.upload_plants_dir = tmp_path / "plants"
-        mock.upload_pots_dir = tmp_path / "pots"
-        yield mock
+def mock_settings(tmp_path, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "upload_dir", tmp_path)
+    return settings
+
+
+def upload(name: str, content: bytes) -> UploadFile:
+    file = MagicMock(spec=UploadFile)
+    file.filename = name
+    file.read.side_effect = [content, b""]
+    return file
+
+
+async def save(file: UploadFile, subfolder: str, session) -> str:
+    return (await save_upload_file(file, subfolder, session)).file_path
 
 @pytest.mark.asyncio
-async def test_save_upload_file_success(mock_settings):
+async def test_save_upload_file_success(mock_settings, db_session):
     content = b"fake image content"
     file = MagicMock(spec=UploadFile)
     file.filename = "test.jpg"
-    file.read.return_value = content
+    file.read.side_effect = [content, b""]
 
-    filename = await save_upload_file(file, "plants")
+    filename = (await save_upload_file(file, "plants", db_session)).file_path
 
-    assert filename.endswith(".jpg")
+    digest = hashlib.sha256(content).hexdigest()
+    assert filename == f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"
     file_path = mock_settings.upload_plants_dir / filename
     assert file_path.exists()
     assert file_path.read_bytes() == content
+    assert [p.name for p in mock_settings.upload_plants_dir.iterdir()] == [digest[:2]]
 
 @pytest.mark.asyncio
-async def test_save_upload_file_invalid_extension():
+async def test_save_upload_file_streams_chunks(mock_settings, db_session):
+    chunks = [b"a" * CHUNK_SIZE, b"b" * CHUNK_SIZE, b"c" * 10]
+    file = MagicMock(spec=UploadFile)
+    file.filename = "photo.png"
+    file.read.side_effect = [*chunks, b""]
+
+    filename = (await save_upload_file(file, "pots", db_session)).file_path
+
+    file.read.assert_called_with(CHUNK_SIZE)
+    assert (mock_settings.upload_pots_dir / filename).read_bytes() == b"".join(chunks)
+
+@pytest.mark.asyncio
+async def test_save_upload_file_invalid_extension(db_session):
     file = MagicMock(spec=UploadFile)
     file.filename = "test.txt"
 
     with pytest.raises(HTTPException) as exc:
-        await save_upload_file(file, "plants")
+        await save_upload_file(file, "plants", db_session)
     assert exc.value.status_code == 400
     assert "File type not allowed" in exc.value.detail
 
 @pytest.mark.asyncio
-async def test_save_upload_file_too_large():
+async def test_save_upload_file_too_large(mock_settings, db_session):
     file = MagicMock(spec=UploadFile)
     file.filename = "test.jpg"
-    file.read.return_value = b"a" * (10 * 1024 * 1024 + 1)
+    file.read.side_effect = [b"a" * MAX_FILE_SIZE, b"a", b"never read", b""]
 
     with pytest.raises(HTTPException) as exc:
-        await save_upload_file(file, "plants")
+        await save_upload_file(file, "plants", db_session)
     assert exc.value.status_code == 400
     assert "File too large" in exc.value.detail
+    # Aborted at the first chunk over the limit, without leaving a partial file
+    assert file.read.call_count == 2
+    assert list(mock_settings.upload_plants_dir.rglob("*")) == []
+
+@pytest.mark.asyncio
+async def test_identical_uploads_are_stored_once(mock_settings, db_session):
+    first = await save(upload("a.jpg", b"same photo"), "plants", db_session)
+    second = await save(upload("b.jpg", b"same photo"), "plants", db_session)
+    other = await save(upload("c.jpg", b"other photo"), "plants", db_session)
+    await db_session.commit()
+
+    assert first == second != other
+    root = mock_settings.upload_plants_dir
+    stored_files = sorted(p.relative_to(root).as_posix() for p in root.rglob("*.jpg"))
+    assert stored_files == sorted([first, other])
+    stored = (await db_session.exec(select(StoredFile).where(StoredFile.file_path == first))).one()
+    assert stored.ref_count == 2
+    assert stored.size == len(b"same photo")
+
+@pytest.mark.asyncio
+async def test_same_content_is_hard_linked_across_subfolders(mock_settings, db_session):
+    plant_file = await save(upload("a.jpg", b"shared"), "plants", db_session)
+    pot_file = await save(upload("a.jpg", b"shared"), "pots", db_session)
+
+    plant_path = mock_settings.upload_plants_dir / plant_file
+    pot_path = mock_settings.upload_pots_dir / pot_file
+    assert plant_path.stat().st_ino == pot_path.stat().st_ino
+    assert list(mock_settings.upload_pots_dir.glob(".*.part")) == []
+
+@pytest.mark.asyncio
+async def test_save_upload_files_in_parallel(mock_settings, db_session, monkeypatch):
+    monkeypatch.setattr(mock_settings, "upload_batch_concurrency", 2)
+    running = peak = 0
+    store = files_module._store
+
+    async def tracked_store(*args):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        try:
+            return await store(*args)
+        finally:
+            running -= 1
+
+    monkeypatch.setattr(files_module, "_store", tracked_store)
+    contents = [b"one", b"two", b"three", b"one"]
+    uploads = [upload(f"{i}.jpg", content) for i, content in enumerate(contents)]
+
+    saved = await save_upload_files(uploads, "plants", db_session)
+    await db_session.commit()
+
+    assert peak == 2
+    assert [s.sha256 for s in saved] == [hashlib.sha256(c).hexdigest() for c in contents]
+    query = select(StoredFile).where(StoredFile.file_path == saved[0].file_path)
+    assert (await db_session.exec(query)).one().ref_count == 2
+
+@pytest.mark.asyncio
+async def test_release_upload_file_counts_references(mock_settings, db_session):
+    for _ in range(2):
+        filename = await save(upload("a.jpg", b"photo"), "plants", db_session)
+    await db_session.commit()
+
+    assert await release_upload_file(db_session, filename, "plants") is False
+    # Unreferenced, but left to the orphan collector
+    assert await release_upload_file(db_session, filename, "plants") is False
+    await db_session.commit()
+    assert (await db_session.exec(select(StoredFile))).all() == []
+
+    # Files without a reference row predate content addressing: single owner
+    assert await release_upload_file(db_session, "legacy.jpg", "plants") is True
 
 @pytest.mark.asyncio
 async def test_delete_upload_file(mock_settings):
@@ -56,11 +165,59 @@ async def test_delete_upload_file(mock_settings):
     file_path = mock_settings.upload_plants_dir / "test.jpg"
     file_path.write_bytes(b"content")
 
-    await delete_upload_file("test.jpg", "plants")
+    variant_path = mock_settings.upload_plants_dir / "test.128.webp"
+    variant_path.write_bytes(b"variant")
+
+    await delete_upload_file("test.jpg", "plants", [{"path": "test.128.webp"}])
 
     assert not file_path.exists()
+    assert not variant_path.exists()
 
 @pytest.mark.asyncio
 async def test_delete_upload_file_not_found(mock_settings):
     # Should not raise error
     await delete_upload_file("nonexistent.jpg", "plants")
+
+@pytest.mark.asyncio
+async def test_shard_existing_uploads(mock_settings, db_session):
+    plants = mock_settings.upload_plants_dir
+    plants.mkdir(parents=True)
+    (plants / "abcdef.jpg").write_bytes(b"legacy")
+    (plants / "abcdef.128.webp").write_bytes(b"variant")
+    (plants / "1234.png").write_bytes(b"shared")
+    plant = Plant(name="Fern")
+    db_session.add(plant)
+    db_session.add(
+        PlantPhoto(
+            plant_id=plant.id,
+            file_path="abcdef.jpg",
+            variants=[{"path": "abcdef.128.webp", "format": "webp", "width": 128, "height": 96}],
+        )
+    )
+    for _ in range(2):
+        db_session.add(PlantPhoto(plant_id=plant.id, file_path="1234.png"))
+    db_session.add(StoredFile(subfolder="plants", file_path="1234.png", sha256="1", size=6))
+    # Same content uploaded again after sharding was introduced
+    db_session.add(
+        StoredFile(subfolder="plants", file_path="12/34/1234.png", sha256="1", size=6)
+    )
+    await db_session.commit()
+
+    context_manager = MagicMock()
+    context_manager.__aenter__ = AsyncMock(return_value=db_session)
+    context_manager.__aexit__ = AsyncMock(return_value=None)
+    factory = MagicMock(return_value=context_manager)
+    with patch("app.services.files.async_session_factory", factory):
+        assert await shard_existing_uploads(batch_size=2) == 3
+        assert await shard_existing_uploads(batch_size=2) == 0
+
+    photos = (await db_session.exec(select(PlantPhoto).order_by(PlantPhoto.file_path))).all()
+    assert [p.file_path for p in photos] == ["12/34/1234.png", "12/34/1234.png", "ab/cd/abcdef.jpg"]
+    assert photos[2].variants[0]["path"] == "ab/cd/abcdef.128.webp"
+    assert sorted(p.relative_to(plants).as_posix() for p in plants.rglob("*.*")) == [
+        "12/34/1234.png",
+        "ab/cd/abcdef.128.webp",
+        "ab/cd/abcdef.jpg",
+    ]
+    stored = (await db_session.exec(select(StoredFile))).one()
+    assert (stored.file_path, stored.ref_count) == ("12/34/1234.png", 2)
@@ -0,0 +1,260 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from sqlmodel import select
+
+from app.models import OrganType, Plant, PlantIdentification, Species
+from app.services.identification import (
+    clear_memory_cache,
+    get_stats,
+    identify_cached,
+    image_cache_key,
+    prune_identification_cache,
+)
+from app.services.images import PreparedImage
+from app.services.plantnet import REJECTED_LOCALLY, PlantImage
+
+RESULT = {
+    "results": [
+        {
+            "score": 0.9,
+            "scientific_name": "Monstera deliciosa",
+            "common_names": [],
+            "family": "Araceae",
+            "genus": "Monstera",
+        }
+    ],
+    "remaining_identifications": 10,
+}
+
+
+def test_cache_key_depends_on_images_and_organs():
+    key = image_cache_key([PlantImage(b"image", "leaf")])
+    assert key == image_cache_key([PlantImage(b"image", "LEAF")])
+    assert key != image_cache_key([PlantImage(b"image", "flower")])
+    assert key != image_cache_key([PlantImage(b"other", "leaf")])
+
+    pair = [PlantImage(b"leaf", "leaf"), PlantImage(b"flower", "flower")]
+    assert image_cache_key(pair) != image_cache_key(pair[::-1])
+    assert image_cache_key(pair) != image_cache_key([PlantImage(b"leafflower", "leaf")])
+
+
+@pytest.mark.asyncio
+async def test_repeated_identification_uses_cache(db_session):
+    mock_identify = AsyncMock(return_value=RESULT)
+    with patch("app.services.identification.identify_plant", mock_identify):
+        first = await identify_cached(db_session, [PlantImage(b"image")])
+        second = await identify_cached(db_session, [PlantImage(b"image")])
+
+    assert first == second == RESULT
+    mock_identify.assert_awaited_once()
+
+    rows = (await db_session.exec(select(PlantIdentification))).all()
+    assert len(rows) == 1
+    assert rows[0].image_hash == image_cache_key([PlantImage(b"image")])
+    assert rows[0].organ == OrganType.LEAF
+    assert rows[0].results == RESULT
+
+
+@pytest.mark.asyncio
+async def test_persisted_result_survives_memory_cache(db_session):
+    mock_identify = AsyncMock(return_value=RESULT)
+    with patch("app.services.identification.identify_plant", mock_identify):
+        await identify_cached(db_session, [PlantImage(b"image")])
+        clear_memory_cache()
+        result = await identify_cached(db_session, [PlantImage(b"image")])
+
+    assert result == RESULT
+    mock_identify.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_refetched(db_session):
+    db_session.add(
+        PlantIdentification(
+            organ=OrganType.LEAF,
+            image_hash=image_cache_key([PlantImage(b"image")]),
+            results={"results": [], "remaining_identifications": 0},
+            expires_at=datetime.now(UTC) - timedelta(minutes=1),
+        )
+    )
+    await db_session.commit()
+
+    mock_identify = AsyncMock(return_value=RESULT)
+    with patch("app.services.identification.identify_plant", mock_identify):
+        result = await identify_cached(db_session, [PlantImage(b"image")])
+
+    assert result == RESULT
+    mock_identify.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached(db_session):
+    error = {"error": "PlantNet API error: 500", "results": []}
+    mock_identify = AsyncMock(return_value=error)
+    with patch("app.services.identification.identify_plant", mock_identify):
+        await identify_cached(db_session, [PlantImage(b"image")])
+        await identify_cached(db_session, [PlantImage(b"image")])
+
+    assert mock_identify.await_count == 2
+    assert (await db_session.exec(select(PlantIdentification))).all() == []
+
+
+@pytest.mark.asyncio
+async def test_local_rejections_are_not_counted_as_upstream_calls(db_session):
+    rejection = {
+        "error": "Too many identification requests",
+        "error_code": "RATE_LIMITED",
+        "results": [],
+        "retry_after": 5,
+        REJECTED_LOCALLY: True,
+    }
+    with patch("app.services.identification.identify_plant", AsyncMock(return_value=rejection)):
+        result = await identify_cached(db_session, [PlantImage(b"image")])
+
+    assert REJECTED_LOCALLY not in result
+    stats = get_stats()
+    assert stats["rejected_locally"] == 1
+    assert stats["upstream_calls"] == 0
+    assert stats["bytes_uploaded"] == 0
+    assert stats["bytes_received"] == 5
+    assert stats["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_prune_keeps_live_and_linked_entries(db_session):
+    plant = Plant(name="Monstera")
+    db_session.add(plant)
+    past = datetime.now(UTC) - timedelta(days=1)
+    future = datetime.now(UTC) + timedelta(days=1)
+    db_session.add_all(
+        [
+            PlantIdentification(organ=OrganType.LEAF, image_hash="expired", expires_at=past),
+            PlantIdentification(organ=OrganType.LEAF, image_hash="live", expires_at=future),
+            PlantIdentification(
+                organ=OrganType.LEAF, image_hash="linked", expires_at=past, plant_id=plant.id
+            ),
+        ]
+    )
+    await db_session.commit()
+
+    assert await prune_identification_cache(db_session) == 1
+
+    remaining = (await db_session.exec(select(PlantIdentification.image_hash))).all()
+    assert sorted(remaining) == ["linked", "live"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_share_one_call(db_session):
+    release = asyncio.Event()
+
+    async def slow_identify(**_kwargs):
+        await release.wait()
+        return RESULT
+
+    mock_identify = AsyncMock(side_effect=slow_identify)
+    with patch("app.services.identification.identify_plant", mock_identify):
+        tasks = [
+            asyncio.create_task(identify_cached(db_session, [PlantImage(b"image")]))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+    assert results == [RESULT] * 3
+    mock_identify.assert_awaited_once()
+    stats = get_stats()
+    assert stats["upstream_calls"] == 1
+    assert stats["coalesced"] == 2
+    assert stats["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_coalesced_requests_share_upstream_errors(db_session):
+    release = asyncio.Event()
+
+    async def failing_identify(**_kwargs):
+        await release.wait()
+        raise httpx.ReadTimeout("timed out")
+
+    with patch(
+        "app.services.identification.identify_plant", AsyncMock(side_effect=failing_identify)
+    ):
+        tasks = [
+            asyncio.create_task(identify_cached(db_session, [PlantImage(b"image")]))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(result, httpx.ReadTimeout) for result in results)
+    assert get_stats()["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_duplicate_takes_over_when_leader_is_cancelled(db_session):
+    started = asyncio.Event()
+    calls = 0
+
+    async def identify(**_kwargs):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            started.set()
+            await asyncio.Event().wait()  # hangs until cancelled
+        return RESULT
+
+    with patch("app.services.identification.identify_plant", AsyncMock(side_effect=identify)):
+        leader = asyncio.create_task(identify_cached(db_session, [PlantImage(b"image")]))
+        await started.wait()
+        follower = asyncio.create_task(identify_cached(db_session, [PlantImage(b"image")]))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == RESULT
+
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_upload_is_preprocessed_before_identification(db_session):
+    prepared = PreparedImage(b"small", "image/jpeg", original_size=10)
+    mock_identify = AsyncMock(return_value=RESULT)
+    with (
+        patch("app.services.identification.prepare_image", AsyncMock(return_value=prepared)),
+        patch("app.services.identification.identify_plant", mock_identify),
+    ):
+        await identify_cached(db_session, [PlantImage(b"large-data", "leaf", "image/png")])
+
+    mock_identify.assert_awaited_once_with(
+        images=[PlantImage(b"small", "leaf", "image/jpeg")], api_key=None
+    )
+    stats = get_stats()
+    assert stats["bytes_received"] == 10
+    assert stats["bytes_uploaded"] == 5
+
+
+@pytest.mark.asyncio
+async def test_multiple_images_are_identified_together(db_session):
+    images = [PlantImage(b"leaf", "leaf"), PlantImage(b"flower", "flower", "image/png")]
+    mock_identify = AsyncMock(return_value=RESULT)
+    with patch("app.services.identification.identify_plant", mock_identify):
+        await identify_cached(db_session, images)
+        await identify_cached(db_session, images)
+        await identify_cached(db_session, images[:1])
+
+    assert mock_identify.await_count == 2
+    assert mock_identify.await_args_list[0].kwargs["images"] == images
+
+
+@pytest.mark.asyncio
+async def test_identified_species_are_added_to_catalogue(db_session):
+    with patch("app.services.identification.identify_plant", AsyncMock(return_value=RESULT)):
+        await identify_cached(db_session, [PlantImage(b"image")])
+
+    species = (await db_session.exec(select(Species))).all()
+    assert [s.scientific_name for s in species] == ["Monstera deliciosa"]
@@ -0,0 +1,123 @@
+import base64
+import io
+from datetime import UTC, datetime
+
+import pytest
+from PIL import ExifTags, Image
+
+from app.services.images import (
+    PLACEHOLDER_SIZE,
+    prepare_image,
+    preprocess_image,
+    read_photo_metadata,
+)
+
+
+def make_image(size, fmt="JPEG", orientation=None) -> bytes:
+    image = Image.effect_noise(size, 64).convert("RGB")
+    buffer = io.BytesIO()
+    kwargs = {}
+    if orientation is not None:
+        exif = Image.Exif()
+        exif[ExifTags.Base.Orientation] = orientation
+        kwargs["exif"] = exif
+    image.save(buffer, format=fmt, quality=95, **kwargs)
+    return buffer.getvalue()
+
+
+def decode(data: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(data))
+
+
+def test_large_image_is_downscaled():
+    data = make_image((3000, 2000))
+
+    prepared = preprocess_image(data, "image/jpeg", max_side=1280, quality=85)
+
+    assert prepared.content_type == "image/jpeg"
+    assert decode(prepared.data).size == (1280, 853)
+    assert prepared.original_size == len(data)
+    assert prepared.bytes_saved > 0
+
+
+def test_exif_orientation_is_applied():
+    data = make_image((400, 200), orientation=6)  # rotated 90° clockwise
+
+    prepared = preprocess_image(data, "image/jpeg", max_side=1280, quality=85)
+
+    image = decode(prepared.data)
+    assert image.size == (200, 400)
+    assert image.getexif().get(ExifTags.Base.Orientation) is None
+
+
+def test_small_upright_jpeg_is_passed_through():
+    data = make_image((640, 480))
+
+    prepared = preprocess_image(data, "image/jpeg", max_side=1280, quality=85)
+
+    assert prepared.data == data
+    assert prepared.bytes_saved == 0
+
+
+def test_png_is_reencoded_as_jpeg():
+    data = make_image((2000, 2000), fmt="PNG")
+
+    prepared = preprocess_image(data, "image/png", max_side=1280, quality=85)
+
+    assert prepared.content_type == "image/jpeg"
+    assert decode(prepared.data).format == "JPEG"
+    assert max(decode(prepared.data).size) == 1280
+
+
+def test_undecodable_image_is_passed_through():
+    prepared = preprocess_image(b"fake-image", "image/heic", max_side=1280, quality=85)
+
+    assert prepared.data == b"fake-image"
+    assert prepared.content_type == "image/heic"
+
+
+@pytest.mark.asyncio
+async def test_prepare_image_uses_settings():
+    data = make_image((3000, 1000))
+
+    prepared = await prepare_image(data, "image/jpeg")
+
+    assert max(decode(prepared.data).size) == 1280
+
+
+def test_photo_metadata(tmp_path):
+    exif = Image.Exif()
+    exif[ExifTags.Base.Orientation] = 6  # rotated 90° clockwise
+    details = exif.get_ifd(ExifTags.IFD.Exif)
+    details[ExifTags.Base.DateTimeOriginal] = "2024:05:01 10:30:00"
+    details[ExifTags.Base.OffsetTimeOriginal] = "+02:00"
+    source = tmp_path / "photo.jpg"
+    Image.new("RGB", (4000, 3000), (30, 120, 40)).save(source, exif=exif)
+
+    metadata = read_photo_metadata(source)
+
+    assert (metadata["width"], metadata["height"]) == (3000, 4000)
+    assert metadata["orientation"] == 6
+    assert metadata["taken_at"] == datetime(2024, 5, 1, 8, 30, tzinfo=UTC)
+    prefix = "data:image/webp;base64,"
+    assert metadata["placeholder"].startswith(prefix)
+    placeholder = decode(base64.b64decode(metadata["placeholder"].removeprefix(prefix)))
+    assert placeholder.size == (PLACEHOLDER_SIZE * 3 // 4, PLACEHOLDER_SIZE)
+
+
+def test_photo_metadata_without_exif(tmp_path):
+    source = tmp_path / "photo.png"
+    source.write_bytes(make_image((300, 200), fmt="PNG"))
+
+    metadata = read_photo_metadata(source)
+
+    assert (metadata["width"], metadata["height"]) == (300, 200)
+    assert metadata["orientation"] == 1
+    assert metadata["taken_at"] is None
+
+
+def test_photo_metadata_of_undecodable_file(tmp_path):
+    source = tmp_path / "photo.jpg"
+    source.write_bytes(b"fake-image")
+
+    assert read_photo_metadata(source) is None
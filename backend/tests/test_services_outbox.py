@@ -0,0 +1,152 @@
+import json
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+from sqlmodel import select
+
+from app.models import (
+    Plant,
+    PushOutbox,
+    PushOutboxStatus,
+    PushSubscription,
+    Reminder,
+    ReminderType,
+)
+from app.services.outbox import deliver_outbox_batch, enqueue_notification, retry_delay
+from app.services.push import PushResult
+
+
+@pytest.fixture
+def mock_settings():
+    with patch("app.services.outbox.settings") as mock:
+        mock.vapid_private_key = "test-key"
+        mock.push_outbox_batch_size = 100
+        mock.push_delivery_concurrency = 5
+        mock.push_max_attempts = 3
+        mock.push_retry_base_seconds = 30
+        mock.push_retry_max_seconds = 3600
+        yield mock
+
+
+@pytest_asyncio.fixture
+async def queued(db_session):
+    plant = Plant(name="Fern")
+    sub = PushSubscription(endpoint="https://push.example.com/1", p256dh_key="k", auth_key="a")
+    db_session.add(plant)
+    db_session.add(sub)
+    await db_session.commit()
+
+    reminder = Reminder(
+        plant_id=plant.id,
+        reminder_type=ReminderType.WATERING,
+        next_due=datetime.now(UTC),
+    )
+    db_session.add(reminder)
+    await db_session.commit()
+
+    enqueue_notification(
+        db_session,
+        [sub.id],
+        {"title": "Water", "body": "Now", "url": "/plants"},
+        reminder_id=reminder.id,
+    )
+    await db_session.commit()
+    return sub, reminder
+
+
+def test_retry_delay_is_exponential_and_capped(mock_settings):
+    assert retry_delay(1) == timedelta(seconds=30)
+    assert retry_delay(2) == timedelta(seconds=60)
+    assert retry_delay(3) == timedelta(seconds=120)
+    assert retry_delay(20) == timedelta(seconds=3600)
+
+
+@pytest.mark.asyncio
+async def test_deliver_success_marks_sent(db_session, mock_settings, queued):
+    sub, reminder = queued
+    with patch(
+        "app.services.outbox.send_push_batch",
+        AsyncMock(return_value=[PushResult(success=True)]),
+    ) as mock_send:
+        processed = await deliver_outbox_batch(db_session)
+
+    assert processed == 1
+    mock_send.assert_awaited_once()
+    subscriptions, payloads = mock_send.call_args.args
+    assert [s.id for s in subscriptions] == [sub.id]
+    assert json.loads(payloads[0]) == {"title": "Water", "body": "Now", "url": "/plants"}
+
+    entry = (await db_session.exec(select(PushOutbox))).one()
+    assert entry.status == PushOutboxStatus.SENT
+    assert entry.attempts == 1
+    assert entry.sent_at is not None
+
+    await db_session.refresh(sub)
+    await db_session.refresh(reminder)
+    assert sub.success_count == 1
+    assert sub.last_success_at is not None
+    assert reminder.last_notified is not None
+
+
+@pytest.mark.asyncio
+async def test_deliver_failure_schedules_retry(db_session, mock_settings, queued):
+    sub, reminder = queued
+    with patch(
+        "app.services.outbox.send_push_batch",
+        AsyncMock(return_value=[PushResult(success=False, status_code=500, error="boom")]),
+    ):
+        await deliver_outbox_batch(db_session)
+        # Not due yet, so nothing is picked up again
+        assert await deliver_outbox_batch(db_session) == 0
+
+    entry = (await db_session.exec(select(PushOutbox))).one()
+    assert entry.status == PushOutboxStatus.PENDING
+    assert entry.attempts == 1
+    assert entry.last_error == "boom"
+    next_attempt = entry.next_attempt_at.replace(tzinfo=UTC)
+    assert next_attempt > datetime.now(UTC) + timedelta(seconds=20)
+
+    await db_session.refresh(sub)
+    await db_session.refresh(reminder)
+    assert sub.failure_count == 1
+    assert reminder.last_notified is None
+
+
+@pytest.mark.asyncio
+async def test_deliver_gives_up_after_max_attempts(db_session, mock_settings, queued):
+    entry = (await db_session.exec(select(PushOutbox))).one()
+    entry.attempts = 2
+    db_session.add(entry)
+    await db_session.commit()
+
+    with patch(
+        "app.services.outbox.send_push_batch",
+        AsyncMock(return_value=[PushResult(success=False, error="timeout")]),
+    ):
+        await deliver_outbox_batch(db_session)
+
+    await db_session.refresh(entry)
+    assert entry.status == PushOutboxStatus.FAILED
+    assert entry.attempts == 3
+
+
+@pytest.mark.asyncio
+async def test_deliver_prunes_gone_subscription(db_session, mock_settings, queued):
+    with patch(
+        "app.services.outbox.send_push_batch",
+        AsyncMock(return_value=[PushResult(success=False, status_code=410, error="gone")]),
+    ):
+        await deliver_outbox_batch(db_session)
+
+    assert (await db_session.exec(select(PushSubscription))).all() == []
+    assert (await db_session.exec(select(PushOutbox))).all() == []
+
+
+@pytest.mark.asyncio
+async def test_deliver_skipped_without_vapid_key(db_session, mock_settings, queued):
+    mock_settings.vapid_private_key = ""
+    with patch("app.services.outbox.send_push_batch", AsyncMock()) as mock_send:
+        assert await deliver_outbox_batch(db_session) == 0
+    mock_send.assert_not_awaited()
@@ -1,9 +1,20 @@
 
+from datetime import UTC, datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
 
-from app.services.plantnet import identify_plant
+from app.services import plantnet
+from app.services.plantnet import PlantImage, identify_plant
+from app.services.resilience import CircuitBreaker, TokenBucket
+
+
+@pytest.fixture(autouse=True)
+def reset_limits():
+    plantnet.reset_limits()
+    yield
+    plantnet.reset_limits()
 
 
 @pytest.fixture
@@ -11,6 +22,10 @@ def mock_settings():
     with patch("app.services.plantnet.settings") as mock:
         mock.plantnet_api_key = "test_key"
         mock.plantnet_api_url = "https://my-api.plantnet.org/v2/identify/all"
+        mock.plantnet_rate_limit_per_minute = 0
+        mock.plantnet_rate_limit_burst = 1
+        mock.plantnet_breaker_failure_threshold = 5
+        mock.plantnet_breaker_reset_seconds = 30.0
         yield mock
 
 @pytest.mark.asyncio
@@ -30,9 +45,8 @@ async def test_identify_plant_success(mock_settings):
         "remainingIdentificationRequests": 100,
     }
 
-    with patch("httpx.AsyncClient") as mock_client_cls:
-        mock_client = AsyncMock()
-        mock_client_cls.return_value.__aenter__.return_value = mock_client
+    mock_client = AsyncMock()
+    with patch("app.services.plantnet.get_client", return_value=mock_client):
 
         # Setup response
         mock_response = MagicMock()
@@ -57,6 +71,7 @@ async def test_identify_plant_no_api_key():
         assert "error" in result
         assert result["error"] == "PlantNet API key not configured"
         assert result["error_code"] == "MISSING_API_KEY"
+        assert result[plantnet.REJECTED_LOCALLY] is True
 
 
 @pytest.mark.asyncio
@@ -64,10 +79,10 @@ async def test_identify_plant_prefers_explicit_api_key():
     with patch("app.services.plantnet.settings") as mock_settings:
         mock_settings.plantnet_api_key = None
         mock_settings.plantnet_api_url = "https://my-api.plantnet.org/v2/identify/all"
+        mock_settings.plantnet_rate_limit_per_minute = 0
 
-        with patch("httpx.AsyncClient") as mock_client_cls:
-            mock_client = AsyncMock()
-            mock_client_cls.return_value.__aenter__.return_value = mock_client
+        mock_client = AsyncMock()
+        with patch("app.services.plantnet.get_client", return_value=mock_client):
 
             mock_response = MagicMock()
             mock_response.status_code = 200
@@ -81,9 +96,8 @@ async def test_identify_plant_prefers_explicit_api_key():
 
 @pytest.mark.asyncio
 async def test_identify_plant_api_error(mock_settings):
-    with patch("httpx.AsyncClient") as mock_client_cls:
-        mock_client = AsyncMock()
-        mock_client_cls.return_value.__aenter__.return_value = mock_client
+    mock_client = AsyncMock()
+    with patch("app.services.plantnet.get_client", return_value=mock_client):
 
         mock_response = MagicMock()
         mock_response.status_code = 400
@@ -95,3 +109,193 @@ async def test_identify_plant_api_error(mock_settings):
 
         assert "error" in result
         assert "PlantNet API error: 400" in result["error"]
+
+
+@pytest.mark.asyncio
+async def test_client_is_shared_and_pooled():
+    with patch("app.services.plantnet.settings") as mock_settings:
+        mock_settings.plantnet_http2 = False
+        mock_settings.plantnet_connect_timeout = 2.0
+        mock_settings.plantnet_read_timeout = 20.0
+        mock_settings.plantnet_max_connections = 7
+        mock_settings.plantnet_max_keepalive_connections = 3
+        mock_settings.plantnet_keepalive_expiry = 45.0
+
+        await plantnet.start_client()
+        try:
+            client = plantnet.get_client()
+            assert plantnet.get_client() is client
+            assert client.timeout.connect == 2.0
+            assert client.timeout.read == 20.0
+        finally:
+            await plantnet.close_client()
+
+        assert client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_identify_plant_sends_all_images_in_one_request(mock_settings):
+    mock_client = AsyncMock()
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"results": [], "remainingIdentificationRequests": 9}
+    mock_client.post.return_value = mock_response
+
+    with patch("app.services.plantnet.get_client", return_value=mock_client):
+        await identify_plant(
+            images=[
+                PlantImage(b"leaf", "leaf"),
+                PlantImage(b"flower", "flower", "image/png"),
+            ]
+        )
+
+    mock_client.post.assert_awaited_once()
+    kwargs = mock_client.post.call_args.kwargs
+    assert kwargs["files"] == [
+        ("images", ("plant-0", b"leaf", "image/jpeg")),
+        ("images", ("plant-1", b"flower", "image/png")),
+    ]
+    assert kwargs["data"] == {"organs": ["leaf", "flower"]}
+
+
+def mock_client_returning(status_code: int, payload: dict | None = None) -> AsyncMock:
+    mock_client = AsyncMock()
+    mock_response = MagicMock()
+    mock_response.status_code = status_code
+    mock_response.json.return_value = payload or {}
+    mock_client.post.return_value = mock_response
+    return mock_client
+
+
+@pytest.mark.asyncio
+async def test_identify_plant_stops_when_quota_is_used_up(mock_settings):
+    mock_client = mock_client_returning(
+        200, {"results": [], "remainingIdentificationRequests": 0}
+    )
+    with patch("app.services.plantnet.get_client", return_value=mock_client):
+        first = await identify_plant(b"image_data")
+        result = await identify_plant(b"image_data")
+
+    assert first["remaining_identifications"] == 0
+    assert mock_client.post.await_count == 1
+    assert result["error_code"] == "QUOTA_EXHAUSTED"
+    assert 0 < result["retry_after"] <= 24 * 3600
+
+
+@pytest.mark.asyncio
+async def test_identify_plant_treats_429_as_exhausted_quota(mock_settings):
+    mock_client = mock_client_returning(429)
+    with patch("app.services.plantnet.get_client", return_value=mock_client):
+        first = await identify_plant(b"image_data")
+        second = await identify_plant(b"image_data")
+
+    assert first["error_code"] == second["error_code"] == "QUOTA_EXHAUSTED"
+    assert mock_client.post.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_identify_plant_rate_limits_bursts(mock_settings):
+    mock_settings.plantnet_rate_limit_per_minute = 6
+    mock_settings.plantnet_rate_limit_burst = 2
+    plantnet.reset_limits()
+
+    mock_client = mock_client_returning(200, {"results": []})
+    with patch("app.services.plantnet.get_client", return_value=mock_client):
+        results = [await identify_plant(b"image_data") for _ in range(3)]
+
+    assert mock_client.post.await_count == 2
+    assert results[2]["error_code"] == "RATE_LIMITED"
+    assert results[2]["retry_after"] == 10
+    assert results[2][plantnet.REJECTED_LOCALLY] is True
+    assert plantnet.REJECTED_LOCALLY not in results[1]
+
+
+@pytest.mark.asyncio
+async def test_identify_plant_fails_fast_after_upstream_failures(mock_settings):
+    mock_settings.plantnet_breaker_failure_threshold = 2
+    mock_settings.plantnet_breaker_reset_seconds = 30
+    plantnet.reset_limits()
+
+    mock_client = AsyncMock()
+    mock_client.post.side_effect = [httpx.ReadTimeout("timed out"), MagicMock(status_code=503)]
+    with patch("app.services.plantnet.get_client", return_value=mock_client):
+        timeout = await identify_plant(b"image_data")
+        server_error = await identify_plant(b"image_data")
+        rejected = await identify_plant(b"image_data")
+
+    assert timeout["error_code"] == "UPSTREAM_TIMEOUT"
+    assert server_error["error_code"] == "UPSTREAM_ERROR"
+    assert rejected["error_code"] == "UPSTREAM_UNAVAILABLE"
+    assert rejected["retry_after"] == 30
+    assert mock_client.post.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_identify_plant_spreads_remaining_quota_until_reset(mock_settings):
+    mock_settings.plantnet_rate_limit_per_minute = 6
+    mock_settings.plantnet_rate_limit_burst = 2
+    plantnet.reset_limits()
+    plantnet._quota._clock = lambda: datetime(2026, 5, 1, 12, 0, tzinfo=UTC)
+
+    mock_client = mock_client_returning(
+        200, {"results": [], "remainingIdentificationRequests": 2}
+    )
+    with patch("app.services.plantnet.get_client", return_value=mock_client):
+        results = [await identify_plant(b"image_data") for _ in range(3)]
+
+    # 2 calls left for the 12 hours until midnight UTC: one every 6 hours
+    assert mock_client.post.await_count == 2
+    assert results[2]["error_code"] == "RATE_LIMITED"
+    assert 6 * 3600 - 60 < results[2]["retry_after"] <= 6 * 3600
+
+
+@pytest.mark.asyncio
+async def test_identify_plant_keeps_configured_rate_while_quota_suffices(mock_settings):
+    mock_settings.plantnet_rate_limit_per_minute = 6
+    mock_settings.plantnet_rate_limit_burst = 2
+    plantnet.reset_limits()
+    # 6 calls a minute for the hour until midnight UTC use 360 of 500
+    plantnet._quota._clock = lambda: datetime(2026, 5, 1, 23, 0, tzinfo=UTC)
+
+    mock_client = mock_client_returning(
+        200, {"results": [], "remainingIdentificationRequests": 500}
+    )
+    with patch("app.services.plantnet.get_client", return_value=mock_client):
+        results = [await identify_plant(b"image_data") for _ in range(3)]
+
+    assert mock_client.post.await_count == 2
+    assert results[2]["error_code"] == "RATE_LIMITED"
+    assert results[2]["retry_after"] == 10
+
+
+@pytest.mark.asyncio
+async def test_identify_plant_zero_rate_stays_unlimited_with_known_quota(mock_settings):
+    plantnet.reset_limits()
+    plantnet._quota._clock = lambda: datetime(2026, 5, 1, 12, 0, tzinfo=UTC)
+
+    mock_client = mock_client_returning(
+        200, {"results": [], "remainingIdentificationRequests": 500}
+    )
+    with patch("app.services.plantnet.get_client", return_value=mock_client):
+        results = [await identify_plant(b"image_data") for _ in range(10)]
+
+    assert mock_client.post.await_count == 10
+    assert all("error_code" not in result for result in results)
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_call_keeps_the_half_open_trial(mock_settings, monkeypatch):
+    mock_settings.plantnet_rate_limit_per_minute = 0.6
+    clock = MagicMock(return_value=0.0)
+    monkeypatch.setattr(plantnet, "_bucket", TokenBucket(rate=0.01, capacity=1, clock=clock))
+    monkeypatch.setattr(plantnet, "_breaker", CircuitBreaker(1, reset_timeout=30, clock=clock))
+
+    mock_client = AsyncMock()
+    mock_client.post.side_effect = httpx.ReadTimeout("timed out")
+    with patch("app.services.plantnet.get_client", return_value=mock_client):
+        await identify_plant(b"image_data")
+        clock.return_value = 30.0
+        first = await identify_plant(b"image_data")
+        second = await identify_plant(b"image_data")
+
+    assert first["error_code"] == second["error_code"] == "RATE_LIMITED"
@@ -0,0 +1,103 @@
+"""Tests for web push payload encryption."""
+
+import base64
+import os
+from unittest.mock import patch
+
+import http_ece
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from app.services.push_crypto import (
+    PushMessage,
+    encrypt_batch,
+    encrypt_message,
+    encrypt_messages,
+    shutdown_executor,
+)
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).strip(b"=").decode()
+
+
+@pytest.fixture
+def vapid_key() -> str:
+    key = ec.generate_private_key(ec.SECP256R1())
+    return b64url(key.private_numbers().private_value.to_bytes(32, "big"))
+
+
+@pytest.fixture
+def receiver():
+    """Browser-side key pair and auth secret of a subscription."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    public = key.public_key().public_bytes(
+        serialization.Encoding.X962,
+        serialization.PublicFormat.UncompressedPoint,
+    )
+    auth = os.urandom(16)
+    return key, b64url(public), auth
+
+
+def make_message(receiver, data: str = '{"title": "Water"}') -> PushMessage:
+    _, p256dh, auth = receiver
+    return PushMessage(
+        endpoint="https://push.example.com/send/abc",
+        p256dh_key=p256dh,
+        auth_key=b64url(auth),
+        data=data,
+    )
+
+
+def test_encrypt_message_roundtrip(vapid_key, receiver):
+    """The subscriber can decrypt the body with its private key."""
+    key, _, auth = receiver
+
+    encrypted = encrypt_message(make_message(receiver), vapid_key, "mailto:a@b.c", ttl=60)
+
+    assert encrypted.endpoint == "https://push.example.com/send/abc"
+    assert encrypted.headers["Content-Encoding"] == "aes128gcm"
+    assert encrypted.headers["TTL"] == "60"
+    assert encrypted.headers["Authorization"].startswith("vapid ")
+    plaintext = http_ece.decrypt(
+        encrypted.body, private_key=key, auth_secret=auth, version="aes128gcm"
+    )
+    assert plaintext == b'{"title": "Water"}'
+
+
+def test_encrypt_batch_reports_invalid_keys(vapid_key, receiver):
+    """A broken subscription yields an error string, not a failed batch."""
+    broken = PushMessage(
+        endpoint="https://push.example.com/x", p256dh_key="bad", auth_key="bad", data="{}"
+    )
+
+    results = encrypt_batch([make_message(receiver), broken], vapid_key, "mailto:a@b.c")
+
+    assert results[0].endpoint == "https://push.example.com/send/abc"
+    assert isinstance(results[1], str)
+
+
+@pytest.mark.asyncio
+async def test_encrypt_messages_in_process_pool(vapid_key, receiver):
+    """Large batches are chunked across the process pool."""
+    key, _, auth = receiver
+    messages = [make_message(receiver, f'{{"n": {i}}}') for i in range(5)]
+
+    with patch("app.services.push_crypto.settings") as mock_settings:
+        mock_settings.vapid_private_key = vapid_key
+        mock_settings.vapid_email = "mailto:a@b.c"
+        mock_settings.push_crypto_workers = 2
+        mock_settings.push_crypto_min_batch = 2
+        mock_settings.push_crypto_chunk_size = 2
+        try:
+            results = await encrypt_messages(messages)
+        finally:
+            shutdown_executor()
+
+    assert len(results) == 5
+    for i, result in enumerate(results):
+        plaintext = http_ece.decrypt(
+            result.body, private_key=key, auth_secret=auth, version="aes128gcm"
+        )
+        assert plaintext == f'{{"n": {i}}}'.encode()
@@ -0,0 +1,112 @@
+from datetime import UTC, datetime, timedelta
+
+from app.services.resilience import CircuitBreaker, CircuitState, DailyQuota, TokenBucket
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_burst_then_limits():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 1.0
+
+    clock.now = 1.0
+    assert bucket.try_acquire() == 0.0
+
+
+def test_token_bucket_with_zero_rate_is_disabled():
+    bucket = TokenBucket(rate=0, capacity=1, clock=FakeClock())
+
+    assert all(bucket.try_acquire() == 0.0 for _ in range(10))
+
+
+def test_token_bucket_rate_change_keeps_accumulated_tokens():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, capacity=5, clock=clock)
+    for _ in range(5):
+        bucket.try_acquire()
+
+    clock.now = 2.0
+    bucket.set_rate(0.1)
+
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 10.0
+
+
+def test_daily_quota_blocks_until_midnight_utc():
+    clock = FakeClock(datetime(2026, 5, 1, 22, 0, tzinfo=UTC))
+    quota = DailyQuota(clock=clock)
+    assert quota.retry_after() == 0.0  # unknown quota
+
+    assert quota.seconds_until_reset() is None
+
+    quota.update(1)
+    assert quota.retry_after() == 0.0
+    assert quota.seconds_until_reset() == timedelta(hours=2).total_seconds()
+    quota.consume()
+    assert quota.retry_after() == timedelta(hours=2).total_seconds()
+
+    clock.now = datetime(2026, 5, 2, 0, 0, 1, tzinfo=UTC)
+    assert quota.retry_after() == 0.0
+    assert quota.remaining is None
+
+
+def test_circuit_breaker_opens_after_consecutive_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.before_call() == 0.0
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    clock.now = 10
+    assert breaker.before_call() == 20
+
+
+def test_circuit_breaker_half_open_allows_one_trial():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 30
+    assert breaker.before_call() == 0.0
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.before_call() == 30  # trial still in flight
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+
+    clock.now = 60
+    assert breaker.before_call() == 0.0
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.before_call() == 0.0
+
+
+def test_circuit_breaker_cancelled_trial_is_given_back():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 30
+    assert breaker.before_call() == 0.0
+    breaker.cancel_call()
+
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.before_call() == 0.0
@@ -0,0 +1,95 @@
+"""Tests for the species catalogue."""
+
+import pytest
+from httpx import AsyncClient
+from sqlmodel import select
+
+from app.core.config import get_settings
+from app.models import Species, SpeciesName
+from app.services.species import normalize_name, search_species, seed_species, upsert_species
+
+MONSTERA = {
+    "scientific_name": "Monstera deliciosa",
+    "common_names": ["Swiss Cheese Plant"],
+    "genus": "Monstera",
+    "family": "Araceae",
+}
+
+
+def test_normalize_name():
+    assert normalize_name("  Épipremnum   AUREUM ") == "epipremnum aureum"
+
+
+@pytest.mark.asyncio
+async def test_upsert_merges_common_names(db_session):
+    await upsert_species(db_session, [MONSTERA])
+    await upsert_species(
+        db_session,
+        [{**MONSTERA, "common_names": ["Swiss Cheese Plant", "Split-leaf philodendron"]}],
+    )
+    await db_session.commit()
+
+    species = (await db_session.exec(select(Species))).one()
+    assert species.common_names == ["Swiss Cheese Plant", "Split-leaf philodendron"]
+    names = (await db_session.exec(select(SpeciesName.name))).all()
+    assert sorted(names) == [
+        "monstera deliciosa",
+        "split-leaf philodendron",
+        "swiss cheese plant",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_search_matches_prefix_of_any_name(db_session):
+    await upsert_species(
+        db_session,
+        [
+            MONSTERA,
+            {"scientific_name": "Crassula ovata", "common_names": ["Money tree"]},
+            {"scientific_name": "Epipremnum aureum", "common_names": ["Golden pothos"]},
+        ],
+    )
+    await db_session.commit()
+
+    by_prefix = await search_species(db_session, "MON")
+    assert [s.scientific_name for s in by_prefix] == ["Crassula ovata", "Monstera deliciosa"]
+
+    by_common_name = await search_species(db_session, "swiss")
+    assert [s.scientific_name for s in by_common_name] == ["Monstera deliciosa"]
+
+    assert await search_species(db_session, "onstera") == []
+    assert len(await search_species(db_session, "mon", limit=1)) == 1
+
+
+@pytest.mark.asyncio
+async def test_seed_loads_bundled_list_once(db_session):
+    path = get_settings().species_seed_file
+
+    loaded = await seed_species(db_session, path)
+
+    assert loaded > 0
+    assert await seed_species(db_session, path) == 0
+    found = await search_species(db_session, "snake plant")
+    assert [s.scientific_name for s in found] == ["Dracaena trifasciata"]
+
+
+class TestSpeciesEndpoint:
+    """Tests for GET /api/species."""
+
+    @pytest.mark.asyncio
+    async def test_search(self, client: AsyncClient, auth_headers: dict[str, str], db_session):
+        """Endpoint should return matching species."""
+        await upsert_species(db_session, [MONSTERA])
+        await db_session.commit()
+
+        response = await client.get("/api/species", params={"q": "monst"}, headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json() == [MONSTERA]
+
+    @pytest.mark.asyncio
+    async def test_requires_query(self, client: AsyncClient, auth_headers: dict[str, str]):
+        """Endpoint should require a non-empty query."""
+        response = await client.get("/api/species", params={"q": ""}, headers=auth_headers)
+
+        assert response.status_code == 422
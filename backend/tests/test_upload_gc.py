@@ -0,0 +1,95 @@
+"""Tests for the orphaned upload collector."""
+
+import os
+import time
+
+import pytest
+import pytest_asyncio
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_settings
+from app.models import Plant, PlantPhoto, StoredFile
+from app.services.upload_gc import collect_orphaned_uploads
+
+OLD = time.time() - 3 * 24 * 3600
+
+
+def write(path, size: int, mtime: float = OLD) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    os.utime(path, (mtime, mtime))
+
+
+@pytest_asyncio.fixture
+async def uploads(tmp_path, monkeypatch, db_session: AsyncSession):
+    """A plants folder with a referenced photo, its variant and several orphans."""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "upload_dir", tmp_path)
+    monkeypatch.setattr(settings, "upload_gc_grace_hours", 24)
+    monkeypatch.setattr(settings, "upload_gc_trash", False)
+
+    plants = tmp_path / "plants"
+    write(plants / "kept.jpg", 100)
+    write(plants / "kept.512.webp", 10)
+    write(plants / "gone.png", 200)
+    write(plants / "gone.128.avif", 20)
+    write(plants / ".abandoned.part", 40)
+    write(plants / "fresh.jpg", 300, mtime=time.time())
+    write(tmp_path / "pots" / "legacy.jpg", 400)
+
+    plant = Plant(name="Fern")
+    db_session.add(plant)
+    db_session.add(PlantPhoto(plant_id=plant.id, file_path="kept.jpg"))
+    db_session.add(StoredFile(subfolder="plants", file_path="gone.png", sha256="0" * 64, size=200))
+    await db_session.commit()
+    return tmp_path
+
+
+def files(root) -> set[str]:
+    return {p.relative_to(root).as_posix() for p in root.rglob("*") if p.is_file()}
+
+
+@pytest.mark.asyncio
+async def test_dry_run_reports_without_removing(db_session: AsyncSession, uploads):
+    before = files(uploads)
+
+    report = await collect_orphaned_uploads(db_session, dry_run=True)
+
+    assert report.scanned == 6  # The fresh file is within the grace period
+    assert report.orphans == 4
+    assert report.reclaimed_bytes == 200 + 20 + 40 + 400
+    assert files(uploads) == before
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("batch_size", [1, 500])
+async def test_deletes_orphans(db_session: AsyncSession, uploads, batch_size):
+    report = await collect_orphaned_uploads(db_session, batch_size=batch_size)
+
+    assert report.orphans == 4
+    assert report.reclaimed_bytes == 660
+    assert files(uploads) == {"plants/kept.jpg", "plants/kept.512.webp", "plants/fresh.jpg"}
+    assert (await db_session.exec(select(StoredFile))).all() == []
+
+
+@pytest.mark.asyncio
+async def test_trash_mode(db_session: AsyncSession, uploads, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_gc_trash_days", 7)
+    write(uploads / ".trash" / "plants" / "expired.jpg", 50, mtime=time.time() - 30 * 86400)
+
+    report = await collect_orphaned_uploads(db_session, trash=True)
+
+    assert report.orphans == 4
+    assert (report.trash_purged, report.trash_purged_bytes) == (1, 50)
+    assert {
+        ".trash/plants/gone.png",
+        ".trash/plants/gone.128.avif",
+        ".trash/pots/legacy.jpg",
+    } <= files(uploads)
+    assert not (uploads / ".trash" / "plants" / "expired.jpg").exists()
+
+    # Trashed files are kept for the retention period
+    report = await collect_orphaned_uploads(db_session, trash=True)
+    assert (report.orphans, report.trash_purged) == (0, 0)
+    assert (uploads / ".trash" / "pots" / "legacy.jpg").exists()
@@ -0,0 +1,32 @@
+"""Tests for the standalone background worker."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.worker import run
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_scheduler_until_stopped():
+    """The worker starts the scheduler and shuts it down on stop."""
+    scheduler = MagicMock()
+    scheduler.shutdown = AsyncMock()
+    stop = asyncio.Event()
+    stop.set()
+
+    with (
+        patch("app.worker.init_db", AsyncMock()) as mock_init_db,
+        patch("app.worker.create_scheduler", return_value=scheduler),
+        patch("app.worker.engine") as mock_engine,
+        patch("app.worker.storage.close_storage", AsyncMock()) as mock_close_storage,
+    ):
+        mock_engine.dispose = AsyncMock()
+        await run(stop)
+
+    mock_init_db.assert_awaited_once()
+    scheduler.start.assert_called_once()
+    scheduler.shutdown.assert_awaited_once()
+    mock_close_storage.assert_awaited_once()
+    mock_engine.dispose.assert_awaited_once()
@@ -85,7 +85,7 @@ class ApiClient {
 			headers.set('Authorization', `Bearer ${this.token}`);
 		}
 
-		if (options.body && !(options.body instanceof FormData)) {
+		if (options.body && !(options.body instanceof FormData) && !headers.has('Content-Type')) {
 			headers.set('Content-Type', 'application/json');
 		}
 
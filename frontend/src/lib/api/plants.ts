@@ -1,10 +1,12 @@
 import { apiClient } from './client';
+import { uploadPhotoFile, uploadPhotoFiles } from './uploads';
 import type {
 	PlantListItem,
 	PlantDetail,
 	CareEvent,
 	CareEventType,
 	PlantCreate,
+	PlantPhoto,
 	PlantUpdate
 } from './types';
 
@@ -34,10 +36,11 @@ export const plantService = {
 	},
 
 	uploadPhoto: (plantId: string, file: File, isPrimary: boolean = false) => {
-		const formData = new FormData();
-		formData.append('file', file);
-		if (isPrimary) formData.append('is_primary', 'true');
-		return apiClient.post<{ id: string; url: string }>(`/plants/${plantId}/photos?is_primary=${isPrimary}`, formData);
+		return uploadPhotoFile<{ id: string; url: string }>(`/plants/${plantId}`, file, isPrimary);
+	},
+
+	uploadPhotos: (plantId: string, files: File[], primaryIndex: number | null = null) => {
+		return uploadPhotoFiles<PlantPhoto>(`/plants/${plantId}`, files, primaryIndex);
 	},
 
 	deletePhoto: (plantId: string, photoId: string) => {
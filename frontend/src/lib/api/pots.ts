@@ -1,5 +1,6 @@
 import { apiClient } from './client';
-import type { Pot, PotCreate, PotDetail } from './types';
+import { uploadPhotoFile, uploadPhotoFiles } from './uploads';
+import type { Pot, PotCreate, PotDetail, PotPhoto } from './types';
 
 export const potService = {
 	getPots: () => {
@@ -27,8 +28,10 @@ export const potService = {
 	},
 
 	uploadPhoto: async (potId: string, file: File, isPrimary: boolean = false) => {
-		const formData = new FormData();
-		formData.append('file', file);
-		return apiClient.post(`/pots/${potId}/photos?is_primary=${isPrimary}`, formData);
+		return uploadPhotoFile(`/pots/${potId}`, file, isPrimary);
+	},
+
+	uploadPhotos: (potId: string, files: File[], primaryIndex: number | null = null) => {
+		return uploadPhotoFiles<PotPhoto>(`/pots/${potId}`, files, primaryIndex);
 	}
 };
@@ -0,0 +1,9 @@
+import { apiClient } from './client';
+import type { Species } from './types';
+
+export const speciesService = {
+	searchSpecies: (query: string, limit: number = 10) => {
+		const params = new URLSearchParams({ q: query, limit: limit.toString() });
+		return apiClient.get<Species[]>(`/species?${params.toString()}`);
+	}
+};
@@ -23,6 +23,12 @@ export interface PlantBase {
 	name: string;
 	species: string | null;
 	primary_photo_url: string | null;
+	thumbnail_url: string | null;
+	srcset: string | null;
+	avif_srcset: string | null;
+	placeholder: string | null;
+	photo_width: number | null;
+	photo_height: number | null;
 	pot_id: UUID | null;
 	watering_interval: number | null;
 	fertilizing_interval: number | null;
@@ -58,6 +64,14 @@ export interface PlantDetail extends PlantBase {
 export interface PlantPhoto {
 	id: UUID;
 	url: string;
+	thumbnail_url: string | null;
+	srcset: string | null;
+	avif_srcset: string | null;
+	width: number | null;
+	height: number | null;
+	orientation: number | null;
+	taken_at: string | null;
+	placeholder: string | null;
 	is_primary: boolean;
 	uploaded_at: string;
 }
@@ -77,6 +91,12 @@ export interface Pot {
 	diameter_cm: number;
 	height_cm: number;
 	primary_photo_url: string | null;
+	thumbnail_url: string | null;
+	srcset: string | null;
+	avif_srcset: string | null;
+	placeholder: string | null;
+	photo_width: number | null;
+	photo_height: number | null;
 	plant_id: UUID | null;
 	plant_name: string | null;
 	created_at: string;
@@ -95,6 +115,14 @@ export interface PotDetail extends Pot {
 export interface PotPhoto {
 	id: UUID;
 	url: string;
+	thumbnail_url: string | null;
+	srcset: string | null;
+	avif_srcset: string | null;
+	width: number | null;
+	height: number | null;
+	orientation: number | null;
+	taken_at: string | null;
+	placeholder: string | null;
 	is_primary: boolean;
 	uploaded_at: string;
 }
@@ -141,11 +169,19 @@ export interface IdentificationResult {
 	genus: string;
 }
 
+export interface Species {
+	scientific_name: string;
+	common_names: string[];
+	genus: string;
+	family: string;
+}
+
 export interface IdentifyResponse {
 	results: IdentificationResult[];
 	error?: string | null;
 	error_code?: string | null;
 	remaining_identifications?: number | null;
+	retry_after?: number | null;
 }
 
 export interface AuthResponse {
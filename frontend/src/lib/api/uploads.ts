@@ -0,0 +1,114 @@
+import { apiClient } from './client';
+
+interface DirectUpload {
+	file_path: string;
+	upload_url: string | null;
+	headers: Record<string, string>;
+	expires_at: string | null;
+}
+
+interface ResumableUpload {
+	id: string;
+	offset: number;
+	size: number;
+	expires_at: string;
+}
+
+// Sent per PATCH; a failed part is resumed from the offset the API has stored
+const CHUNK_SIZE = 1024 * 1024;
+const MAX_ATTEMPTS = 5;
+
+// Cleared once the API reports that its storage backend cannot take direct uploads
+let directUploads = typeof crypto !== 'undefined' && !!crypto.subtle;
+
+async function sha256Hex(file: File): Promise<string> {
+	const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+	return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+}
+
+async function uploadResumable<T>(basePath: string, file: File, isPrimary: boolean): Promise<T> {
+	const upload = await apiClient.post<ResumableUpload>(`${basePath}/photos/resumable`, {
+		filename: file.name,
+		size: file.size
+	});
+	const path = `${basePath}/photos/resumable/${upload.id}`;
+	let offset = 0;
+	let failures = 0;
+	while (offset < file.size) {
+		try {
+			await apiClient.request(path, {
+				method: 'PATCH',
+				body: file.slice(offset, offset + CHUNK_SIZE),
+				headers: {
+					'Content-Type': 'application/offset+octet-stream',
+					'Upload-Offset': String(offset)
+				}
+			});
+			offset = Math.min(offset + CHUNK_SIZE, file.size);
+			failures = 0;
+		} catch (error) {
+			if (++failures >= MAX_ATTEMPTS) throw error;
+			await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** failures));
+			try {
+				offset = (await apiClient.get<ResumableUpload>(path)).offset;
+			} catch {
+				// Still offline: retry the same part
+			}
+		}
+	}
+	return apiClient.post<T>(`${path}/complete?is_primary=${isPrimary}`);
+}
+
+/**
+ * Upload a photo of a plant or pot (`basePath` like `/plants/<id>`).
+ *
+ * With S3 storage the file goes straight to the bucket through a presigned
+ * URL and is then registered with the API; otherwise it is sent to the API
+ * in parts, resuming after connection failures.
+ */
+export async function uploadPhotoFile<T>(basePath: string, file: File, isPrimary: boolean): Promise<T> {
+	if (directUploads) {
+		let upload: DirectUpload | null = null;
+		try {
+			upload = await apiClient.post<DirectUpload>(`${basePath}/photos/direct`, {
+				filename: file.name,
+				size: file.size,
+				sha256: await sha256Hex(file)
+			});
+		} catch {
+			directUploads = false;
+		}
+		if (upload) {
+			if (upload.upload_url) {
+				const response = await fetch(upload.upload_url, {
+					method: 'PUT',
+					body: file,
+					headers: upload.headers
+				});
+				if (!response.ok) throw new Error(`Upload failed (${response.status})`);
+			}
+			return apiClient.post<T>(`${basePath}/photos/direct/complete?is_primary=${isPrimary}`, {
+				file_path: upload.file_path
+			});
+		}
+	}
+
+	return uploadResumable<T>(basePath, file, isPrimary);
+}
+
+/**
+ * Upload several photos of a plant or pot in one request; the API stores
+ * them concurrently and adds all photos at once.
+ */
+export async function uploadPhotoFiles<T>(
+	basePath: string,
+	files: File[],
+	primaryIndex: number | null
+): Promise<T[]> {
+	const formData = new FormData();
+	for (const file of files) {
+		formData.append('files', file);
+	}
+	const query = primaryIndex === null ? '' : `?primary_index=${primaryIndex}`;
+	return apiClient.post<T[]>(`${basePath}/photos/batch${query}`, formData);
+}